@@ -10,6 +10,7 @@ from app.schemas.user import UserCreate, UserLogin, UserResponse
 from app.schemas.token import Token
 from app.core.security import get_password_hash, verify_password, create_access_token
 from app.api.deps import get_current_user
+from app.services.auth_cache import auth_cache_stats
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -65,3 +66,9 @@ def login(credentials: UserLogin, db: Session = Depends(get_db)):
 def get_me(current_user: User = Depends(get_current_user)):
     """Get current authenticated user."""
     return current_user
+
+
+@router.get("/cache/stats")
+def auth_cache_statistics(current_user: User = Depends(get_current_user)):
+    """Hit/miss counters of the token and user caches."""
+    return auth_cache_stats()
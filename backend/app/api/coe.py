@@ -1,124 +1,290 @@
 """COE analysis API."""
 from typing import List, Any
 
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile, File
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
 
-from app.database import get_db
+from app.database import run_db
 from app.models.user import User
-from app.models.analysis import COEAnalysis
-from app.api.deps import get_current_user
-from app.services.coe_processor import process_coe_csv
-from app.schemas.coe import COEAnalysisRecord
+from app.models.analysis import COEAnalysis, COEJob
+from app.api.deps import get_current_user_async
+from app.services.coe_jobs import submit_coe_job
+from app.services.coe_results import (
+    delete_coe_analysis,
+    ensure_migrated,
+    load_full_result,
+    load_summary,
+    promote_coe_analysis,
+    query_duplicate_groups,
+    query_report_rows,
+    save_coe_analysis,
+)
+from app.services.coe_processor import MissingSQLColumnError, analyze_coe_stream
+from app.services.offload import run_cpu, run_cpu_db
+from app.schemas.coe import COEAnalysisRecord, COEJobStatus
 
 router = APIRouter()
 
 
 @router.post("/upload")
-def coe_upload(
+async def coe_upload(
     file: UploadFile = File(...),
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    exhaustive: bool = False,
+    background: bool = True,
+    current_user: User = Depends(get_current_user_async),
 ):
-    """Upload COE CSV and run analysis. Returns full analysis result."""
+    """
+    Upload COE CSV and queue its analysis. Answers 202 with the job at once,
+    so a large file does not hold the request open past proxy timeouts; poll
+    /jobs/{job_id} and read the result from /results/{analysis_id}.
+    Pass background=false to run the analysis in the request and get the full
+    result back instead. The file is read in chunks, so its size is not
+    bounded by worker memory. Near duplicates come from LSH candidates, which
+    can very rarely miss a pair; pass exhaustive=true to compare every pair.
+    """
     if not file.filename or not file.filename.lower().endswith(".csv"):
         raise HTTPException(400, "CSV file required")
+    if background:
+        try:
+            job = await run_cpu_db(
+                lambda db: _job_status(
+                    submit_coe_job(db, file.file, file.filename, current_user.id, exhaustive=exhaustive)
+                )
+            )
+        except Exception as e:
+            raise HTTPException(400, f"Failed to read file: {e}")
+        return JSONResponse(job.model_dump(), status_code=202)
     try:
-        content = file.file.read()
-    except Exception as e:
-        raise HTTPException(400, f"Failed to read file: {e}")
-    try:
-        result = process_coe_csv(content, file.filename)
+        # Stream the spooled upload instead of reading it into memory
+        result = await run_cpu(analyze_coe_stream, file.file, file.filename, exhaustive)
+    except MissingSQLColumnError as e:
+        raise HTTPException(400, str(e))
     except Exception as e:
         raise HTTPException(400, f"Failed to process CSV: {str(e)}")
-    if result.get("error"):
-        raise HTTPException(400, result["error"])
     # Persist summary to DB
-    import json
-    record = COEAnalysis(
-        filename=file.filename,
-        report_count=result.get("report_count"),
-        duplicate_count=result.get("duplicate_count"),
-        unique_count=result.get("unique_count"),
-        avg_complexity=result.get("avg_complexity"),
-        total_estimated_hours=result.get("total_estimated_hours"),
-        results_json=json.dumps(result),
-        user_id=current_user.id,
+    record = await run_cpu_db(save_coe_analysis, result, file.filename, current_user.id)
+    data = await run_cpu(result.as_dict)
+    data["analysis_id"] = record.id
+    return data
+
+
+def _job_status(job: COEJob) -> COEJobStatus:
+    return COEJobStatus(
+        job_id=job.id,
+        filename=job.filename,
+        status=job.status,
+        rows_scored=job.rows_scored or 0,
+        pairs_compared=job.pairs_compared or 0,
+        error=job.error,
+        analysis_id=job.analysis_id,
+        created_at=job.created_at.isoformat() if job.created_at else None,
+        started_at=job.started_at.isoformat() if job.started_at else None,
+        finished_at=job.finished_at.isoformat() if job.finished_at else None,
     )
-    db.add(record)
-    db.commit()
-    db.refresh(record)
-    result["analysis_id"] = record.id
-    return result
 
 
-@router.get("/results/{analysis_id}", response_model=dict)
-def get_coe_results(
-    analysis_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+@router.get("/jobs", response_model=List[COEJobStatus])
+async def coe_jobs(
+    skip: int = 0,
+    limit: int = 50,
+    current_user: User = Depends(get_current_user_async),
 ):
-    """Get stored COE analysis results by ID."""
+    """List background COE jobs for the current user, newest first."""
+    def list_jobs(db: Session) -> list[COEJobStatus]:
+        rows = (
+            db.query(COEJob)
+            .filter(COEJob.user_id == current_user.id)
+            .order_by(COEJob.id.desc())
+            .offset(skip)
+            .limit(limit)
+            .all()
+        )
+        return [_job_status(r) for r in rows]
+
+    return await run_db(list_jobs)
+
+
+@router.get("/jobs/{job_id}", response_model=COEJobStatus)
+async def coe_job_status(
+    job_id: int,
+    current_user: User = Depends(get_current_user_async),
+):
+    """Status and progress of a background COE job."""
+    def job_status(db: Session) -> COEJobStatus | None:
+        job = db.query(COEJob).filter(
+            COEJob.id == job_id,
+            COEJob.user_id == current_user.id,
+        ).first()
+        return _job_status(job) if job else None
+
+    status = await run_db(job_status)
+    if not status:
+        raise HTTPException(404, "Job not found")
+    return status
+
+
+def _get_analysis(db: Session, analysis_id: int, user_id: int) -> COEAnalysis:
     row = db.query(COEAnalysis).filter(
         COEAnalysis.id == analysis_id,
-        COEAnalysis.user_id == current_user.id,
+        COEAnalysis.user_id == user_id,
     ).first()
     if not row:
         raise HTTPException(404, "Analysis not found")
-    import json
     if not row.results_json:
         raise HTTPException(404, "Results not available")
-    data = json.loads(row.results_json)
-    data["analysis_id"] = row.id
-    data["filename"] = row.filename
-    data["created_at"] = row.created_at.isoformat() if row.created_at else None
-    return data
+    return row
+
+
+@router.get("/results/{analysis_id}", response_model=dict)
+async def get_coe_results(
+    analysis_id: int,
+    include_reports: bool = True,
+    current_user: User = Depends(get_current_user_async),
+):
+    """
+    Get stored COE analysis results by ID.
+    Pass include_reports=false for the summary only; page through reports and
+    duplicate groups with /results/{analysis_id}/reports and /duplicate-groups.
+    """
+    def results(db: Session) -> dict[str, Any]:
+        row = _get_analysis(db, analysis_id, current_user.id)
+        data = load_full_result(db, row) if include_reports else load_summary(db, row)
+        data["analysis_id"] = row.id
+        data["filename"] = row.filename
+        data["created_at"] = row.created_at.isoformat() if row.created_at else None
+        return data
+
+    # A full result can be large: build it off the event loop.
+    return await (run_cpu_db(results) if include_reports else run_db(results))
+
+
+@router.post("/results/{analysis_id}/promote", response_model=dict)
+async def promote_coe_results(
+    analysis_id: int,
+    current_user: User = Depends(get_current_user_async),
+):
+    """
+    Create tracked reports from the analysis' reports, reusing their computed
+    scores. Safe to repeat: reports already promoted (same COE report id) are
+    skipped. Returns the number created and skipped.
+    """
+    return await run_cpu_db(
+        lambda db: promote_coe_analysis(db, _get_analysis(db, analysis_id, current_user.id))
+    )
+
+
+@router.get("/results/{analysis_id}/reports", response_model=dict)
+async def get_coe_result_reports(
+    analysis_id: int,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    category: str | None = None,
+    owner: str | None = None,
+    min_score: float | None = None,
+    max_score: float | None = None,
+    search: str | None = None,
+    sort: str = "position",
+    include_sql: bool = True,
+    current_user: User = Depends(get_current_user_async),
+):
+    """
+    Page of the analysis' reports. Filter by complexity category, owner, score
+    range or name substring; sort by position, report_name, owner,
+    complexity_score or estimated_hours (prefix "-" for descending).
+    """
+    def page(db: Session) -> dict[str, Any]:
+        row = _get_analysis(db, analysis_id, current_user.id)
+        ensure_migrated(db, row)
+        try:
+            return query_report_rows(
+                db, row.id, skip=skip, limit=limit, category=category, owner=owner,
+                min_score=min_score, max_score=max_score, search=search, sort=sort,
+                include_sql=include_sql,
+            )
+        except ValueError as e:
+            raise HTTPException(400, str(e))
+
+    return await run_db(page)
+
+
+@router.get("/results/{analysis_id}/duplicate-groups", response_model=dict)
+async def get_coe_result_duplicate_groups(
+    analysis_id: int,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    type: str | None = None,
+    min_similarity: float | None = None,
+    sort: str = "position",
+    current_user: User = Depends(get_current_user_async),
+):
+    """
+    Page of the analysis' duplicate groups. Filter by type (EXACT or
+    NEAR_DUPLICATE) and minimum similarity; sort by position or similarity.
+    """
+    def page(db: Session) -> dict[str, Any]:
+        row = _get_analysis(db, analysis_id, current_user.id)
+        ensure_migrated(db, row)
+        try:
+            return query_duplicate_groups(
+                db, row.id, skip=skip, limit=limit, group_type=type,
+                min_similarity=min_similarity, sort=sort,
+            )
+        except ValueError as e:
+            raise HTTPException(400, str(e))
+
+    return await run_db(page)
 
 
 @router.get("/history", response_model=List[COEAnalysisRecord])
-def coe_history(
+async def coe_history(
     skip: int = 0,
     limit: int = 50,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user_async),
 ):
     """List past COE analyses for the current user."""
-    rows = (
-        db.query(COEAnalysis)
-        .filter(COEAnalysis.user_id == current_user.id)
-        .order_by(COEAnalysis.created_at.desc())
-        .offset(skip)
-        .limit(limit)
-        .all()
-    )
-    return [
-        COEAnalysisRecord(
-            id=r.id,
-            filename=r.filename,
-            report_count=r.report_count,
-            duplicate_count=r.duplicate_count,
-            unique_count=r.unique_count,
-            avg_complexity=r.avg_complexity,
-            total_estimated_hours=r.total_estimated_hours,
-            created_at=r.created_at.isoformat() if r.created_at else None,
+    def history(db: Session) -> list[COEAnalysisRecord]:
+        rows = (
+            db.query(COEAnalysis)
+            .filter(COEAnalysis.user_id == current_user.id)
+            .order_by(COEAnalysis.created_at.desc())
+            .offset(skip)
+            .limit(limit)
+            .all()
         )
-        for r in rows
-    ]
+        return [
+            COEAnalysisRecord(
+                id=r.id,
+                filename=r.filename,
+                report_count=r.report_count,
+                duplicate_count=r.duplicate_count,
+                unique_count=r.unique_count,
+                avg_complexity=r.avg_complexity,
+                total_estimated_hours=r.total_estimated_hours,
+                created_at=r.created_at.isoformat() if r.created_at else None,
+            )
+            for r in rows
+        ]
+
+    return await run_db(history)
 
 
 @router.delete("/results/{analysis_id}", status_code=204)
-def delete_coe_results(
+async def delete_coe_results(
     analysis_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user_async),
 ):
     """Delete a stored COE analysis."""
-    row = db.query(COEAnalysis).filter(
-        COEAnalysis.id == analysis_id,
-        COEAnalysis.user_id == current_user.id,
-    ).first()
-    if not row:
+    def delete(db: Session) -> bool:
+        row = db.query(COEAnalysis).filter(
+            COEAnalysis.id == analysis_id,
+            COEAnalysis.user_id == current_user.id,
+        ).first()
+        if not row:
+            return False
+        delete_coe_analysis(db, row)
+        return True
+
+    if not await run_db(delete):
         raise HTTPException(404, "Analysis not found")
-    db.delete(row)
-    db.commit()
     return None
@@ -1,51 +1,29 @@
 """Dashboard stats API."""
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Request, Response
 
-from app.database import get_db
+from app.database import run_db
 from app.models.user import User
-from app.models.report import Report
-from app.models.analysis import COEAnalysis
-from app.api.deps import get_current_user
+from app.api.deps import get_current_user_async
+from app.services.dashboard_kpis import get_dashboard_stats
 
 router = APIRouter()
 
 
 @router.get("/stats")
-def dashboard_stats(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+async def dashboard_stats(
+    request: Request,
+    response: Response,
+    refresh: bool = False,
+    current_user: User = Depends(get_current_user_async),
 ):
-    """Aggregate KPIs for dashboard: reports, complexity breakdown, COE history."""
-    reports = (
-        db.query(Report)
-        .filter(Report.created_by == current_user.id)
-        .all()
-    )
-    total_reports = len(reports)
-    migrated = sum(1 for r in reports if getattr(r, "migrated", False))
-    complexity_breakdown = {"simple": 0, "medium": 0, "complex": 0, "very_complex": 0}
-    total_hours = 0.0
-    for r in reports:
-        cat = (r.complexity_category or "").lower().replace(" ", "_")
-        if cat in complexity_breakdown:
-            complexity_breakdown[cat] += 1
-        else:
-            if (r.complexity_score or 0) <= 5:
-                complexity_breakdown["simple"] += 1
-            elif (r.complexity_score or 0) <= 15:
-                complexity_breakdown["medium"] += 1
-            elif (r.complexity_score or 0) <= 30:
-                complexity_breakdown["complex"] += 1
-            else:
-                complexity_breakdown["very_complex"] += 1
-        total_hours += r.estimated_hours or (r.complexity_score or 0) * 0.5
-    coe_count = db.query(COEAnalysis).filter(COEAnalysis.user_id == current_user.id).count()
-    return {
-        "total_reports": total_reports,
-        "reports_migrated": migrated,
-        "migration_progress_percent": round(100 * migrated / total_reports, 1) if total_reports else 0,
-        "complexity_breakdown": complexity_breakdown,
-        "estimated_total_hours": round(total_hours, 1),
-        "coe_analyses_count": coe_count,
-    }
+    """
+    Aggregate KPIs for dashboard: reports, complexity breakdown, COE history.
+    Served from the incrementally maintained KPI summary; answers 304 when
+    If-None-Match carries the current ETag. refresh=true recomputes it.
+    """
+    stats, etag = await run_db(get_dashboard_stats, current_user.id, refresh)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if not refresh and etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return stats
@@ -3,9 +3,9 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 
-from app.database import SessionLocal, get_db
+from app.database import SessionLocal, get_db, run_db
 from app.models.user import User
-from app.core.security import decode_access_token
+from app.services.auth_cache import cached_user, load_user, resolve_user, token_subject
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login", auto_error=False)
 
@@ -17,34 +17,49 @@ def get_current_user_optional(
     """Return current user if valid token, else None. For optional auth."""
     if not token:
         return None
-    username = decode_access_token(token)
+    username = token_subject(token)
     if not username:
         return None
-    user = db.query(User).filter(User.username == username).first()
-    return user
+    return resolve_user(db, username)
 
 
-def get_current_user(
-    db: Session = Depends(get_db),
-    token: str = Depends(oauth2_scheme),
-) -> User:
-    """Require valid JWT and return current user."""
+def _authenticated(token: str | None) -> str:
     if not token:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Not authenticated",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    username = decode_access_token(token)
+    username = token_subject(token)
     if not username:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid or expired token",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    user = db.query(User).filter(User.username == username).first()
+    return username
+
+
+def _active(user: User | None) -> User:
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     if not user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
     return user
+
+
+def get_current_user(
+    db: Session = Depends(get_db),
+    token: str = Depends(oauth2_scheme),
+) -> User:
+    """Require valid JWT and return current user."""
+    return _active(resolve_user(db, _authenticated(token)))
+
+
+async def get_current_user_async(token: str = Depends(oauth2_scheme)) -> User:
+    """
+    get_current_user for async handlers: a cached user costs neither a thread
+    nor a query. The user is detached; use it read-only (e.g. its id).
+    """
+    username = _authenticated(token)
+    return _active(cached_user(username) or await run_db(load_user, username))
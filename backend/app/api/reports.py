@@ -1,91 +1,117 @@
 """Report API endpoints."""
 from typing import List
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
 from fastapi import status
 from sqlalchemy.orm import Session
 
-from app.database import get_db
+from app.database import run_db
 from app.models.user import User
 from app.schemas.report import ReportCreate, ReportUpdate, ReportResponse
+from app.services.offload import run_cpu_db
 from app.services.report_service import ReportService
-from app.services.report_consolidator import consolidate_reports
-from app.api.deps import get_current_user
+from app.services.report_consolidator import consolidate_user_reports
+from app.services.report_import import import_reports
+from app.api.deps import get_current_user_async
 
 router = APIRouter()
 
 
+def _response(report) -> ReportResponse | None:
+    # Built while the session is open
+    return ReportResponse.model_validate(report) if report else None
+
+
 @router.get("/", response_model=List[ReportResponse])
-def list_reports(
+async def list_reports(
     skip: int = 0,
     limit: int = 100,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user_async),
 ):
     """List all reports for the current user."""
-    service = ReportService(db)
-    return service.get_user_reports(current_user.id, skip=skip, limit=limit)
+    def list_page(db: Session) -> list[ReportResponse]:
+        reports = ReportService(db).get_user_reports(current_user.id, skip=skip, limit=limit)
+        return [_response(r) for r in reports]
+
+    return await run_db(list_page)
 
 
 @router.post("/", response_model=ReportResponse, status_code=status.HTTP_201_CREATED)
-def create_report(
+async def create_report(
     report: ReportCreate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user_async),
 ):
     """Create a new report."""
-    service = ReportService(db)
-    return service.create_report(report, current_user.id)
+    # Parsing and similarity indexing are CPU-bound: run off the event loop.
+    return await run_cpu_db(
+        lambda db: _response(ReportService(db).create_report(report, current_user.id))
+    )
+
+
+@router.post("/import")
+async def import_report_file(
+    file: UploadFile = File(...),
+    current_user: User = Depends(get_current_user_async),
+):
+    """
+    Bulk-create reports from a COE CSV or a JSON lines file (one ReportCreate
+    object per line). Reports without a complexity score are scored from their
+    SQL. Invalid rows are skipped and listed in errors with their row number.
+    If the file cannot be read to the end, the rows before the unreadable part
+    are imported and error gives the reason.
+    """
+    if not file.filename:
+        raise HTTPException(400, "CSV or JSON lines file required")
+    try:
+        return await run_cpu_db(import_reports, current_user.id, file.file, file.filename)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
 
 
 @router.get("/{report_id}", response_model=ReportResponse)
-def get_report(
+async def get_report(
     report_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user_async),
 ):
     """Get report by ID."""
-    service = ReportService(db)
-    report = service.get_report(report_id, current_user.id)
+    report = await run_db(
+        lambda db: _response(ReportService(db).get_report(report_id, current_user.id))
+    )
     if not report:
         raise HTTPException(status_code=404, detail="Report not found")
     return report
 
 
 @router.put("/{report_id}", response_model=ReportResponse)
-def update_report(
+async def update_report(
     report_id: int,
     report: ReportUpdate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user_async),
 ):
     """Update a report."""
-    service = ReportService(db)
-    updated = service.update_report(report_id, report, current_user.id)
+    updated = await run_cpu_db(
+        lambda db: _response(ReportService(db).update_report(report_id, report, current_user.id))
+    )
     if not updated:
         raise HTTPException(status_code=404, detail="Report not found")
     return updated
 
 
 @router.delete("/{report_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_report(
+async def delete_report(
     report_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user_async),
 ):
     """Delete a report."""
-    service = ReportService(db)
-    if not service.delete_report(report_id, current_user.id):
+    deleted = await run_db(lambda db: ReportService(db).delete_report(report_id, current_user.id))
+    if not deleted:
         raise HTTPException(status_code=404, detail="Report not found")
     return None
 
 
 @router.post("/consolidate")
-def report_consolidate(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+async def report_consolidate(
+    current_user: User = Depends(get_current_user_async),
 ):
     """Find duplicate and near-duplicate reports for the current user."""
-    service = ReportService(db)
-    reports = service.get_user_reports(current_user.id, skip=0, limit=1000)
-    return consolidate_reports(reports)
+    return await run_cpu_db(consolidate_user_reports, current_user.id)
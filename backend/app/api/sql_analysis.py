@@ -1,27 +1,107 @@
 """SQL analysis and comparison API."""
+import json
+from concurrent.futures import Executor
+from typing import Any, Callable, Iterator
+
 from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
 
-from app.api.deps import get_current_user
+from app.api.deps import get_current_user_async
 from app.models.user import User
-from app.schemas.sql_analysis import SQLAnalyzeRequest, SQLCompareRequest
-from app.services.sql_analyzer import analyze_sql, compare_sql
+from app.schemas.sql_analysis import (
+    SQLAnalyzeRequest,
+    SQLBatchAnalyzeRequest,
+    SQLBatchCompareRequest,
+    SQLCompareRequest,
+    SQLSimilarRequest,
+)
+from app.services.analysis_cache import cache_stats
+from app.services.sql_analyzer import (
+    analyze_sql,
+    analyze_sql_chunk,
+    compare_sql,
+    compare_sql_chunk,
+    find_similar_reports,
+    sql_batches,
+)
+from app.services.offload import run_cpu, run_cpu_db
+from app.services.worker_pool import get_process_pool
 
 router = APIRouter()
 
 
 @router.post("/analyze")
-def sql_analyze(
+async def sql_analyze(
     body: SQLAnalyzeRequest,
-    current_user: User = Depends(get_current_user),
+    current_user: User = Depends(get_current_user_async),
 ):
     """Analyze SQL complexity, lineage, and migration recommendations."""
-    return analyze_sql(body.sql_query)
+    return await run_cpu(analyze_sql, body.sql_query)
 
 
 @router.post("/compare")
-def sql_compare(
+async def sql_compare(
     body: SQLCompareRequest,
-    current_user: User = Depends(get_current_user),
+    current_user: User = Depends(get_current_user_async),
 ):
     """Compare two SQL queries for similarity and differences."""
-    return compare_sql(body.sql1, body.sql2)
+    return await run_cpu(compare_sql, body.sql1, body.sql2)
+
+
+def _ndjson(
+    chunks: Iterator[list],
+    run_chunk: Callable[[list, int, Executor | None], list[dict[str, Any]]],
+    pool: Executor | None,
+) -> StreamingResponse:
+    """Stream each chunk's results as NDJSON, each chunk computed on an offload thread."""
+    def lines(chunk: list, start: int) -> str:
+        return "".join(json.dumps(r) + "\n" for r in run_chunk(chunk, start, pool))
+
+    async def body():
+        start = 0
+        for chunk in chunks:
+            yield await run_cpu(lines, chunk, start)
+            start += len(chunk)
+
+    return StreamingResponse(body(), media_type="application/x-ndjson")
+
+
+@router.post("/analyze/batch")
+async def sql_analyze_batch(
+    body: SQLBatchAnalyzeRequest,
+    current_user: User = Depends(get_current_user_async),
+):
+    """
+    Analyze many queries in one request. Results stream back as NDJSON, one
+    line per query in input order, each with its "index" (or an "error").
+    parallel=true parses on the shared process pool.
+    """
+    pool = get_process_pool() if body.parallel else None
+    return _ndjson(sql_batches(body.queries, pool), analyze_sql_chunk, pool)
+
+
+@router.post("/compare/batch")
+async def sql_compare_batch(
+    body: SQLBatchCompareRequest,
+    current_user: User = Depends(get_current_user_async),
+):
+    """Compare many query pairs in one request; streams NDJSON like /analyze/batch."""
+    pool = get_process_pool() if body.parallel else None
+    return _ndjson(sql_batches(((p.sql1, p.sql2) for p in body.pairs), pool), compare_sql_chunk, pool)
+
+
+@router.post("/similar")
+async def sql_similar(
+    body: SQLSimilarRequest,
+    current_user: User = Depends(get_current_user_async),
+):
+    """Top-K of the current user's reports most similar to a query."""
+    return await run_cpu_db(
+        find_similar_reports, current_user.id, body.sql_query, body.top_k, body.min_similarity,
+    )
+
+
+@router.get("/cache/stats")
+async def sql_cache_stats(current_user: User = Depends(get_current_user_async)):
+    """Hit/miss counters of the SQL analysis cache."""
+    return cache_stats()
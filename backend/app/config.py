@@ -1,6 +1,6 @@
 """Application configuration using pydantic-settings."""
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import List, Literal
 
 
 class Settings(BaseSettings):
@@ -12,6 +12,18 @@ class Settings(BaseSettings):
 
     # Database
     database_url: str = "sqlite:///./app.db"
+    # Serve async handlers' queries through an async engine built from
+    # database_url (needs aiosqlite for SQLite, asyncpg for PostgreSQL)
+    database_async: bool = False
+    # Connection pool (ignored for in-memory SQLite, which shares one
+    # connection); seconds for timeout/recycle, pre-ping drops dead connections
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: int = 30
+    db_pool_recycle: int = 1800
+    db_pool_pre_ping: bool = True
+    # SQLite: milliseconds a writer waits for the database lock
+    sqlite_busy_timeout_ms: int = 5000
 
     # JWT
     secret_key: str = "your-secret-key-here-minimum-32-characters-change-in-production"
@@ -23,6 +35,52 @@ class Settings(BaseSettings):
     port: int = 5010
     reload: bool = True
 
+    # SQL analysis cache (in-process LRU, optional persistent tier in the app DB)
+    analysis_cache_size: int = 10000
+    analysis_cache_max_mb: int = 128
+    analysis_cache_persistent: bool = False
+
+    # SQL tokenizer behind scoring and fingerprinting: "sqlparse" (full parse)
+    # or "lexer" (single-pass lexer, same results; see app.utils.sql_lexer)
+    sql_parser_engine: Literal["sqlparse", "lexer"] = "sqlparse"
+
+    # COE processing: worker processes (0 or 1 = serial) and rows/pairs per task
+    coe_workers: int = 0
+    coe_chunk_size: int = 200
+    # CSV rows read and scored per step when ingesting a COE upload
+    coe_csv_chunk_rows: int = 5000
+    # Background COE jobs (the default for /api/coe/upload): job threads and spool dir
+    coe_job_workers: int = 2
+    coe_job_dir: str = "./coe_jobs"
+    # Seconds without a progress heartbeat before another process may take over
+    # a running job at startup (recover_coe_jobs)
+    coe_job_stale_seconds: int = 300
+
+    # Dashboard KPI cache: users kept and seconds before re-reading the KPI row
+    dashboard_cache_size: int = 10000
+    dashboard_cache_ttl: int = 30
+
+    # Authenticated-user resolution: decoded tokens and user rows cached per
+    # process (entries, seconds; a token is never cached past its expiry)
+    auth_token_cache_size: int = 10000
+    auth_token_cache_ttl: int = 300
+    auth_user_cache_size: int = 10000
+    auth_user_cache_ttl: int = 30
+
+    # Threads for CPU-heavy work offloaded from async handlers (analysis,
+    # uploads), kept apart from the threadpool serving cheap requests
+    cpu_offload_threads: int = 4
+
+    # Batch SQL analyze/compare: most queries or pairs per request
+    sql_batch_max_items: int = 10000
+
+    # Bulk report import: rows per executemany/transaction
+    report_import_batch: int = 1000
+
+    # Request metrics on /metrics (Prometheus) and Server-Timing headers;
+    # also times the SQL analysis functions
+    metrics_enabled: bool = True
+
     # CORS
     cors_origins: str = "http://localhost:8090,http://localhost:3000"
 
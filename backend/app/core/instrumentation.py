@@ -0,0 +1,126 @@
+"""Request instrumentation: latency, in-flight requests and database time.
+
+MetricsMiddleware is a plain ASGI middleware (no BaseHTTPMiddleware task and
+body re-streaming per request). It records, per route template:
+    http_requests_total, http_request_duration_seconds (histogram),
+    http_request_db_queries_total, http_request_db_seconds_total
+and http_requests_in_progress per method. Queries are timed through
+SQLAlchemy cursor events on the app's engines (instrument_engines). Each
+response carries a Server-Timing header with the time to the response start
+and the request's database and SQL analysis totals (see app.utils.metrics).
+"""
+import time
+from typing import Any
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.utils.metrics import record_timing, registry, start_request_timings
+
+# Label for requests that matched no API route (404s, docs, static)
+OTHER_ROUTE = "other"
+
+requests_total = registry.counter(
+    "http_requests_total", "HTTP requests served.", ["method", "route", "status"]
+)
+request_duration = registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency, including the response body.", ["method", "route"]
+)
+requests_in_progress = registry.gauge(
+    "http_requests_in_progress", "HTTP requests being served.", ["method"]
+)
+request_db_queries = registry.counter(
+    "http_request_db_queries_total", "Database queries run by HTTP requests.", ["method", "route"]
+)
+request_db_seconds = registry.counter(
+    "http_request_db_seconds_total", "Seconds HTTP requests spent in database queries.", ["method", "route"]
+)
+db_query_duration = registry.histogram(
+    "db_query_duration_seconds",
+    "Database query latency (all queries of this process).",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0),
+)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    starts = conn.info.get("query_start")
+    if starts:
+        elapsed = time.perf_counter() - starts.pop()
+        db_query_duration.observe(elapsed)
+        record_timing("db", elapsed)
+
+
+def _query_failed(exception_context) -> None:
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("query_start"):
+        conn.info["query_start"].pop()
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Time every query run through `engine` (a sync Engine)."""
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _query_failed)
+
+
+def instrument_engines() -> None:
+    """Instrument the app's engines (the async one too when configured)."""
+    from app.database import async_engine, engine
+
+    instrument_engine(engine)
+    if async_engine is not None:
+        instrument_engine(async_engine.sync_engine)
+
+
+def route_label(scope: Scope) -> str:
+    """Path template of the API route the request matched (set by routing)."""
+    return getattr(scope.get("route"), "path_format", None) or OTHER_ROUTE
+
+
+def server_timing(timings: dict[str, list], total: float) -> str:
+    parts = [f"app;dur={total * 1000:.1f}"]
+    for name, (seconds, count) in timings.items():
+        parts.append(f'{name};dur={seconds * 1000:.1f};desc="{count}x"')
+    return ", ".join(parts)
+
+
+class MetricsMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        method = scope["method"]
+        start = time.perf_counter()
+        timings = start_request_timings()
+        status: dict[str, Any] = {"code": 500}
+
+        async def send_with_timing(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", server_timing(timings, time.perf_counter() - start))
+            await send(message)
+
+        requests_in_progress.inc(method)
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            requests_in_progress.dec(method)
+            route = route_label(scope)
+            requests_total.inc(method, route, str(status["code"]))
+            request_duration.observe(time.perf_counter() - start, method, route)
+            db = timings.get("db")
+            if db:
+                request_db_seconds.inc(method, route, amount=db[0])
+                request_db_queries.inc(method, route, amount=db[1])
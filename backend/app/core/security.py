@@ -34,9 +34,13 @@ def create_access_token(subject: str | int) -> str:
     return jwt.encode(to_encode, settings.secret_key, algorithm=settings.algorithm)
 
 
-def decode_access_token(token: str) -> Optional[str]:
+def decode_access_token_payload(token: str) -> Optional[dict]:
     try:
-        payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
-        return payload.get("sub")
+        return jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
     except JWTError:
         return None
+
+
+def decode_access_token(token: str) -> Optional[str]:
+    payload = decode_access_token_payload(token)
+    return payload.get("sub") if payload else None
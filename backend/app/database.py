@@ -1,24 +1,88 @@
 """Database connection and session management."""
-from sqlalchemy import create_engine
+from typing import Any, Callable, TypeVar
+
+import anyio
+from sqlalchemy import create_engine, event, inspect, make_url, text
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool, StaticPool
 
 from app.config import settings
 
+_is_sqlite = settings.database_url.startswith("sqlite")
+# In-memory SQLite exists per connection: every session must share one.
+_is_memory = _is_sqlite and make_url(settings.database_url).database in (None, "", ":memory:")
+
 # SQLite needs check_same_thread=False for FastAPI
 connect_args = {}
-if "sqlite" in settings.database_url:
+if _is_sqlite:
     connect_args = {"check_same_thread": False}
 
+
+def _pool_args(queue_pool: type[Pool] = QueuePool) -> dict[str, Any]:
+    if _is_memory:
+        return {"poolclass": StaticPool}
+    return {
+        "poolclass": queue_pool,
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+    }
+
+
+def _sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    """
+    Per-connection SQLite tuning: WAL lets readers run alongside a writer,
+    synchronous=NORMAL is safe under WAL, and busy_timeout makes a writer wait
+    for the lock instead of failing with "database is locked".
+    """
+    cursor = dbapi_connection.cursor()
+    if not _is_memory:
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={int(settings.sqlite_busy_timeout_ms)}")
+    cursor.close()
+
+
 engine = create_engine(
     settings.database_url,
     connect_args=connect_args,
-    poolclass=StaticPool if "sqlite" in settings.database_url else None,
     echo=settings.debug,
+    **_pool_args(),
 )
+if _is_sqlite:
+    event.listen(engine, "connect", _sqlite_pragmas)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+T = TypeVar("T")
+
+# Async drivers for DATABASE_ASYNC=true (aiosqlite / asyncpg are optional installs)
+_ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg", "postgres": "postgresql+asyncpg"}
+
+
+def async_database_url(url: str) -> str:
+    """DATABASE_URL with its sync driver replaced by the async one."""
+    scheme, sep, rest = url.partition("://")
+    return _ASYNC_DRIVERS.get(scheme.split("+")[0], scheme) + sep + rest
+
+
+async_engine = None
+AsyncSessionLocal = None
+if settings.database_async:
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    async_engine = create_async_engine(
+        async_database_url(settings.database_url),
+        connect_args=connect_args,
+        echo=settings.debug,
+        **_pool_args(AsyncAdaptedQueuePool),
+    )
+    if _is_sqlite:
+        event.listen(async_engine.sync_engine, "connect", _sqlite_pragmas)
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 
 class Base(DeclarativeBase):
     """Base class for SQLAlchemy models."""
@@ -34,14 +98,70 @@ def get_db():
         db.close()
 
 
+def with_session(fn: Callable[..., T], *args: Any) -> T:
+    """Call fn(db, *args) with a new session, closed afterwards."""
+    db = SessionLocal()
+    try:
+        return fn(db, *args)
+    finally:
+        db.close()
+
+
+async def run_db(fn: Callable[..., T], *args: Any) -> T:
+    """
+    Run sync ORM code fn(db, *args) from an async handler. With the async
+    engine, its queries are awaited on the event loop (AsyncSession.run_sync)
+    and no worker thread is held; otherwise it runs in the threadpool. Keep fn
+    cheap: CPU-heavy work goes through app.services.offload.
+    """
+    if AsyncSessionLocal is not None:
+        async with AsyncSessionLocal() as session:
+            return await session.run_sync(fn, *args)
+    return await anyio.to_thread.run_sync(with_session, fn, *args)
+
+
+async def dispose_async_engine() -> None:
+    if async_engine is not None:
+        await async_engine.dispose()
+
+
+def _ensure_schema():
+    """
+    Bring tables created by an older version up to date: create_all() skips
+    existing tables, so nullable columns and indexes added to them since are
+    created here. Tables marked info={"rebuildable": True} (caches) are
+    dropped and created again when their columns differ from the model.
+    """
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        columns = {c["name"] for c in inspector.get_columns(table.name)}
+        if table.info.get("rebuildable") and columns != {c.name for c in table.columns}:
+            table.drop(bind=engine)
+            table.create(bind=engine)
+            continue
+        with engine.begin() as conn:
+            for column in table.columns:
+                if column.name not in columns and column.nullable:
+                    col_type = column.type.compile(dialect=engine.dialect)
+                    conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {col_type}'))
+        existing = {ix["name"] for ix in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(bind=engine)
+
+
 def init_db():
     """Create all tables and ensure a default admin user for demo/POC."""
-    from app.models import user, report, analysis  # noqa: F401
+    from app.models import user, report, analysis, sql_cache, kpi, report_index  # noqa: F401
     from app.models.user import User
     from app.core.security import get_password_hash
 
     # Create tables
     Base.metadata.create_all(bind=engine)
+    _ensure_schema()
 
     # Ensure a default admin user exists for demo purposes.
     # Username: admin, Password: Password123
@@ -3,20 +3,31 @@ from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
+from fastapi.responses import PlainTextResponse
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 from app.config import settings
-from app.database import init_db
+from app.core.instrumentation import MetricsMiddleware, instrument_engines
+from app.database import dispose_async_engine, init_db
+from app.services.coe_jobs import recover_coe_jobs, shutdown_coe_jobs
+from app.services.report_index import backfill_pending, shutdown_backfill
+from app.services.worker_pool import shutdown_process_pool
 from app.api import auth, reports, coe, sql_analysis, dashboard
+from app.utils.metrics import registry
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """Initialize DB on startup."""
+    """Initialize DB, resume unfinished COE jobs and index unindexed reports on startup."""
     init_db()
+    recover_coe_jobs()
+    backfill_pending()
     yield
-    # Shutdown if needed
+    shutdown_coe_jobs()
+    shutdown_backfill()
+    shutdown_process_pool()
+    await dispose_async_engine()
 
 
 app = FastAPI(
@@ -35,21 +46,31 @@ _default_origins = [
 _cors_origins = list(dict.fromkeys(_default_origins + settings.cors_origins_list))
 
 
-def _add_cors_headers(response, origin: str):
+def _add_cors_headers(headers: MutableHeaders, origin: str):
     if origin in _cors_origins or "localhost" in origin or "127.0.0.1" in origin or ".vercel.app" in (origin or ""):
-        response.headers["Access-Control-Allow-Origin"] = origin
-    response.headers["Access-Control-Allow-Credentials"] = "true"
-    response.headers["Access-Control-Allow-Methods"] = "GET, POST, PUT, DELETE, OPTIONS"
-    response.headers["Access-Control-Allow-Headers"] = "Content-Type, Authorization"
+        headers["Access-Control-Allow-Origin"] = origin
+    headers["Access-Control-Allow-Credentials"] = "true"
+    headers["Access-Control-Allow-Methods"] = "GET, POST, PUT, DELETE, OPTIONS"
+    headers["Access-Control-Allow-Headers"] = "Content-Type, Authorization"
 
 
-class AddCORSHeadersMiddleware(BaseHTTPMiddleware):
+class AddCORSHeadersMiddleware:
     """Ensure CORS headers are on every response (including errors)."""
-    async def dispatch(self, request: Request, call_next):
-        origin = request.headers.get("origin") or "http://localhost:8090"
-        response = await call_next(request)
-        _add_cors_headers(response, origin)
-        return response
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        origin = Headers(scope=scope).get("origin") or "http://localhost:8090"
+
+        async def send_with_cors(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                _add_cors_headers(MutableHeaders(scope=message), origin)
+            await send(message)
+
+        await self.app(scope, receive, send_with_cors)
 
 
 app.add_middleware(AddCORSHeadersMiddleware)
@@ -62,6 +83,10 @@ app.add_middleware(
     allow_headers=["*"],
     expose_headers=["*"],
 )
+if settings.metrics_enabled:
+    # Added last, so it is outermost and times the other middleware too
+    instrument_engines()
+    app.add_middleware(MetricsMiddleware)
 
 # Include routers
 app.include_router(auth.router, prefix="/api/auth", tags=["auth"])
@@ -79,3 +104,10 @@ async def root():
 @app.get("/health")
 async def health():
     return {"status": "ok"}
+
+
+if settings.metrics_enabled:
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        """Prometheus metrics for this process."""
+        return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
@@ -1,5 +1,11 @@
 from app.models.user import User
 from app.models.report import Report
-from app.models.analysis import COEAnalysis
+from app.models.analysis import COEAnalysis, COEJob, COEReportRow, COEDuplicateGroup
+from app.models.sql_cache import SQLAnalysisCacheEntry
+from app.models.kpi import DashboardKPI
+from app.models.report_index import ReportLSHBand, ReportSimilarityEdge
 
-__all__ = ["User", "Report", "COEAnalysis"]
+__all__ = [
+    "User", "Report", "COEAnalysis", "COEJob", "COEReportRow", "COEDuplicateGroup",
+    "SQLAnalysisCacheEntry", "DashboardKPI", "ReportLSHBand", "ReportSimilarityEdge",
+]
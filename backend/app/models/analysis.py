@@ -1,6 +1,6 @@
 """COE Analysis model."""
 from datetime import datetime
-from sqlalchemy import String, Integer, Float, DateTime, Text, ForeignKey
+from sqlalchemy import String, Integer, Float, Boolean, DateTime, Text, ForeignKey, Index
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.database import Base
@@ -8,6 +8,9 @@ from app.database import Base
 
 class COEAnalysis(Base):
     __tablename__ = "coe_analyses"
+    __table_args__ = (
+        Index("ix_coe_analyses_user_created", "user_id", "created_at"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     filename: Mapped[str] = mapped_column(String(255), nullable=False)
@@ -20,3 +23,65 @@ class COEAnalysis(Base):
     results_json: Mapped[str | None] = mapped_column(Text, nullable=True)
     user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), nullable=False)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+
+class COEReportRow(Base):
+    """One scored report of a COE analysis (position = row order in the CSV)."""
+    __tablename__ = "coe_report_rows"
+    __table_args__ = (
+        Index("ix_coe_report_rows_analysis_position", "analysis_id", "position"),
+        Index("ix_coe_report_rows_analysis_category", "analysis_id", "complexity_category"),
+        Index("ix_coe_report_rows_analysis_owner", "analysis_id", "owner"),
+        Index("ix_coe_report_rows_analysis_score", "analysis_id", "complexity_score"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    analysis_id: Mapped[int] = mapped_column(Integer, ForeignKey("coe_analyses.id", ondelete="CASCADE"), nullable=False)
+    position: Mapped[int] = mapped_column(Integer, nullable=False)
+    report_name: Mapped[str] = mapped_column(String(255), nullable=False)
+    report_id: Mapped[str | None] = mapped_column(String(255), nullable=True)
+    sql: Mapped[str | None] = mapped_column(Text, nullable=True)
+    owner: Mapped[str | None] = mapped_column(String(255), nullable=True)
+    complexity_score: Mapped[float] = mapped_column(Float, nullable=False)
+    complexity_category: Mapped[str] = mapped_column(String(20), nullable=False)
+    estimated_hours: Mapped[float] = mapped_column(Float, nullable=False)
+    fingerprint: Mapped[str | None] = mapped_column(String(64), nullable=True)
+
+
+class COEDuplicateGroup(Base):
+    """One exact or near duplicate group of a COE analysis."""
+    __tablename__ = "coe_duplicate_groups"
+    __table_args__ = (
+        Index("ix_coe_duplicate_groups_analysis_position", "analysis_id", "position"),
+        Index("ix_coe_duplicate_groups_analysis_type", "analysis_id", "type"),
+        Index("ix_coe_duplicate_groups_analysis_similarity", "analysis_id", "similarity"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    analysis_id: Mapped[int] = mapped_column(Integer, ForeignKey("coe_analyses.id", ondelete="CASCADE"), nullable=False)
+    position: Mapped[int] = mapped_column(Integer, nullable=False)
+    type: Mapped[str] = mapped_column(String(20), nullable=False)
+    similarity: Mapped[float] = mapped_column(Float, nullable=False)
+    report_names_json: Mapped[str] = mapped_column(Text, nullable=False, default="[]")
+    recommendation: Mapped[str | None] = mapped_column(String(255), nullable=True)
+
+
+class COEJob(Base):
+    """A queued or running COE analysis; the upload waits on disk until processed."""
+    __tablename__ = "coe_jobs"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    filename: Mapped[str] = mapped_column(String(255), nullable=False)
+    upload_path: Mapped[str] = mapped_column(String(512), nullable=False)
+    exhaustive: Mapped[bool] = mapped_column(Boolean, default=False)
+    status: Mapped[str] = mapped_column(String(20), nullable=False, default="queued", index=True)
+    rows_scored: Mapped[int] = mapped_column(Integer, default=0)
+    pairs_compared: Mapped[int] = mapped_column(Integer, default=0)
+    error: Mapped[str | None] = mapped_column(Text, nullable=True)
+    analysis_id: Mapped[int | None] = mapped_column(Integer, ForeignKey("coe_analyses.id", ondelete="SET NULL"), nullable=True)
+    user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    started_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    finished_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    # Written with progress while running; recovery only takes over stale jobs
+    heartbeat_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
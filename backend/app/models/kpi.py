@@ -0,0 +1,23 @@
+"""Per-user dashboard KPI summary, maintained incrementally."""
+from datetime import datetime
+from sqlalchemy import Integer, Float, DateTime, ForeignKey
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database import Base
+
+
+class DashboardKPI(Base):
+    __tablename__ = "dashboard_kpis"
+
+    user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), primary_key=True)
+    total_reports: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    reports_migrated: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    simple_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    medium_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    complex_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    very_complex_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    total_hours: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    coe_analyses_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    # Bumped on every change; used as the ETag of /api/dashboard/stats
+    version: Mapped[int] = mapped_column(Integer, nullable=False, default=1)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -1,6 +1,6 @@
 """Report model."""
 from datetime import datetime
-from sqlalchemy import String, Integer, Float, Boolean, DateTime, Text, ForeignKey
+from sqlalchemy import String, Integer, Float, Boolean, DateTime, Text, ForeignKey, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.database import Base
@@ -8,6 +8,12 @@ from app.database import Base
 
 class Report(Base):
     __tablename__ = "reports"
+    __table_args__ = (
+        Index("ix_reports_created_by_category", "created_by", "complexity_category"),
+        Index("ix_reports_created_by_migrated", "created_by", "migrated"),
+        Index("ix_reports_created_by_fingerprint", "created_by", "sql_fingerprint"),
+        Index("ix_reports_created_by_source", "created_by", "source_report_id", unique=True),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     name: Mapped[str] = mapped_column(String(255), nullable=False)
@@ -22,3 +28,9 @@ class Report(Base):
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     migrated: Mapped[bool] = mapped_column(Boolean, default=False)
+    # Report id in the COE inventory a report was promoted from
+    source_report_id: Mapped[str | None] = mapped_column(String(255), nullable=True)
+    # SQL features stored at write time by ReportIndexer (tokens NULL = not indexed yet)
+    sql_fingerprint: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    normalized_sql: Mapped[str | None] = mapped_column(Text, nullable=True)
+    sql_tokens_json: Mapped[str | None] = mapped_column(Text, nullable=True)
@@ -0,0 +1,32 @@
+"""Persisted similarity index over a user's reports."""
+from sqlalchemy import BigInteger, Integer, Float, ForeignKey, Index
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database import Base
+
+
+class ReportLSHBand(Base):
+    """One MinHash LSH band bucket of a report's SQL token set."""
+    __tablename__ = "report_lsh_bands"
+    __table_args__ = (
+        Index("ix_report_lsh_bands_lookup", "user_id", "band", "bucket"),
+    )
+
+    report_id: Mapped[int] = mapped_column(Integer, ForeignKey("reports.id", ondelete="CASCADE"), primary_key=True)
+    band: Mapped[int] = mapped_column(Integer, primary_key=True)
+    bucket: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), nullable=False)
+
+
+class ReportSimilarityEdge(Base):
+    """Two reports (report_a < report_b) whose SQL similarity reaches the threshold."""
+    __tablename__ = "report_similarity_edges"
+    __table_args__ = (
+        Index("ix_report_similarity_edges_user", "user_id"),
+        Index("ix_report_similarity_edges_report_b", "report_b"),
+    )
+
+    report_a: Mapped[int] = mapped_column(Integer, ForeignKey("reports.id", ondelete="CASCADE"), primary_key=True)
+    report_b: Mapped[int] = mapped_column(Integer, ForeignKey("reports.id", ondelete="CASCADE"), primary_key=True)
+    similarity: Mapped[float] = mapped_column(Float, nullable=False)
+    user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), nullable=False)
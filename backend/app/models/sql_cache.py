@@ -0,0 +1,22 @@
+"""Persistent tier of the SQL analysis cache."""
+from datetime import datetime
+from sqlalchemy import String, Integer, Boolean, DateTime, Text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database import Base
+
+
+class SQLAnalysisCacheEntry(Base):
+    """Parsed features of one SQL text, keyed by the hash of the raw text."""
+    __tablename__ = "sql_analysis_cache"
+    # Only holds what can be parsed again: dropped and recreated when its columns change
+    __table_args__ = {"info": {"rebuildable": True}}
+
+    sql_hash: Mapped[str] = mapped_column(String(64), primary_key=True)
+    fingerprint: Mapped[str] = mapped_column(String(64), nullable=False)
+    normalized: Mapped[str] = mapped_column(Text, nullable=False, default="")
+    token_set_json: Mapped[str] = mapped_column(Text, nullable=False, default="[]")
+    keywords_json: Mapped[str] = mapped_column(Text, nullable=False, default="{}")
+    statement_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    parse_error: Mapped[bool] = mapped_column(Boolean, default=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
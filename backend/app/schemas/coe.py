@@ -28,3 +28,16 @@ class COEAnalysisRecord(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class COEJobStatus(BaseModel):
+    job_id: int
+    filename: str
+    status: str
+    rows_scored: int = 0
+    pairs_compared: int = 0
+    error: Optional[str] = None
+    analysis_id: Optional[int] = None
+    created_at: Optional[str] = None
+    started_at: Optional[str] = None
+    finished_at: Optional[str] = None
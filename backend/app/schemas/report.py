@@ -36,6 +36,7 @@ class ReportResponse(BaseModel):
     complexity_category: Optional[str] = None
     estimated_hours: Optional[float] = None
     source_system: Optional[str] = None
+    source_report_id: Optional[str] = None
     created_by: int
     migrated: bool
 
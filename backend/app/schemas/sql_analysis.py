@@ -1,7 +1,9 @@
 """SQL analysis request/response schemas."""
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional, List, Any
 
+from app.config import settings
+
 
 class SQLAnalyzeRequest(BaseModel):
     sql_query: str
@@ -10,3 +12,20 @@ class SQLAnalyzeRequest(BaseModel):
 class SQLCompareRequest(BaseModel):
     sql1: str
     sql2: str
+
+
+class SQLBatchAnalyzeRequest(BaseModel):
+    queries: List[str] = Field(..., max_length=settings.sql_batch_max_items)
+    # Parse on the shared process pool (settings.coe_workers > 1)
+    parallel: bool = False
+
+
+class SQLBatchCompareRequest(BaseModel):
+    pairs: List[SQLCompareRequest] = Field(..., max_length=settings.sql_batch_max_items)
+    parallel: bool = False
+
+
+class SQLSimilarRequest(BaseModel):
+    sql_query: str
+    top_k: int = Field(10, ge=1, le=100)
+    min_similarity: float = Field(0.0, ge=0, le=100)
@@ -0,0 +1,162 @@
+"""Content-addressed SQL analysis cache.
+
+Parsed SQL is keyed by the SHA-256 of the raw text, so the same query reused
+across reports, uploads and analyze calls is parsed once. Entries live in a
+bounded in-process LRU; with ANALYSIS_CACHE_PERSISTENT=true the parsed
+features are also stored in the app database, keyed by the same hash, so they
+survive restarts and are shared between workers. Scores are not stored: they
+are computed from the restored features (score_complexity), which costs far
+less than the parse the cache saves.
+"""
+import hashlib
+import json
+import logging
+from concurrent.futures import Executor
+from typing import Any
+
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.sql_cache import SQLAnalysisCacheEntry
+from app.services.worker_pool import chunked, imap_ordered, parse_chunk
+from app.utils.cache import LRUCache
+from app.utils.sql_parser import ParsedSQL
+
+logger = logging.getLogger(__name__)
+
+# Keys per IN (...) lookup against the persistent tier
+_DB_BATCH = 500
+
+
+def sql_hash(sql: str) -> str:
+    return hashlib.sha256((sql or "").encode()).hexdigest()
+
+
+def _weigh(parsed: ParsedSQL) -> int:
+    """Rough size in bytes: raw and normalized text plus the token set."""
+    return 2 * (len(parsed.sql) + len(parsed.normalized)) + 64 * len(parsed.token_set) + 512
+
+
+_memory = LRUCache(
+    settings.analysis_cache_size,
+    max_weight=settings.analysis_cache_max_mb * 1024 * 1024,
+    weigh=_weigh,
+)
+_persistent_stats = {"hits": 0, "misses": 0, "writes": 0, "errors": 0}
+
+
+def get_parsed(sql: str) -> ParsedSQL:
+    """ParsedSQL for one query, from cache when possible."""
+    return parse_many([sql])[0]
+
+
+def parse_many(
+    sqls: list[str],
+    pool: Executor | None = None,
+    chunk_size: int | None = None,
+) -> list[ParsedSQL]:
+    """
+    ParsedSQL for each query (same order); each distinct text is parsed at most
+    once. Cache misses are parsed in chunks on `pool` when one is given.
+    """
+    sqls = [s or "" for s in sqls]
+    keys = [sql_hash(s) for s in sqls]
+    found: dict[str, ParsedSQL] = {}
+    missing: dict[str, str] = {}
+    for key, sql in zip(keys, sqls):
+        if key in found or key in missing:
+            continue
+        parsed = _memory.get(key)
+        if parsed is None:
+            missing[key] = sql
+        else:
+            found[key] = parsed
+    if missing and settings.analysis_cache_persistent:
+        for key, parsed in _load_persistent(missing).items():
+            found[key] = parsed
+            _memory.set(key, parsed)
+            del missing[key]
+    if missing:
+        chunks = chunked(missing.values(), chunk_size or settings.coe_chunk_size)
+        parsed_chunks = imap_ordered(parse_chunk, chunks, pool=pool)
+        fresh = dict(zip(missing, (p for chunk in parsed_chunks for p in chunk)))
+        for key, parsed in fresh.items():
+            found[key] = parsed
+            _memory.set(key, parsed)
+        if settings.analysis_cache_persistent:
+            _store_persistent(fresh)
+    return [found[key] for key in keys]
+
+
+def _load_persistent(missing: dict[str, str]) -> dict[str, ParsedSQL]:
+    loaded: dict[str, ParsedSQL] = {}
+    keys = list(missing)
+    try:
+        with SessionLocal() as db:
+            for i in range(0, len(keys), _DB_BATCH):
+                rows = db.execute(
+                    select(SQLAnalysisCacheEntry).where(
+                        SQLAnalysisCacheEntry.sql_hash.in_(keys[i:i + _DB_BATCH])
+                    )
+                ).scalars()
+                for row in rows:
+                    loaded[row.sql_hash] = ParsedSQL.restore(
+                        missing[row.sql_hash],
+                        normalized=row.normalized,
+                        fingerprint=row.fingerprint,
+                        token_set=frozenset(json.loads(row.token_set_json)),
+                        keywords=json.loads(row.keywords_json),
+                        statement_count=row.statement_count,
+                        parse_error=bool(row.parse_error),
+                    )
+    except Exception:
+        _persistent_stats["errors"] += 1
+        logger.warning("Analysis cache lookup failed", exc_info=True)
+    _persistent_stats["hits"] += len(loaded)
+    _persistent_stats["misses"] += len(missing) - len(loaded)
+    return loaded
+
+
+def _store_persistent(fresh: dict[str, ParsedSQL]) -> None:
+    rows = [
+        {
+            "sql_hash": key,
+            "fingerprint": parsed.fingerprint,
+            "normalized": parsed.normalized,
+            "token_set_json": json.dumps(sorted(parsed.token_set)),
+            "keywords_json": json.dumps(dict(parsed.keywords)),
+            "statement_count": parsed.statement_count,
+            "parse_error": parsed.parse_error,
+        }
+        for key, parsed in fresh.items()
+    ]
+    try:
+        with SessionLocal() as db:
+            try:
+                db.bulk_insert_mappings(SQLAnalysisCacheEntry, rows)
+                db.commit()
+            except IntegrityError:
+                # Another worker stored some of these first; keep whichever exists.
+                db.rollback()
+                for row in rows:
+                    db.merge(SQLAnalysisCacheEntry(**row))
+                db.commit()
+        _persistent_stats["writes"] += len(rows)
+    except Exception:
+        _persistent_stats["errors"] += 1
+        logger.warning("Analysis cache write failed", exc_info=True)
+
+
+def cache_stats() -> dict[str, Any]:
+    """Hit/miss counters for both tiers."""
+    return {
+        "memory": _memory.stats(),
+        "persistent": {"enabled": settings.analysis_cache_persistent, **_persistent_stats},
+    }
+
+
+def clear_cache() -> None:
+    """Drop the in-process tier (the persistent tier is left untouched)."""
+    _memory.clear()
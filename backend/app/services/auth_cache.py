@@ -0,0 +1,100 @@
+"""Caches for resolving the authenticated user of a request.
+
+Decoded tokens are cached by the token string (never past the token's own
+expiry), so a client reusing its bearer token skips HS256 verification; users
+are cached by username as detached rows and merged into the request session
+without a query. User rows updated or deleted through the ORM are dropped
+when the transaction commits; the user TTL bounds staleness from writes made
+elsewhere (other processes, raw SQL).
+"""
+import time
+from typing import Any
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.core.security import decode_access_token_payload
+from app.models.user import User
+from app.utils.cache import LRUCache
+
+# token -> (subject, expiry as a unix timestamp)
+_tokens = LRUCache(settings.auth_token_cache_size, ttl=settings.auth_token_cache_ttl)
+# username -> detached User
+_users = LRUCache(settings.auth_user_cache_size, ttl=settings.auth_user_cache_ttl)
+
+
+def token_subject(token: str) -> str | None:
+    """Subject of a valid, unexpired token, else None."""
+    cached = _tokens.get(token)
+    if cached is not None:
+        subject, expires = cached
+        if expires > time.time():
+            return subject
+        _tokens.pop(token)
+        return None
+    payload = decode_access_token_payload(token)
+    subject = payload.get("sub") if payload else None
+    if subject is None:
+        return None
+    _tokens.set(token, (subject, payload.get("exp", float("inf"))))
+    return subject
+
+
+def cached_user(username: str) -> User | None:
+    """Cached detached user, or None on a miss. Treat it as read-only."""
+    return _users.get(username)
+
+
+def load_user(db: Session, username: str) -> User | None:
+    """Query a user and cache it, detached from `db`."""
+    user = db.query(User).filter(User.username == username).first()
+    if user is None:
+        return None
+    # Detach before the request can commit and expire it.
+    db.expunge(user)
+    _users.set(username, user)
+    return user
+
+
+def resolve_user(db: Session, username: str) -> User | None:
+    """The user named `username`, attached to `db`; queried only on a cache miss."""
+    cached = cached_user(username) or load_user(db, username)
+    return db.merge(cached, load=False) if cached is not None else None
+
+
+def invalidate_user(username: str) -> None:
+    """Drop a cached user (e.g. after deactivating it outside the ORM)."""
+    _users.pop(username)
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _user_changed(mapper, connection, target: User) -> None:
+    session = inspect(target).session
+    if session is None:
+        return
+    names = session.info.setdefault("auth_changed_users", set())
+    names.add(target.username)
+    # A renamed user is cached under its old name.
+    names.update(inspect(target).attrs.username.history.deleted or ())
+
+
+@event.listens_for(Session, "after_commit")
+def _drop_committed(session: Session) -> None:
+    for username in session.info.pop("auth_changed_users", ()):
+        _users.pop(username)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back(session: Session) -> None:
+    session.info.pop("auth_changed_users", None)
+
+
+def auth_cache_stats() -> dict[str, Any]:
+    return {"tokens": _tokens.stats(), "users": _users.stats()}
+
+
+def clear_auth_cache() -> None:
+    _tokens.clear()
+    _users.clear()
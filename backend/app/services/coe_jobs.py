@@ -0,0 +1,193 @@
+"""Background COE analysis jobs.
+
+Uploads are spooled to settings.coe_job_dir and recorded as COEJob rows; a
+small thread pool runs analyze_coe_stream on them, writing progress to the
+row as it goes. The coe_jobs table is the queue: jobs still queued or running
+when the server stops are picked up again by recover_coe_jobs() at startup.
+Status changes that decide who runs a job are conditional updates, so with
+several server processes each job runs once.
+"""
+import logging
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import BinaryIO
+
+from sqlalchemy import or_, update
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.analysis import COEJob
+from app.services.coe_processor import analyze_coe_stream
+from app.services.coe_results import save_coe_analysis
+
+logger = logging.getLogger(__name__)
+
+# Minimum seconds between progress writes for one job
+_PROGRESS_INTERVAL = 1.0
+
+_executor: ThreadPoolExecutor | None = None
+_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=max(1, settings.coe_job_workers),
+                thread_name_prefix="coe-job",
+            )
+        return _executor
+
+
+def shutdown_coe_jobs() -> None:
+    """Stop the job threads; unfinished jobs stay in the table for recovery."""
+    global _executor
+    with _lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def submit_coe_job(
+    db: Session,
+    upload: BinaryIO,
+    filename: str,
+    user_id: int,
+    exhaustive: bool = False,
+) -> COEJob:
+    """Spool the upload to disk, record a queued job and schedule it."""
+    os.makedirs(settings.coe_job_dir, exist_ok=True)
+    job = COEJob(filename=filename, upload_path="", exhaustive=exhaustive, user_id=user_id)
+    db.add(job)
+    db.flush()
+    job.upload_path = os.path.join(settings.coe_job_dir, f"coe_job_{job.id}.csv")
+    try:
+        with open(job.upload_path, "wb") as out:
+            shutil.copyfileobj(upload, out)
+    except Exception:
+        db.rollback()
+        raise
+    db.commit()
+    db.refresh(job)
+    _get_executor().submit(run_coe_job, job.id)
+    return job
+
+
+def run_coe_job(job_id: int) -> None:
+    """Process one job to completion (worker thread entry point)."""
+    db = SessionLocal()
+    upload_path = None
+    try:
+        now = datetime.utcnow()
+        # Finished, or claimed by another thread or process
+        if not _set_status(
+            db, job_id, "queued", status="running", started_at=now, heartbeat_at=now, rows_scored=0, pairs_compared=0
+        ):
+            return
+        job = db.get(COEJob, job_id)
+        upload_path = job.upload_path
+
+        last_write = 0.0
+        counts = [0, 0]
+
+        def progress(rows_scored: int, pairs_compared: int) -> None:
+            nonlocal last_write
+            counts[:] = rows_scored, pairs_compared
+            now = time.monotonic()
+            if now - last_write < _PROGRESS_INTERVAL:
+                return
+            last_write = now
+            job.rows_scored, job.pairs_compared = counts
+            job.heartbeat_at = datetime.utcnow()
+            db.commit()
+
+        try:
+            with open(job.upload_path, "rb") as stream:
+                result = analyze_coe_stream(
+                    stream, job.filename, exhaustive=job.exhaustive, progress=progress
+                )
+            record = save_coe_analysis(db, result, job.filename, job.user_id)
+            job.rows_scored, job.pairs_compared = result.report_count, counts[1]
+            _finish(db, job, "completed", analysis_id=record.id)
+        except Exception as e:
+            db.rollback()
+            logger.warning("COE job %s failed", job_id, exc_info=True)
+            _finish(db, job, "failed", error=str(e))
+    except Exception:
+        logger.exception("COE job %s crashed", job_id)
+    finally:
+        db.close()
+        # The upload is only read once: a failed job is not retried from it.
+        if upload_path:
+            _remove_upload(upload_path)
+
+
+def _set_status(db: Session, job_id: int, current: str, *conditions, **values) -> bool:
+    """Update the job only if its status is still `current`; returns whether it was."""
+    result = db.execute(
+        update(COEJob)
+        .where(COEJob.id == job_id, COEJob.status == current, *conditions)
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return result.rowcount == 1
+
+
+def _finish(db: Session, job: COEJob, status: str, error: str | None = None, analysis_id: int | None = None) -> None:
+    job.status = status
+    job.error = error
+    job.analysis_id = analysis_id
+    job.finished_at = datetime.utcnow()
+    db.commit()
+
+
+def _remove_upload(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def recover_coe_jobs() -> int:
+    """
+    Resubmit jobs left behind by a stopped process; returns the count. Queued
+    jobs are submitted as they are: run_coe_job claims each one once, even if
+    a live process submitted it too. A running job is only taken back when
+    its heartbeat is older than settings.coe_job_stale_seconds, and only by
+    the process whose update moves it back to queued.
+    """
+    db = SessionLocal()
+    try:
+        stale = or_(
+            COEJob.heartbeat_at.is_(None),
+            COEJob.heartbeat_at < datetime.utcnow() - timedelta(seconds=settings.coe_job_stale_seconds),
+        )
+        jobs = (
+            db.query(COEJob.id, COEJob.status, COEJob.upload_path)
+            .filter(or_(COEJob.status == "queued", (COEJob.status == "running") & stale))
+            .order_by(COEJob.id)
+            .all()
+        )
+        recovered = 0
+        for job_id, status, upload_path in jobs:
+            if status == "running" and not _set_status(db, job_id, "running", stale, status="queued"):
+                continue
+            if not os.path.exists(upload_path):
+                _set_status(
+                    db, job_id, "queued",
+                    status="failed", error="Upload no longer available", finished_at=datetime.utcnow(),
+                )
+                continue
+            _get_executor().submit(run_coe_job, job_id)
+            recovered += 1
+        return recovered
+    finally:
+        db.close()
+
@@ -1,17 +1,22 @@
 """COE CSV processor: complexity scoring, duplicate detection, effort estimation."""
 import io
 import json
-from collections import defaultdict
-from typing import Any
+from collections import deque
+from typing import Any, BinaryIO, Callable, Iterator
 
 import pandas as pd
 
+from app.config import settings
+from app.services.analysis_cache import parse_many
+from app.services.coe_table import COEReportTable, COEResult
+from app.services.worker_pool import chunked, get_process_pool, imap_ordered, similarity_chunk
+from app.utils.minhash import candidate_pairs, min_jaccard_for_threshold
 from app.utils.sql_parser import (
-    calculate_complexity_score,
-    complexity_category,
-    estimate_migration_hours,
-    generate_sql_fingerprint,
-    sql_similarity_percent,
+    ParsedSQL,
+    complexity_categories,
+    jaccard_similarity,
+    migration_hours,
+    score_complexity,
 )
 
 # Expected CSV columns (handoff)
@@ -36,149 +41,226 @@ COL_ALIASES = {
     "owner": REPORT_OWNER,
 }
 
+# Combined similarity (percent) at which two reports count as near duplicates
+NEAR_DUPLICATE_THRESHOLD = 85
 
-def _normalize_columns(df: pd.DataFrame) -> pd.DataFrame:
-    """Map columns to standard names if possible."""
+
+# Columns the analysis reads (after alias mapping); everything else is skipped
+# while parsing the CSV
+_USED_COLUMNS = {QUERY_SQL, REPORT_NAME, REPORT_ID, REPORT_OWNER, "SQL", "sql", "Name", "name", "Report"}
+
+
+def _column_map(columns) -> dict:
+    """Map column names to standard names if possible."""
     col_map = {}
-    for c in df.columns:
+    for c in columns:
         key = (c or "").strip().lower()
-        if key in COL_ALIASES:
-            col_map[c] = COL_ALIASES[key]
-        else:
-            col_map[c] = c
-    return df.rename(columns=col_map)
+        col_map[c] = COL_ALIASES.get(key, c)
+    return col_map
+
+
+def _normalize_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """Map columns to standard names if possible."""
+    return df.rename(columns=_column_map(df.columns))
 
 
-def _sql_column(df: pd.DataFrame) -> str | None:
+def _used_column(name: str) -> bool:
+    return _column_map([name])[name] in _USED_COLUMNS
+
+
+def _sql_column(columns: list[str]) -> str | None:
     for candidate in [QUERY_SQL, "Query SQL", "SQL", "sql"]:
-        if candidate in df.columns:
+        if candidate in columns:
             return candidate
     return None
 
 
-def _name_column(df: pd.DataFrame) -> str | None:
+def _name_column(columns: list[str]) -> str | None:
     for candidate in [REPORT_NAME, "Report Name", "Name", "name"]:
-        if candidate in df.columns:
+        if candidate in columns:
             return candidate
     return None
 
 
-def process_coe_csv(content: bytes, filename: str) -> dict[str, Any]:
+def _near_duplicate_pairs(unique_parsed: list[ParsedSQL], exhaustive: bool = False):
+    """
+    Yield (i, j) index pairs of unique reports worth a full similarity score.
+    Exhaustive mode yields every pair; otherwise MinHash/LSH candidates whose
+    exact token Jaccard can still reach NEAR_DUPLICATE_THRESHOLD.
+    """
+    if exhaustive:
+        for i in range(len(unique_parsed)):
+            for j in range(i + 1, len(unique_parsed)):
+                yield i, j
+        return
+    token_sets = [p.token_set for p in unique_parsed]
+    min_jaccard = min_jaccard_for_threshold(NEAR_DUPLICATE_THRESHOLD)
+    for i, j in candidate_pairs(token_sets):
+        if jaccard_similarity(token_sets[i], token_sets[j]) >= min_jaccard:
+            yield i, j
+
+
+def _near_duplicate_hits(
+    unique_parsed: list[ParsedSQL],
+    pairs,
+    pool=None,
+    on_chunk: Callable[[int], None] | None = None,
+):
+    """
+    Yield (i, j, similarity) for pairs reaching NEAR_DUPLICATE_THRESHOLD, in
+    pair order. Pairs are scored in chunks, on the process pool when given;
+    on_chunk(n) is called as each chunk of n pairs is done.
+    """
+    sizes: deque[int] = deque()
+
+    def tasks():
+        for chunk in chunked(pairs, settings.coe_chunk_size):
+            involved = {k: unique_parsed[k] for pair in chunk for k in pair}
+            sizes.append(len(chunk))
+            yield chunk, involved, NEAR_DUPLICATE_THRESHOLD
+
+    for hits in imap_ordered(similarity_chunk, tasks(), pool=pool):
+        # Results come back in submission order, so the oldest size is this chunk's.
+        done = sizes.popleft()
+        if on_chunk:
+            on_chunk(done)
+        yield from hits
+
+
+class MissingSQLColumnError(ValueError):
+    """The CSV has no column recognised as the report SQL."""
+
+
+def iter_coe_rows(stream: BinaryIO) -> Iterator[list[tuple[str, str, str, str]]]:
+    """
+    Read a COE CSV from `stream` in chunks of settings.coe_csv_chunk_rows rows,
+    keeping only the columns the analysis uses, and yield each chunk as a list
+    of (name, report_id, sql, owner). Raises MissingSQLColumnError on the first
+    chunk when no SQL column is present.
+    """
+    # All cells as text: types inferred per chunk could differ between chunks.
+    reader = pd.read_csv(
+        stream,
+        chunksize=settings.coe_csv_chunk_rows,
+        dtype=str,
+        usecols=_used_column,
+    )
+    positions = None
+    for chunk in reader:
+        if positions is None:
+            # Column layout is the same for every chunk: resolve it once.
+            columns = list(_column_map(chunk.columns).values())
+            sql_col = _sql_column(columns)
+            if sql_col is None:
+                raise MissingSQLColumnError("No SQL column found. Expected 'Query SQL' or similar.")
+            name_col = _name_column(columns) or "Report"
+            positions = [
+                columns.index(c) if c in columns else None
+                for c in (sql_col, name_col, REPORT_OWNER, REPORT_ID)
+            ]
+        sql_values, name_values, owner_values, id_values = (
+            chunk.iloc[:, pos].tolist() if pos is not None else [None] * len(chunk)
+            for pos in positions
+        )
+        rows = []
+        for idx, sql, name, owner, report_id in zip(
+            chunk.index, sql_values, name_values, owner_values, id_values
+        ):
+            sql = "" if pd.isna(sql) else str(sql).strip()
+            name = str(name if positions[1] is not None else f"Report_{idx}").strip()
+            owner = str(owner).strip() if positions[2] is not None else ""
+            report_id = str(report_id) if positions[3] is not None else str(idx)
+            rows.append((name, report_id, sql, owner))
+        yield rows
+
+
+def process_coe_csv(
+    content: bytes,
+    filename: str,
+    exhaustive: bool = False,
+    workers: int | None = None,
+) -> dict[str, Any]:
+    """Analyze COE CSV content held in memory (see process_coe_stream)."""
+    return process_coe_stream(io.BytesIO(content), filename, exhaustive=exhaustive, workers=workers)
+
+
+def process_coe_stream(
+    stream: BinaryIO,
+    filename: str,
+    exhaustive: bool = False,
+    workers: int | None = None,
+    progress: Callable[[int, int], None] | None = None,
+) -> dict[str, Any]:
     """
     Parse COE CSV and return analysis: complexity distribution, duplicates,
-    total hours, top complex, by owner.
+    total hours, top complex, by owner. The JSON form of analyze_coe_stream();
+    an {"error": ...} dict when the CSV has no SQL column.
+    """
+    try:
+        result = analyze_coe_stream(stream, filename, exhaustive, workers, progress)
+    except MissingSQLColumnError as e:
+        return {"error": str(e), "report_count": 0}
+    return result.as_dict()
+
+
+def analyze_coe_stream(
+    stream: BinaryIO,
+    filename: str,
+    exhaustive: bool = False,
+    workers: int | None = None,
+    progress: Callable[[int, int], None] | None = None,
+) -> COEResult:
+    """
+    Analyze a COE CSV into a columnar COEResult (see app.services.coe_table).
+    The CSV is read from `stream` in chunks (see iter_coe_rows) and scored
+    chunk by chunk, each chunk's SQL column at once (score_complexity);
+    per-report data is kept as table columns, not dicts.
+    Near duplicates are found through an LSH candidate index, which finds the
+    same pairs as the full pairwise scan with very high probability (see
+    app.utils.minhash); exhaustive=True forces the full scan for exact results.
+    Parsing and pair scoring run on a process pool of `workers` processes
+    (default settings.coe_workers); output is identical to the serial path.
+    progress(rows_scored, pairs_compared), when given, is called after each
+    CSV chunk and each scored chunk of candidate pairs. Raises
+    MissingSQLColumnError when the CSV has no SQL column.
     """
-    df = pd.read_csv(io.BytesIO(content))
-    df = _normalize_columns(df)
-    sql_col = _sql_column(df)
-    name_col = _name_column(df) or "Report"
-    if sql_col is None:
-        return {
-            "error": "No SQL column found. Expected 'Query SQL' or similar.",
-            "report_count": 0,
-        }
-
-    reports = []
-    for idx, row in df.iterrows():
-        sql = row.get(sql_col)
-        if pd.isna(sql):
-            sql = ""
-        sql = str(sql).strip()
-        name = str(row.get(name_col, f"Report_{idx}")).strip()
-        owner = str(row.get(REPORT_OWNER, "")).strip() if REPORT_OWNER in df.columns else ""
-        score = calculate_complexity_score(sql)
-        cat = complexity_category(score)
-        hours = estimate_migration_hours(score)
-        fingerprint = generate_sql_fingerprint(sql) if sql else ""
-        reports.append({
-            "report_name": name,
-            "report_id": str(row.get(REPORT_ID, idx)) if REPORT_ID in df.columns else str(idx),
-            "sql": sql,
-            "owner": owner,
-            "complexity_score": score,
-            "complexity_category": cat,
-            "estimated_hours": hours,
-            "fingerprint": fingerprint,
-        })
-
-    # Complexity distribution
-    dist = defaultdict(int)
-    for r in reports:
-        dist[r["complexity_category"]] += 1
-    complexity_distribution = dict(dist)
-
-    # Duplicate groups by fingerprint (exact) and by similarity (>= 85%)
-    fingerprint_groups = defaultdict(list)
-    for r in reports:
-        if r["fingerprint"]:
-            fingerprint_groups[r["fingerprint"]].append(r)
-
-    exact_duplicate_groups = [
-        {"reports": g, "similarity": 100, "type": "EXACT"}
-        for g in fingerprint_groups.values()
-        if len(g) > 1
-    ]
+    pool = get_process_pool(workers)
+    table = COEReportTable()
+    # First report of each fingerprint, in first-seen order
+    parsed_by_fp: dict[str, ParsedSQL] = {}
+    unique_rows: list[int] = []
+    for rows in iter_coe_rows(stream):
+        # Repeated SQL (within this file or from earlier uploads) is parsed once
+        parsed_rows = parse_many([sql for _, _, sql, _ in rows], pool=pool)
+        _, scores = score_complexity(parsed_rows)
+        for (name, report_id, sql, owner), parsed, score, category, hours in zip(
+            rows, parsed_rows, scores.tolist(), complexity_categories(scores), migration_hours(scores).tolist()
+        ):
+            fingerprint = parsed.fingerprint if sql else ""
+            if fingerprint and fingerprint not in parsed_by_fp:
+                parsed_by_fp[fingerprint] = parsed
+                unique_rows.append(len(table))
+            table.append(name, report_id, sql, owner, score, category, hours, fingerprint)
+        if progress:
+            progress(len(table), 0)
 
     # Near duplicates: unique by fingerprint, then pairwise similarity >= 85%
-    unique_by_fp = {fp: group[0] for fp, group in fingerprint_groups.items()}
-    unique_list = list(unique_by_fp.values())
-    near_duplicate_groups = []
+    unique_parsed = list(parsed_by_fp.values())
+    near_pairs: list[tuple[int, int, float]] = []
     seen_pairs = set()
-    for i, r1 in enumerate(unique_list):
-        for r2 in unique_list[i + 1 :]:
-            if not r1.get("sql") or not r2.get("sql"):
-                continue
-            sim = sql_similarity_percent(r1["sql"], r2["sql"])
-            if sim >= 85 and sim < 100:
-                pair_key = tuple(sorted([r1["report_name"], r2["report_name"]]))
-                if pair_key not in seen_pairs:
-                    seen_pairs.add(pair_key)
-                    near_duplicate_groups.append({
-                        "reports": [r1, r2],
-                        "similarity": round(sim, 1),
-                        "type": "NEAR_DUPLICATE",
-                    })
-
-    total_hours = sum(r["estimated_hours"] for r in reports)
-    total_duplicates = sum(max(0, len(g["reports"]) - 1) for g in exact_duplicate_groups)
-    total_duplicates += len(near_duplicate_groups)  # approximate
-
-    # Top 10 most complex
-    sorted_by_complexity = sorted(reports, key=lambda x: -x["complexity_score"])[:10]
-
-    # By owner
-    by_owner = defaultdict(list)
-    for r in reports:
-        by_owner[r.get("owner") or "Unknown"].append(r["report_name"])
-    reports_by_owner = {k: len(v) for k, v in by_owner.items()}
-
-    duplicate_groups = exact_duplicate_groups + near_duplicate_groups
-
-    return {
-        "report_count": len(reports),
-        "unique_count": len(unique_list),
-        "duplicate_count": int(total_duplicates),
-        "complexity_distribution": complexity_distribution,
-        "total_estimated_hours": round(total_hours, 1),
-        "avg_complexity": round(sum(r["complexity_score"] for r in reports) / len(reports), 1) if reports else 0,
-        "duplicate_groups": [
-            {
-                "similarity": g["similarity"],
-                "type": g["type"],
-                "report_names": [x["report_name"] for x in g["reports"]],
-                "recommendation": "Consolidate into single parameterized report" if g["similarity"] >= 95 else "Review for consolidation",
-            }
-            for g in duplicate_groups
-        ],
-        "top_complex_reports": [
-            {
-                "report_name": r["report_name"],
-                "complexity_score": r["complexity_score"],
-                "complexity_category": r["complexity_category"],
-                "estimated_hours": r["estimated_hours"],
-            }
-            for r in sorted_by_complexity
-        ],
-        "reports_by_owner": reports_by_owner,
-        "reports": reports,
-    }
+    pairs_compared = 0
+
+    def on_chunk(n: int) -> None:
+        nonlocal pairs_compared
+        pairs_compared += n
+        progress(len(table), pairs_compared)
+
+    pairs = _near_duplicate_pairs(unique_parsed, exhaustive)
+    for i, j, sim in _near_duplicate_hits(unique_parsed, pairs, pool, on_chunk if progress else None):
+        a, b = unique_rows[i], unique_rows[j]
+        if sim < 100:
+            pair_key = tuple(sorted([table.names[a], table.names[b]]))
+            if pair_key not in seen_pairs:
+                seen_pairs.add(pair_key)
+                near_pairs.append((a, b, sim))
+    return COEResult(table, near_pairs)
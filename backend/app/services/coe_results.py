@@ -0,0 +1,340 @@
+"""Storage and paged reads of COE analysis results.
+
+COEAnalysis.results_json keeps the summary (counts, distribution, top complex,
+by owner); per-report rows and duplicate groups go to their own indexed
+tables so a page of a large analysis is read without loading the rest.
+Analyses stored before the split (everything in results_json) are moved into
+the tables the first time they are read. promote_coe_analysis() turns an
+analysis' report rows into tracked Report rows.
+"""
+import json
+from typing import Any, Iterable
+
+from sqlalchemy import String, cast, delete, exists, func, insert, select
+from sqlalchemy.orm import Session
+
+from app.models.analysis import COEAnalysis, COEDuplicateGroup, COEReportRow
+from app.models.report import Report
+from app.services.coe_table import COEResult
+from app.services.dashboard_kpis import add_reports_kpis, adjust_coe_kpis, report_contribution
+from app.services.report_index import schedule_backfill
+from app.services.worker_pool import chunked
+
+# Rows per executemany when storing an analysis
+_INSERT_BATCH = 2000
+
+# Sortable columns for report pages ("-" prefix = descending)
+REPORT_SORT_FIELDS = {
+    "position": COEReportRow.position,
+    "report_name": COEReportRow.report_name,
+    "owner": COEReportRow.owner,
+    "complexity_score": COEReportRow.complexity_score,
+    "estimated_hours": COEReportRow.estimated_hours,
+}
+GROUP_SORT_FIELDS = {
+    "position": COEDuplicateGroup.position,
+    "similarity": COEDuplicateGroup.similarity,
+}
+
+# Keys moved out of results_json into the row tables
+_ROW_KEYS = ("reports", "duplicate_groups")
+
+
+def save_coe_analysis(
+    db: Session, result: COEResult | dict[str, Any], filename: str, user_id: int
+) -> COEAnalysis:
+    """
+    Persist an analysis result (columnar, or its JSON form): summary row plus
+    report and group rows.
+    """
+    if isinstance(result, COEResult):
+        summary = result.summary()
+        reports, groups = result.table.iter_reports(), result.duplicate_groups()
+    else:
+        summary = _summary(result)
+        reports, groups = result.get("reports") or [], result.get("duplicate_groups") or []
+    record = COEAnalysis(
+        filename=filename,
+        report_count=summary.get("report_count"),
+        duplicate_count=summary.get("duplicate_count"),
+        unique_count=summary.get("unique_count"),
+        avg_complexity=summary.get("avg_complexity"),
+        total_estimated_hours=summary.get("total_estimated_hours"),
+        results_json=json.dumps(summary),
+        user_id=user_id,
+    )
+    db.add(record)
+    db.flush()
+    _insert_rows(db, record.id, reports, groups)
+    adjust_coe_kpis(db, user_id, 1)
+    db.commit()
+    db.refresh(record)
+    return record
+
+
+def _summary(result: dict[str, Any]) -> dict[str, Any]:
+    return {k: v for k, v in result.items() if k not in _ROW_KEYS}
+
+
+def _insert_rows(
+    db: Session, analysis_id: int, reports: Iterable[dict[str, Any]], groups: Iterable[dict[str, Any]]
+) -> None:
+    start = 0
+    for batch in chunked(reports, _INSERT_BATCH):
+        db.execute(insert(COEReportRow), [
+            {
+                "analysis_id": analysis_id,
+                "position": start + i,
+                "report_name": r.get("report_name") or "",
+                "report_id": r.get("report_id"),
+                "sql": r.get("sql"),
+                "owner": r.get("owner"),
+                "complexity_score": r.get("complexity_score") or 0,
+                "complexity_category": r.get("complexity_category") or "",
+                "estimated_hours": r.get("estimated_hours") or 0,
+                "fingerprint": r.get("fingerprint"),
+            }
+            for i, r in enumerate(batch)
+        ])
+        start += len(batch)
+    groups = list(groups)
+    if groups:
+        db.execute(insert(COEDuplicateGroup), [
+            {
+                "analysis_id": analysis_id,
+                "position": i,
+                "type": g.get("type") or "",
+                "similarity": g.get("similarity") or 0,
+                "report_names_json": json.dumps(g.get("report_names") or []),
+                "recommendation": g.get("recommendation"),
+            }
+            for i, g in enumerate(groups)
+        ])
+
+
+def _migrate_legacy(db: Session, record: COEAnalysis, data: dict[str, Any]) -> dict[str, Any]:
+    """Move reports and groups of a pre-split results_json into the tables."""
+    if not any(k in data for k in _ROW_KEYS):
+        return data
+    _insert_rows(db, record.id, data.get("reports") or [], data.get("duplicate_groups") or [])
+    summary = _summary(data)
+    record.results_json = json.dumps(summary)
+    db.commit()
+    return summary
+
+
+def load_summary(db: Session, record: COEAnalysis) -> dict[str, Any]:
+    """Stored summary of an analysis (migrating a legacy blob on first read)."""
+    data = json.loads(record.results_json) if record.results_json else {}
+    return _migrate_legacy(db, record, data)
+
+
+def ensure_migrated(db: Session, record: COEAnalysis) -> None:
+    """Move a legacy blob's reports and groups into the tables before they are queried."""
+    if record.results_json:
+        _migrate_legacy(db, record, json.loads(record.results_json))
+
+
+def _report_dict(row: COEReportRow, include_sql: bool = True) -> dict[str, Any]:
+    data = {
+        "report_name": row.report_name,
+        "report_id": row.report_id,
+        "sql": row.sql,
+        "owner": row.owner,
+        "complexity_score": row.complexity_score,
+        "complexity_category": row.complexity_category,
+        "estimated_hours": row.estimated_hours,
+        "fingerprint": row.fingerprint,
+    }
+    if not include_sql:
+        del data["sql"]
+    return data
+
+
+def _group_dict(row: COEDuplicateGroup) -> dict[str, Any]:
+    return {
+        # Exact groups are stored as the integer 100 in analysis output
+        "similarity": int(row.similarity) if row.type == "EXACT" else row.similarity,
+        "type": row.type,
+        "report_names": json.loads(row.report_names_json),
+        "recommendation": row.recommendation,
+    }
+
+
+def load_full_result(db: Session, record: COEAnalysis) -> dict[str, Any]:
+    """Summary plus every duplicate group and report, in stored order."""
+    data = load_summary(db, record)
+    data["duplicate_groups"] = [
+        _group_dict(g) for g in db.execute(
+            select(COEDuplicateGroup)
+            .where(COEDuplicateGroup.analysis_id == record.id)
+            .order_by(COEDuplicateGroup.position)
+        ).scalars()
+    ]
+    data["reports"] = [
+        _report_dict(r) for r in db.execute(
+            select(COEReportRow)
+            .where(COEReportRow.analysis_id == record.id)
+            .order_by(COEReportRow.position)
+        ).scalars()
+    ]
+    return data
+
+
+def _order_by(sort: str, fields: dict) -> Any:
+    desc = sort.startswith("-")
+    column = fields.get(sort.lstrip("-"))
+    if column is None:
+        raise ValueError(f"Unknown sort field '{sort.lstrip('-')}'. Use one of: {', '.join(fields)}")
+    return column.desc() if desc else column.asc()
+
+
+def _page(db: Session, stmt, order, position, skip: int, limit: int):
+    total = db.execute(select(func.count()).select_from(stmt.subquery())).scalar_one()
+    rows = db.execute(stmt.order_by(order, position).offset(skip).limit(limit)).scalars().all()
+    return total, rows
+
+
+def query_report_rows(
+    db: Session,
+    analysis_id: int,
+    skip: int = 0,
+    limit: int = 100,
+    category: str | None = None,
+    owner: str | None = None,
+    min_score: float | None = None,
+    max_score: float | None = None,
+    search: str | None = None,
+    sort: str = "position",
+    include_sql: bool = True,
+) -> dict[str, Any]:
+    """One page of an analysis' reports, filtered and sorted in SQL."""
+    order = _order_by(sort, REPORT_SORT_FIELDS)
+    stmt = select(COEReportRow).where(COEReportRow.analysis_id == analysis_id)
+    if category:
+        stmt = stmt.where(COEReportRow.complexity_category == category)
+    if owner is not None:
+        stmt = stmt.where(COEReportRow.owner == owner)
+    if min_score is not None:
+        stmt = stmt.where(COEReportRow.complexity_score >= min_score)
+    if max_score is not None:
+        stmt = stmt.where(COEReportRow.complexity_score <= max_score)
+    if search:
+        stmt = stmt.where(COEReportRow.report_name.ilike(f"%{search}%"))
+    total, rows = _page(db, stmt, order, COEReportRow.position, skip, limit)
+    return {
+        "total": total,
+        "skip": skip,
+        "limit": limit,
+        "items": [_report_dict(r, include_sql) for r in rows],
+    }
+
+
+def query_duplicate_groups(
+    db: Session,
+    analysis_id: int,
+    skip: int = 0,
+    limit: int = 100,
+    group_type: str | None = None,
+    min_similarity: float | None = None,
+    sort: str = "position",
+) -> dict[str, Any]:
+    """One page of an analysis' duplicate groups, filtered and sorted in SQL."""
+    order = _order_by(sort, GROUP_SORT_FIELDS)
+    stmt = select(COEDuplicateGroup).where(COEDuplicateGroup.analysis_id == analysis_id)
+    if group_type:
+        stmt = stmt.where(COEDuplicateGroup.type == group_type.upper())
+    if min_similarity is not None:
+        stmt = stmt.where(COEDuplicateGroup.similarity >= min_similarity)
+    total, rows = _page(db, stmt, order, COEDuplicateGroup.position, skip, limit)
+    return {
+        "total": total,
+        "skip": skip,
+        "limit": limit,
+        "items": [_group_dict(g) for g in rows],
+    }
+
+
+def delete_coe_analysis(db: Session, record: COEAnalysis) -> None:
+    """Delete an analysis with its report and group rows."""
+    db.execute(delete(COEReportRow).where(COEReportRow.analysis_id == record.id))
+    db.execute(delete(COEDuplicateGroup).where(COEDuplicateGroup.analysis_id == record.id))
+    adjust_coe_kpis(db, record.user_id, -1)
+    db.delete(record)
+    db.commit()
+
+
+def _has_report_ids(db: Session, record: COEAnalysis) -> bool:
+    """
+    Whether the analysis' CSV had a Report ID column. Without one,
+    iter_coe_rows numbers the rows "0", "1", ..., which is what every row's
+    report_id then holds.
+    """
+    return db.scalar(select(exists().where(
+        COEReportRow.analysis_id == record.id,
+        COEReportRow.report_id != cast(COEReportRow.position, String),
+    )))
+
+
+def _source_report_id(analysis_id: int, row: COEReportRow, has_report_ids: bool) -> str:
+    # Rows without a real ID (no ID column, or a blank cell) are keyed by
+    # their place in this analysis, so they never match another analysis.
+    report_id = (row.report_id or "").strip() if has_report_ids else ""
+    if not report_id or report_id.lower() == "nan":
+        return f"coe-{analysis_id}-{row.position}"
+    return report_id
+
+
+def promote_coe_analysis(db: Session, record: COEAnalysis) -> dict[str, Any]:
+    """
+    Create a Report for each report of the analysis, with the score, category,
+    hours and fingerprint computed by the analysis (no re-parsing). Idempotent
+    on the COE report id: reports already promoted for the user, from this or
+    an earlier analysis, are skipped. Rows without a report id only match
+    themselves, when the same analysis is promoted again. The new reports are
+    indexed by a background backfill (report_index.schedule_backfill).
+    """
+    ensure_migrated(db, record)
+    has_report_ids = _has_report_ids(db, record)
+    created = skipped = 0
+    last_position = -1
+    while True:
+        rows = db.execute(
+            select(COEReportRow)
+            .where(COEReportRow.analysis_id == record.id, COEReportRow.position > last_position)
+            .order_by(COEReportRow.position)
+            .limit(_INSERT_BATCH)
+        ).scalars().all()
+        if not rows:
+            break
+        last_position = rows[-1].position
+        keys = [_source_report_id(record.id, r, has_report_ids) for r in rows]
+        seen = set(db.execute(
+            select(Report.source_report_id)
+            .where(Report.created_by == record.user_id, Report.source_report_id.in_(set(keys)))
+        ).scalars())
+        values = []
+        for row, key in zip(rows, keys):
+            if key in seen:
+                skipped += 1
+                continue
+            seen.add(key)
+            values.append({
+                "name": row.report_name,
+                "sql_query": row.sql or None,
+                "complexity_score": row.complexity_score,
+                "complexity_category": row.complexity_category,
+                "estimated_hours": row.estimated_hours,
+                "sql_fingerprint": row.fingerprint or "",
+                "source_report_id": key,
+                "created_by": record.user_id,
+                "migrated": False,
+            })
+        if values:
+            db.execute(insert(Report), values)
+            add_reports_kpis(db, record.user_id, [report_contribution(v) for v in values])
+        db.commit()
+        created += len(values)
+    if created:
+        schedule_backfill(record.user_id)
+    return {"analysis_id": record.id, "created": created, "skipped": skipped}
@@ -0,0 +1,204 @@
+"""Columnar in-memory form of a COE analysis.
+
+Each report column is one array instead of a dict per report: scores and
+hours are float64 arrays; owners, categories, fingerprints and SQL texts are
+int32 codes into lists of their distinct values, so a query repeated across
+reports is held once. Duplicate groups are arrays of row indices. Summary
+figures (distribution, top complex, by owner, totals) are computed over the
+arrays with NumPy, and report and group dicts are only built when a caller
+asks for them (the upload response, storage in the row tables).
+"""
+from array import array
+from typing import Any, Iterator
+
+import numpy as np
+
+# Reports listed in top_complex_reports
+TOP_COMPLEX = 10
+
+
+class _Interned:
+    """Distinct values in first-seen order, each with an int code."""
+
+    __slots__ = ("values", "_codes")
+
+    def __init__(self):
+        self.values: list = []
+        self._codes: dict = {}
+
+    def code(self, value) -> int:
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+
+class COEReportTable:
+    """Scored reports of one analysis, in CSV row order. Append, then freeze()."""
+
+    __slots__ = (
+        "names", "report_ids", "owners", "categories", "fingerprints", "sqls",
+        "owner_codes", "category_codes", "fingerprint_codes", "sql_codes", "scores", "hours",
+    )
+
+    def __init__(self):
+        self.names: list[str] = []
+        self.report_ids: list[str] = []
+        self.owners = _Interned()
+        self.categories = _Interned()
+        self.fingerprints = _Interned()
+        self.sqls = _Interned()
+        # Code 0 is "no SQL" in both, so fingerprint_codes > 0 marks real queries
+        self.fingerprints.code("")
+        self.sqls.code("")
+        self.owner_codes = array("i")
+        self.category_codes = array("i")
+        self.fingerprint_codes = array("i")
+        self.sql_codes = array("i")
+        self.scores = array("d")
+        self.hours = array("d")
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def append(
+        self,
+        name: str,
+        report_id: str,
+        sql: str,
+        owner: str,
+        score: float,
+        category: str,
+        hours: float,
+        fingerprint: str,
+    ) -> None:
+        self.names.append(name)
+        self.report_ids.append(report_id)
+        self.sql_codes.append(self.sqls.code(sql))
+        self.owner_codes.append(self.owners.code(owner))
+        self.scores.append(score)
+        self.category_codes.append(self.categories.code(category))
+        self.hours.append(hours)
+        self.fingerprint_codes.append(self.fingerprints.code(fingerprint))
+
+    def freeze(self) -> None:
+        """Turn the growable columns into NumPy arrays (no appends after this)."""
+        for column in ("owner_codes", "category_codes", "fingerprint_codes", "sql_codes"):
+            setattr(self, column, np.asarray(getattr(self, column), dtype=np.int32))
+        self.scores = np.asarray(self.scores, dtype=np.float64)
+        self.hours = np.asarray(self.hours, dtype=np.float64)
+
+    def sql(self, row: int) -> str:
+        return self.sqls.values[self.sql_codes[row]]
+
+    def iter_reports(self) -> Iterator[dict[str, Any]]:
+        """Each report as the dict stored and returned for an analysis."""
+        owners, categories = self.owners.values, self.categories.values
+        fingerprints, sqls = self.fingerprints.values, self.sqls.values
+        columns = zip(
+            self.names, self.report_ids, self.sql_codes.tolist(), self.owner_codes.tolist(),
+            self.scores.tolist(), self.category_codes.tolist(), self.hours.tolist(),
+            self.fingerprint_codes.tolist(),
+        )
+        for name, report_id, sql, owner, score, category, hours, fingerprint in columns:
+            yield {
+                "report_name": name,
+                "report_id": report_id,
+                "sql": sqls[sql],
+                "owner": owners[owner],
+                "complexity_score": score,
+                "complexity_category": categories[category],
+                "estimated_hours": hours,
+                "fingerprint": fingerprints[fingerprint],
+            }
+
+
+class COEResult:
+    """
+    A finished analysis: the frozen report table, exact duplicate groups (row
+    index arrays, one per fingerprint seen more than once) and near-duplicate
+    pairs (row indices and similarity).
+    """
+
+    def __init__(self, table: COEReportTable, near_pairs: list[tuple[int, int, float]]):
+        table.freeze()
+        self.table = table
+        codes = table.fingerprint_codes
+        order = np.argsort(codes, kind="stable")
+        sorted_codes = codes[order]
+        starts = np.flatnonzero(np.diff(sorted_codes, prepend=-1))
+        counts = np.diff(np.append(starts, len(codes)))
+        group_codes = sorted_codes[starts]
+        real = group_codes > 0
+        # Codes follow first appearance, so both lists are in first-seen order.
+        self.unique_rows = order[starts[real]]
+        self.exact_groups = [
+            order[start:start + count] for start, count in zip(starts[real], counts[real]) if count > 1
+        ]
+        near = np.asarray(near_pairs, dtype=np.float64).reshape(-1, 3)
+        self.near_rows = near[:, :2].astype(np.int64)
+        self.near_similarity = near[:, 2]
+
+    @property
+    def report_count(self) -> int:
+        return len(self.table)
+
+    def duplicate_groups(self) -> Iterator[dict[str, Any]]:
+        names = self.table.names
+        groups = [(100, "EXACT", rows.tolist()) for rows in self.exact_groups]
+        groups += [
+            (round(sim, 1), "NEAR_DUPLICATE", [a, b])
+            for (a, b), sim in zip(self.near_rows.tolist(), self.near_similarity.tolist())
+        ]
+        for similarity, kind, rows in groups:
+            yield {
+                "similarity": similarity,
+                "type": kind,
+                "report_names": [names[r] for r in rows],
+                "recommendation": (
+                    "Consolidate into single parameterized report" if similarity >= 95 else "Review for consolidation"
+                ),
+            }
+
+    def summary(self) -> dict[str, Any]:
+        """Everything but the per-report rows and duplicate groups."""
+        t = self.table
+        n = len(t)
+        category_counts = np.bincount(t.category_codes, minlength=len(t.categories.values))
+        # Reports without an owner are counted as "Unknown"
+        owner_keys = _Interned()
+        key_of_owner = np.asarray([owner_keys.code(o or "Unknown") for o in t.owners.values], dtype=np.int32)
+        owner_counts = np.bincount(key_of_owner[t.owner_codes], minlength=len(owner_keys.values))
+        top = np.argsort(-t.scores, kind="stable")[:TOP_COMPLEX]
+        duplicates = sum(len(rows) - 1 for rows in self.exact_groups) + len(self.near_rows)
+        return {
+            "report_count": n,
+            "unique_count": len(self.unique_rows),
+            "duplicate_count": int(duplicates),
+            "complexity_distribution": {
+                category: int(count) for category, count in zip(t.categories.values, category_counts)
+            },
+            "total_estimated_hours": round(float(t.hours.sum()), 1) if n else 0,
+            "avg_complexity": round(float(t.scores.sum()) / n, 1) if n else 0,
+            "top_complex_reports": [
+                {
+                    "report_name": t.names[row],
+                    "complexity_score": float(t.scores[row]),
+                    "complexity_category": t.categories.values[t.category_codes[row]],
+                    "estimated_hours": float(t.hours[row]),
+                }
+                for row in top.tolist()
+            ],
+            "reports_by_owner": {key: int(count) for key, count in zip(owner_keys.values, owner_counts)},
+        }
+
+    def as_dict(self) -> dict[str, Any]:
+        """The analysis in its JSON form: summary plus duplicate groups and reports."""
+        summary = self.summary()
+        top = ("top_complex_reports", "reports_by_owner")
+        data = {k: v for k, v in summary.items() if k not in top}
+        data["duplicate_groups"] = list(self.duplicate_groups())
+        data.update((k, summary[k]) for k in top)
+        data["reports"] = list(self.table.iter_reports())
+        return data
@@ -0,0 +1,244 @@
+"""Per-user dashboard KPIs, maintained incrementally.
+
+Report and COE writes adjust the user's DashboardKPI row in the same
+transaction (adjust_report_kpis / adjust_coe_kpis), so reading the dashboard
+is a primary-key lookup, or a hit in the in-process cache. A missing row is
+rebuilt from the reports table on first read. The row's version is bumped on
+every change and doubles as the dashboard ETag; cached entries are dropped
+when a transaction that changed them commits.
+"""
+import threading
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import DateTime, case, event, func, literal, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.analysis import COEAnalysis
+from app.models.kpi import DashboardKPI
+from app.models.report import Report
+from app.utils.cache import LRUCache
+
+BREAKDOWN_KEYS = ("simple", "medium", "complex", "very_complex")
+
+# user_id -> (etag, stats)
+_cache = LRUCache(settings.dashboard_cache_size, ttl=settings.dashboard_cache_ttl)
+# Bumped with every committed invalidation: a read that overlapped one is not cached
+_invalidations = 0
+_invalidations_lock = threading.Lock()
+
+# Dialects whose INSERT ... ON CONFLICT builds the row in one statement
+_UPSERT_DIALECTS = {"postgresql": postgresql, "sqlite": sqlite}
+
+
+def report_bucket(category: str | None, score: float | None) -> str:
+    """Breakdown key of a report: its category, else the band of its score."""
+    cat = (category or "").lower().replace(" ", "_")
+    if cat in BREAKDOWN_KEYS:
+        return cat
+    score = score or 0
+    if score <= 5:
+        return "simple"
+    if score <= 15:
+        return "medium"
+    if score <= 30:
+        return "complex"
+    return "very_complex"
+
+
+def report_hours(estimated_hours: float | None, score: float | None) -> float:
+    return estimated_hours or (score or 0) * 0.5
+
+
+def report_contribution(report: Report | dict) -> tuple[str, bool, float]:
+    """(breakdown key, migrated, hours) one report (row or insert values) adds to its owner's KPIs."""
+    get = report.get if isinstance(report, dict) else lambda key: getattr(report, key)
+    return (
+        report_bucket(get("complexity_category"), get("complexity_score")),
+        bool(get("migrated")),
+        report_hours(get("estimated_hours"), get("complexity_score")),
+    )
+
+
+def _invalidate_on_commit(db: Session, user_id: int) -> None:
+    db.info.setdefault("dashboard_kpi_users", set()).add(user_id)
+
+
+@event.listens_for(Session, "after_commit")
+def _drop_committed(session: Session) -> None:
+    global _invalidations
+    user_ids = session.info.pop("dashboard_kpi_users", ())
+    if not user_ids:
+        return
+    with _invalidations_lock:
+        _invalidations += 1
+        for user_id in user_ids:
+            _cache.pop(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back(session: Session) -> None:
+    session.info.pop("dashboard_kpi_users", None)
+
+
+def _apply(db: Session, user_id: int, deltas: dict[str, float]) -> None:
+    deltas = {k: v for k, v in deltas.items() if v}
+    if not deltas:
+        return
+    columns = DashboardKPI.__table__.c
+    values = {columns[k]: columns[k] + v for k, v in deltas.items()}
+    values[columns.version] = columns.version + 1
+    db.execute(update(DashboardKPI).where(DashboardKPI.user_id == user_id).values(values))
+    _invalidate_on_commit(db, user_id)
+
+
+def _add_contribution(deltas: dict[str, float], contribution: tuple[str, bool, float], sign: int) -> None:
+    bucket, migrated, hours = contribution
+    deltas["total_reports"] = deltas.get("total_reports", 0) + sign
+    deltas[f"{bucket}_count"] = deltas.get(f"{bucket}_count", 0) + sign
+    deltas["reports_migrated"] = deltas.get("reports_migrated", 0) + sign * migrated
+    deltas["total_hours"] = deltas.get("total_hours", 0.0) + sign * hours
+
+
+def adjust_report_kpis(
+    db: Session,
+    user_id: int,
+    old: tuple[str, bool, float] | None = None,
+    new: tuple[str, bool, float] | None = None,
+) -> None:
+    """
+    Move a report's contribution from `old` to `new` (either may be None for
+    create/delete). Runs in the caller's transaction; commit to apply.
+    """
+    deltas: dict[str, float] = {}
+    if old is not None:
+        _add_contribution(deltas, old, -1)
+    if new is not None:
+        _add_contribution(deltas, new, 1)
+    _apply(db, user_id, deltas)
+
+
+def add_reports_kpis(db: Session, user_id: int, contributions: list[tuple[str, bool, float]]) -> None:
+    """Count many new reports at once (bulk inserts), in the caller's transaction."""
+    deltas: dict[str, float] = {}
+    for contribution in contributions:
+        _add_contribution(deltas, contribution, 1)
+    _apply(db, user_id, deltas)
+
+
+def adjust_coe_kpis(db: Session, user_id: int, delta: int) -> None:
+    """Count COE analyses added (+) or deleted (-) in the caller's transaction."""
+    _apply(db, user_id, {"coe_analyses_count": delta})
+
+
+def _rebuild(db: Session, user_id: int) -> DashboardKPI:
+    """
+    Recompute a user's KPIs from the reports table, in a session of its own
+    (the caller's session is left uncommitted). Where the dialect has
+    INSERT ... ON CONFLICT, the aggregates are read by the statement that
+    writes the row, so no report write can commit between the two: one that
+    commits first is counted, and one that commits later finds the row and
+    applies its own delta. Elsewhere the row is read and written in one
+    transaction (get or create).
+    """
+    category = func.replace(func.lower(func.coalesce(Report.complexity_category, "")), " ", "_")
+    score = func.coalesce(Report.complexity_score, 0)
+    bucket = case(
+        (category.in_(BREAKDOWN_KEYS), category),
+        (score <= 5, "simple"),
+        (score <= 15, "medium"),
+        (score <= 30, "complex"),
+        else_="very_complex",
+    )
+    hours = case(
+        (func.coalesce(Report.estimated_hours, 0) != 0, Report.estimated_hours),
+        else_=score * 0.5,
+    )
+    migrated = func.coalesce(Report.migrated, False)
+    columns = {
+        "user_id": literal(user_id),
+        "total_reports": func.count(Report.id),
+        "reports_migrated": func.coalesce(func.sum(case((migrated, 1), else_=0)), 0),
+        **{
+            f"{key}_count": func.coalesce(func.sum(case((bucket == key, 1), else_=0)), 0)
+            for key in BREAKDOWN_KEYS
+        },
+        "total_hours": func.coalesce(func.sum(hours), 0.0),
+        "coe_analyses_count": (
+            select(func.count(COEAnalysis.id)).where(COEAnalysis.user_id == user_id).scalar_subquery()
+        ),
+        "version": literal(1),
+        "updated_at": literal(datetime.utcnow(), DateTime),
+    }
+    aggregates = select(*columns.values()).where(Report.created_by == user_id)
+    bind = db.get_bind()
+    dialect = _UPSERT_DIALECTS.get(bind.dialect.name)
+    with Session(bind) as session:
+        if dialect is None:
+            _get_or_create(session, user_id, dict(zip(columns, session.execute(aggregates).one())))
+        else:
+            stmt = dialect.insert(DashboardKPI).from_select(list(columns), aggregates)
+            table = DashboardKPI.__table__
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[table.c.user_id],
+                set_={
+                    **{name: stmt.excluded[name] for name in columns if name not in ("user_id", "version")},
+                    "version": table.c.version + 1,
+                },
+            )
+            session.execute(stmt)
+            session.commit()
+        kpi = session.get(DashboardKPI, user_id)
+        session.expunge(kpi)
+    return kpi
+
+
+def _get_or_create(session: Session, user_id: int, values: dict[str, Any]) -> None:
+    kpi = session.get(DashboardKPI, user_id, with_for_update=True)
+    if kpi is None:
+        session.add(DashboardKPI(**values))
+    else:
+        for name, value in values.items():
+            if name not in ("user_id", "version"):
+                setattr(kpi, name, value)
+        kpi.version += 1
+    try:
+        session.commit()
+    except IntegrityError:
+        # Another request created the row first; it was built from the same reports.
+        session.rollback()
+
+
+def _stats(kpi: DashboardKPI) -> dict[str, Any]:
+    total = kpi.total_reports
+    return {
+        "total_reports": total,
+        "reports_migrated": kpi.reports_migrated,
+        "migration_progress_percent": round(100 * kpi.reports_migrated / total, 1) if total else 0,
+        "complexity_breakdown": {key: getattr(kpi, f"{key}_count") for key in BREAKDOWN_KEYS},
+        "estimated_total_hours": round(kpi.total_hours, 1),
+        "coe_analyses_count": kpi.coe_analyses_count,
+    }
+
+
+def get_dashboard_stats(db: Session, user_id: int, refresh: bool = False) -> tuple[dict[str, Any], str]:
+    """(stats, etag) for a user's dashboard; refresh=True recomputes from scratch."""
+    if not refresh:
+        cached = _cache.get(user_id)
+        if cached is not None:
+            return cached[1], cached[0]
+    with _invalidations_lock:
+        invalidations = _invalidations
+    kpi = None if refresh else db.get(DashboardKPI, user_id)
+    if kpi is None:
+        kpi = _rebuild(db, user_id)
+    etag = f'"kpi-{user_id}-{kpi.version}"'
+    stats = _stats(kpi)
+    with _invalidations_lock:
+        # A write that committed while the row was read may not be in it.
+        if _invalidations == invalidations:
+            _cache.set(user_id, (etag, stats))
+    return stats, etag
@@ -0,0 +1,35 @@
+"""Explicit offloading of CPU-heavy work from async handlers.
+
+Analysis (parsing, scoring, similarity, CSV processing) runs on its own
+thread limiter of settings.cpu_offload_threads threads, separate from the
+default threadpool used by sync endpoints and run_db. Long uploads or
+consolidations then queue among themselves instead of taking every worker
+thread while login and dashboard requests wait.
+"""
+from typing import Any, Callable, TypeVar
+
+import anyio
+
+from app.config import settings
+from app.database import with_session
+
+T = TypeVar("T")
+
+_limiter: anyio.CapacityLimiter | None = None
+
+
+def _get_limiter() -> anyio.CapacityLimiter:
+    global _limiter
+    if _limiter is None:
+        _limiter = anyio.CapacityLimiter(settings.cpu_offload_threads)
+    return _limiter
+
+
+async def run_cpu(fn: Callable[..., T], *args: Any) -> T:
+    """fn(*args) on an offload thread."""
+    return await anyio.to_thread.run_sync(fn, *args, limiter=_get_limiter())
+
+
+async def run_cpu_db(fn: Callable[..., T], *args: Any) -> T:
+    """fn(db, *args) on an offload thread with its own sync session."""
+    return await run_cpu(with_session, fn, *args)
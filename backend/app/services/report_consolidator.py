@@ -1,94 +1,163 @@
-"""Report consolidation: duplicate detection across user reports."""
+"""Report consolidation: duplicate detection across user reports.
+
+Duplicates are read from the write-time index (see report_index): reports
+sharing a fingerprint are exact duplicates, stored similarity edges link near
+duplicates. Both are merged into connected components, so N reports that are
+all copies or near copies of each other form one cluster (N - 1 to skip)
+rather than many overlapping pairs. Reports are streamed in fingerprint order
+and only those in a cluster are kept, so memory grows with the number of
+duplicates, not the number of reports. Reports not indexed yet (bulk-loaded,
+their backfill still queued) have no edges: they only join exact groups, by
+the fingerprint stored with them, and are counted in unindexed_reports.
+Consolidation schedules their backfill rather than running it in the request.
+"""
 from typing import Any
-from collections import defaultdict
 
-from app.utils.sql_parser import (
-    generate_sql_fingerprint,
-    sql_similarity_percent,
-    estimate_migration_hours,
-)
+from sqlalchemy import distinct, func
+from sqlalchemy.orm import Session
+
 from app.models.report import Report
+from app.models.report_index import ReportSimilarityEdge
+from app.services.report_index import schedule_backfill
+
+# Reports fetched per round trip while streaming
+STREAM_BATCH = 1000
+
+
+class _DisjointSet:
+    """Union-find over report ids, created lazily for reports in some cluster."""
+
+    def __init__(self):
+        self.parent: dict[int, int] = {}
 
+    def find(self, x: int) -> int:
+        parent = self.parent.setdefault(x, x)
+        while parent != x:
+            grandparent = self.parent[parent]
+            self.parent[x] = grandparent
+            x, parent = parent, grandparent
+        return x
 
-def consolidate_reports(reports: list[Report]) -> dict[str, Any]:
+    def union(self, a: int, b: int) -> None:
+        ra, rb = self.find(a), self.find(b)
+        if ra != rb:
+            # Smaller id as root keeps a cluster's root at its oldest report.
+            if rb < ra:
+                ra, rb = rb, ra
+            self.parent[rb] = ra
+
+
+def _report_hours(estimated_hours: float | None, complexity_score: float | None) -> float:
+    return estimated_hours or (complexity_score or 1) * 0.5
+
+
+def consolidate_user_reports(db: Session, user_id: int) -> dict[str, Any]:
     """
-    Find duplicate and near-duplicate reports by SQL fingerprint and similarity.
-    Returns duplicate_groups, potential_savings.
+    Find duplicate clusters among all of a user's reports.
+    Returns total/unique counts, duplicate_groups (one per cluster, reports
+    ordered by id; the first is kept), potential_savings and the number of
+    reports still waiting to be indexed.
     """
-    if not reports:
-        return {
-            "total_reports": 0,
-            "unique_reports": 0,
-            "duplicate_groups": [],
-            "potential_savings": {"reports_to_skip": 0, "hours_saved": 0},
-        }
-    # Build list with sql and id
-    items = []
-    for r in reports:
-        sql = (r.sql_query or "").strip()
-        fp = generate_sql_fingerprint(sql) if sql else ""
-        items.append({
-            "id": r.id,
-            "name": r.name,
-            "sql": sql,
-            "fingerprint": fp,
-            "estimated_hours": r.estimated_hours or (r.complexity_score or 1) * 0.5,
-        })
-    # Exact duplicates by fingerprint
-    fp_groups = defaultdict(list)
-    for it in items:
-        if it["fingerprint"]:
-            fp_groups[it["fingerprint"]].append(it)
-    exact_groups = [g for g in fp_groups.values() if len(g) > 1]
-    unique_by_fp = {fp: g[0] for fp, g in fp_groups.items()}
-    unique_list = list(unique_by_fp.values())
-    # Near duplicates
-    near_groups = []
-    seen = set()
-    for i, a in enumerate(unique_list):
-        for b in unique_list[i + 1 :]:
-            if not a["sql"] or not b["sql"]:
-                continue
-            key = tuple(sorted([a["id"], b["id"]]))
-            if key in seen:
-                continue
-            sim = sql_similarity_percent(a["sql"], b["sql"])
-            if 85 <= sim < 100:
-                seen.add(key)
-                near_groups.append({
-                    "reports": [a, b],
-                    "similarity": round(sim, 1),
-                    "recommendation": "Consolidate into single parameterized report with filters",
-                })
+    unindexed = db.query(func.count(Report.id)).filter(
+        Report.created_by == user_id, Report.sql_tokens_json.is_(None)
+    ).scalar()
+    if unindexed:
+        schedule_backfill(user_id)
+    clusters = _DisjointSet()
+
+    # Near-duplicate edges first: their endpoints must be kept while streaming.
+    edge_similarity: dict[int, list[float]] = {}
+    edges = db.query(
+        ReportSimilarityEdge.report_a,
+        ReportSimilarityEdge.report_b,
+        ReportSimilarityEdge.similarity,
+    ).filter(
+        ReportSimilarityEdge.user_id == user_id,
+        # Edges indexed before 100% pairs were left out
+        ReportSimilarityEdge.similarity < 100,
+    )
+    edge_list = []
+    for a, b, sim in edges.yield_per(STREAM_BATCH):
+        clusters.union(a, b)
+        edge_list.append((a, sim))
+
+    # Stream reports by fingerprint; each run of equal fingerprints is one
+    # exact group. Keep only reports that end up in a cluster.
+    kept: dict[int, dict[str, Any]] = {}
+    stream = (
+        db.query(
+            Report.id,
+            Report.name,
+            Report.sql_fingerprint,
+            Report.estimated_hours,
+            Report.complexity_score,
+        )
+        .filter(Report.created_by == user_id, Report.sql_fingerprint != "")
+        .order_by(Report.sql_fingerprint, Report.id)
+        .yield_per(STREAM_BATCH)
+    )
+    run: list = []
+
+    def close_run() -> None:
+        for r in run[1:]:
+            clusters.union(run[0].id, r.id)
+        for r in run:
+            if len(run) > 1 or r.id in clusters.parent:
+                kept[r.id] = {
+                    "id": r.id,
+                    "name": r.name,
+                    "fingerprint": r.sql_fingerprint,
+                    "estimated_hours": _report_hours(r.estimated_hours, r.complexity_score),
+                }
+
+    for row in stream:
+        if run and row.sql_fingerprint != run[0].sql_fingerprint:
+            close_run()
+            run = []
+        run.append(row)
+    close_run()
+
+    total_reports = db.query(func.count(Report.id)).filter(Report.created_by == user_id).scalar()
+    unique_reports = (
+        db.query(func.count(distinct(Report.sql_fingerprint)))
+        .filter(Report.created_by == user_id, Report.sql_fingerprint != "")
+        .scalar()
+    )
+
+    members: dict[int, list[dict[str, Any]]] = {}
+    for report_id in sorted(kept):
+        members.setdefault(clusters.find(report_id), []).append(kept[report_id])
+    for a, sim in edge_list:
+        edge_similarity.setdefault(clusters.find(a), []).append(sim)
+
     duplicate_groups = []
     reports_to_skip = 0
     hours_saved = 0.0
-    for g in exact_groups:
-        duplicate_groups.append({
-            "group_id": len(duplicate_groups) + 1,
-            "similarity": 100,
-            "type": "EXACT",
-            "reports": [{"id": x["id"], "name": x["name"]} for x in g],
-            "recommendation": "Migrate only one; create aliases for others",
-        })
-        reports_to_skip += len(g) - 1
-        hours_saved += sum(x["estimated_hours"] for x in g[1:])
-    for g in near_groups:
+    for root in sorted(members):
+        group = members[root]
+        if len(group) < 2:
+            continue
+        exact = len({x["fingerprint"] for x in group}) == 1
         duplicate_groups.append({
             "group_id": len(duplicate_groups) + 1,
-            "similarity": g["similarity"],
-            "type": "NEAR_DUPLICATE",
-            "reports": [{"id": x["id"], "name": x["name"]} for x in g["reports"]],
-            "recommendation": g["recommendation"],
+            # Weakest link of the cluster
+            "similarity": 100 if exact else round(min(edge_similarity.get(root, [100])), 1),
+            "type": "EXACT" if exact else "NEAR_DUPLICATE",
+            "reports": [{"id": x["id"], "name": x["name"]} for x in group],
+            "recommendation": (
+                "Migrate only one; create aliases for others" if exact
+                else "Consolidate into single parameterized report with filters"
+            ),
         })
-        reports_to_skip += 1
-        hours_saved += g["reports"][1]["estimated_hours"]
+        reports_to_skip += len(group) - 1
+        hours_saved += sum(x["estimated_hours"] for x in group[1:])
     return {
-        "total_reports": len(reports),
-        "unique_reports": len(unique_list),
+        "total_reports": total_reports,
+        "unique_reports": unique_reports,
         "duplicate_groups": duplicate_groups,
         "potential_savings": {
             "reports_to_skip": reports_to_skip,
             "hours_saved": round(hours_saved, 1),
         },
+        "unindexed_reports": unindexed,
     }
@@ -0,0 +1,181 @@
+"""Bulk report import from COE-format CSV or JSON lines.
+
+Rows are validated with ReportCreate, scored server-side when they carry no
+complexity score (a batch's SQL column at once), and inserted with one
+executemany per batch (settings.report_import_batch rows per transaction).
+A row that fails never aborts its batch: bad rows are reported with their
+row number and the rest is stored. A file that cannot be read past some
+point (a malformed CSV line) keeps the rows stored before it and reports
+the reason in "error". Similarity indexing is deferred:
+imported reports are indexed by a background backfill once the import is
+done (report_index.schedule_backfill).
+"""
+import io
+import json
+from typing import Any, BinaryIO, Iterator
+
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.report import Report
+from app.schemas.report import ReportCreate
+from app.services.analysis_cache import parse_many
+from app.services.coe_processor import COL_ALIASES, QUERY_SQL, REPORT_NAME, iter_coe_rows
+from app.services.dashboard_kpis import add_reports_kpis, report_contribution
+from app.services.report_index import schedule_backfill
+from app.services.worker_pool import chunked, get_process_pool
+from app.utils.sql_parser import complexity_categories, migration_hours, score_complexity
+
+# Per-row errors returned in the response; the failed count is always exact
+MAX_REPORTED_ERRORS = 1000
+
+# COE column names understood in JSON lines as well, mapped to Report fields
+_FIELD_FOR_COLUMN = {REPORT_NAME: "name", QUERY_SQL: "sql_query"}
+
+
+def _csv_records(stream: BinaryIO) -> Iterator[tuple[int, dict | str]]:
+    row = 0
+    for rows in iter_coe_rows(stream):
+        for name, _report_id, sql, _owner in rows:
+            row += 1
+            yield row, {"name": name, "sql_query": sql or None}
+
+
+def _jsonl_records(stream: BinaryIO) -> Iterator[tuple[int, dict | str]]:
+    for line_no, line in enumerate(io.TextIOWrapper(stream, encoding="utf-8"), 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            obj = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield line_no, f"Invalid JSON: {e}"
+            continue
+        if not isinstance(obj, dict):
+            yield line_no, "Expected a JSON object"
+            continue
+        record = {}
+        for key, value in obj.items():
+            column = COL_ALIASES.get(str(key).strip().lower())
+            record[_FIELD_FOR_COLUMN.get(column, key)] = value
+        yield line_no, record
+
+
+def _validation_message(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}" for err in error.errors()
+    )
+
+
+class ReportImporter:
+    def __init__(self, db: Session, user_id: int):
+        self.db = db
+        self.user_id = user_id
+        self.imported = 0
+        self.failed = 0
+        self.errors: list[dict[str, Any]] = []
+        self.error: str | None = None
+
+    def run(self, stream: BinaryIO, filename: str) -> dict[str, Any]:
+        """
+        Import every row of the file; returns counts and per-row errors. When
+        reading stops partway, the rows read before are still imported and
+        "error" says why; raises ValueError if nothing could be read at all.
+        """
+        if filename.lower().endswith(".csv"):
+            records = _csv_records(stream)
+        elif filename.lower().endswith((".jsonl", ".ndjson", ".json")):
+            records = _jsonl_records(stream)
+        else:
+            raise ValueError("CSV or JSON lines (.jsonl) file required")
+        pool = get_process_pool()
+        for batch in chunked(self._until_unreadable(records), settings.report_import_batch):
+            self._import_batch(batch, pool)
+        if self.error is not None and not (self.imported or self.failed):
+            raise ValueError(self.error)
+        return {
+            "imported": self.imported,
+            "failed": self.failed,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors),
+            "error": self.error,
+        }
+
+    def _until_unreadable(self, records: Iterator[tuple[int, dict | str]]) -> Iterator[tuple[int, dict | str]]:
+        # Parse and decode errors end the file, not the import: the rows
+        # yielded so far still form the last batch.
+        try:
+            yield from records
+        except ValueError as e:
+            self.error = str(e)
+
+    def _error(self, row: int, message: str) -> None:
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": row, "error": message})
+
+    def _import_batch(self, batch: list[tuple[int, dict | str]], pool) -> None:
+        valid: list[tuple[int, ReportCreate]] = []
+        for row, record in batch:
+            if isinstance(record, str):
+                self._error(row, record)
+                continue
+            try:
+                data = ReportCreate.model_validate(record)
+            except ValidationError as e:
+                self._error(row, _validation_message(e))
+                continue
+            if not data.name.strip():
+                self._error(row, "name: Field required")
+                continue
+            if len(data.name) > 255:
+                self._error(row, "name: At most 255 characters")
+                continue
+            valid.append((row, data))
+
+        sqls = [(data.sql_query or "").strip() for _, data in valid]
+        _, scores = score_complexity(parse_many(sqls, pool=pool))
+        values = []
+        for (row, data), sql, score, category, hours in zip(
+            valid, sqls, scores.tolist(), complexity_categories(scores), migration_hours(scores).tolist()
+        ):
+            value = data.model_dump()
+            value.update(created_by=self.user_id, migrated=False)
+            if sql and data.complexity_score is None:
+                value.update(complexity_score=score, complexity_category=category, estimated_hours=hours)
+            values.append((row, value))
+        if values:
+            self._insert(values)
+
+    def _insert(self, values: list[tuple[int, dict]]) -> None:
+        try:
+            self.db.execute(insert(Report), [value for _, value in values])
+            stored = [value for _, value in values]
+        except SQLAlchemyError:
+            # Find the offending rows one by one; the others still go in.
+            self.db.rollback()
+            stored = []
+            for row, value in values:
+                try:
+                    with self.db.begin_nested():
+                        self.db.execute(insert(Report), [value])
+                    stored.append(value)
+                except SQLAlchemyError as e:
+                    self._error(row, str(e.orig) if getattr(e, "orig", None) else str(e))
+        add_reports_kpis(self.db, self.user_id, [report_contribution(v) for v in stored])
+        self.db.commit()
+        self.imported += len(stored)
+
+
+def import_reports(db: Session, user_id: int, stream: BinaryIO, filename: str) -> dict[str, Any]:
+    """Bulk-import reports for a user from a CSV or JSON lines upload."""
+    importer = ReportImporter(db, user_id)
+    try:
+        return importer.run(stream, filename)
+    finally:
+        # Batches already committed are indexed even if the import raised.
+        if importer.imported:
+            schedule_backfill(user_id)
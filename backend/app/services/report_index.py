@@ -0,0 +1,252 @@
+"""Write-time SQL similarity index over a user's reports.
+
+ReportIndexer stores each report's fingerprint, normalized SQL and token set
+on the row, its MinHash LSH bands in report_lsh_bands and its similarity
+edges (near duplicates: SIMILARITY_THRESHOLD <= combined similarity < 100)
+to the user's other reports in report_similarity_edges. Writing a report
+only scores it against the reports sharing a band with it; consolidation
+then reads stored edges instead of comparing every pair. Reports stored
+before the index existed, or bulk-loaded (import, COE promotion), are
+indexed by backfill(), run in the background after the bulk write
+(schedule_backfill) or at startup (backfill_pending); read paths only use
+what is indexed.
+"""
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator
+
+from sqlalchemy import delete, insert, or_, select, tuple_
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models.report import Report
+from app.models.report_index import ReportLSHBand, ReportSimilarityEdge
+from app.services.analysis_cache import get_parsed, parse_many
+from app.services.dashboard_kpis import adjust_report_kpis, report_contribution
+from app.utils.minhash import band_hashes, min_jaccard_for_threshold, minhash_signature
+from app.utils.sql_parser import (
+    ParsedSQL,
+    calculate_complexity_score,
+    complexity_category,
+    estimate_migration_hours,
+    jaccard_similarity,
+    score_complexity,
+    sql_similarity_percent,
+)
+
+# Combined similarity (percent) stored as an edge
+SIMILARITY_THRESHOLD = 85
+
+# Reports per batch when backfilling or loading candidates
+_BATCH = 500
+
+logger = logging.getLogger(__name__)
+
+_executor: ThreadPoolExecutor | None = None
+_lock = threading.Lock()
+# One backfill at a time in this process: two would both move the KPI
+# contribution of a report they rescore.
+_backfill_lock = threading.Lock()
+
+
+def report_sql(report: Report) -> str:
+    return (report.sql_query or "").strip()
+
+
+def stored_parsed(fingerprint: str, normalized: str | None, tokens_json: str | None) -> ParsedSQL:
+    """ParsedSQL rebuilt from a report's stored features (enough for similarity)."""
+    return ParsedSQL.restore(
+        "",
+        normalized=normalized or "",
+        fingerprint=fingerprint,
+        token_set=frozenset(json.loads(tokens_json or "[]")),
+        keywords={},
+        statement_count=1,
+    )
+
+
+def band_buckets(parsed: ParsedSQL) -> list[tuple[int, int]]:
+    """(band, bucket) pairs of a query's MinHash signature, as stored in report_lsh_bands."""
+    if not parsed.token_set:
+        return []
+    return list(enumerate(band_hashes(minhash_signature(parsed.token_set))))
+
+
+class ReportIndexer:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def analyze(
+        self,
+        report: Report,
+        parsed: ParsedSQL | None = None,
+        rescore: bool = False,
+        score: float | None = None,
+    ) -> ParsedSQL:
+        """
+        Store the report's SQL features on the row. Complexity, category and
+        hours are computed from the SQL when missing, or always with rescore;
+        `score` is the already computed complexity score, when batch scored.
+        """
+        sql = report_sql(report)
+        parsed = parsed or get_parsed(sql)
+        report.sql_fingerprint = parsed.fingerprint if sql else ""
+        report.normalized_sql = parsed.normalized
+        report.sql_tokens_json = json.dumps(sorted(parsed.token_set))
+        if sql and (rescore or report.complexity_score is None):
+            if score is None:
+                score = calculate_complexity_score(parsed)
+            report.complexity_score = score
+            report.complexity_category = complexity_category(score)
+            report.estimated_hours = estimate_migration_hours(score)
+        return parsed
+
+    def index(self, report: Report, parsed: ParsedSQL) -> int:
+        """
+        Replace the report's bands and edges; returns the number of edges stored.
+        The report must have been analyzed and flushed (it needs an id).
+        """
+        self.db.flush()
+        self.remove(report.id)
+        if not report.sql_fingerprint or not parsed.token_set:
+            return 0
+        buckets = band_buckets(parsed)
+        self.db.execute(insert(ReportLSHBand), [
+            {"report_id": report.id, "band": band, "bucket": bucket, "user_id": report.created_by}
+            for band, bucket in buckets
+        ])
+        min_jaccard = min_jaccard_for_threshold(SIMILARITY_THRESHOLD)
+        edges = []
+        for other_id, _name, other in self.candidates(report.created_by, buckets, exclude_id=report.id):
+            # Same fingerprint is an exact duplicate, found without edges.
+            if not other.fingerprint or other.fingerprint == report.sql_fingerprint:
+                continue
+            if jaccard_similarity(parsed.token_set, other.token_set) < min_jaccard:
+                continue
+            sim = sql_similarity_percent(parsed, other, threshold=SIMILARITY_THRESHOLD)
+            # As in coe_processor: 100% with another fingerprint is no near duplicate.
+            if SIMILARITY_THRESHOLD <= sim < 100:
+                edges.append({
+                    "report_a": min(report.id, other_id),
+                    "report_b": max(report.id, other_id),
+                    "similarity": sim,
+                    "user_id": report.created_by,
+                })
+        if edges:
+            self.db.execute(insert(ReportSimilarityEdge), edges)
+        return len(edges)
+
+    def candidates(
+        self,
+        user_id: int,
+        buckets: list[tuple[int, int]],
+        exclude_id: int | None = None,
+    ) -> Iterator[tuple[int, str, ParsedSQL]]:
+        """
+        (id, name, stored features) of the user's indexed reports sharing at
+        least one (band, bucket) with `buckets`, read in batches.
+        """
+        if not buckets:
+            return
+        stmt = (
+            select(ReportLSHBand.report_id)
+            .where(
+                ReportLSHBand.user_id == user_id,
+                tuple_(ReportLSHBand.band, ReportLSHBand.bucket).in_(buckets),
+            )
+            .distinct()
+        )
+        if exclude_id is not None:
+            stmt = stmt.where(ReportLSHBand.report_id != exclude_id)
+        candidate_ids = self.db.execute(stmt).scalars().all()
+        for start in range(0, len(candidate_ids), _BATCH):
+            rows = self.db.execute(
+                select(Report.id, Report.name, Report.sql_fingerprint, Report.normalized_sql, Report.sql_tokens_json)
+                .where(Report.id.in_(candidate_ids[start:start + _BATCH]))
+            )
+            for other_id, name, fingerprint, normalized, tokens_json in rows:
+                yield other_id, name, stored_parsed(fingerprint or "", normalized, tokens_json)
+
+    def remove(self, report_id: int) -> None:
+        """Drop a report's bands and edges (before deleting or re-indexing it)."""
+        self.db.execute(delete(ReportLSHBand).where(ReportLSHBand.report_id == report_id))
+        self.db.execute(
+            delete(ReportSimilarityEdge).where(
+                or_(ReportSimilarityEdge.report_a == report_id, ReportSimilarityEdge.report_b == report_id)
+            )
+        )
+
+    def backfill(self, user_id: int) -> int:
+        """Index the user's reports not indexed yet; returns the count."""
+        with _backfill_lock:
+            return self._backfill(user_id)
+
+    def _backfill(self, user_id: int) -> int:
+        total = 0
+        while True:
+            reports = (
+                self.db.query(Report)
+                .filter(Report.created_by == user_id, Report.sql_tokens_json.is_(None))
+                .order_by(Report.id)
+                .limit(_BATCH)
+                .all()
+            )
+            if not reports:
+                return total
+            parsed_rows = parse_many([report_sql(r) for r in reports])
+            _, scores = score_complexity(parsed_rows)
+            for report, parsed, score in zip(reports, parsed_rows, scores.tolist()):
+                old = report_contribution(report)
+                self.analyze(report, parsed, score=score)
+                adjust_report_kpis(self.db, user_id, old=old, new=report_contribution(report))
+                self.index(report, parsed)
+            self.db.commit()
+            total += len(reports)
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="report-index")
+        return _executor
+
+
+def _run_backfill(user_id: int) -> None:
+    db = SessionLocal()
+    try:
+        ReportIndexer(db).backfill(user_id)
+    except Exception:
+        logger.exception("Report index backfill for user %s failed", user_id)
+    finally:
+        db.close()
+
+
+def schedule_backfill(user_id: int) -> None:
+    """Index the user's unindexed reports in the background (after a bulk write commits)."""
+    _get_executor().submit(_run_backfill, user_id)
+
+
+def backfill_pending() -> int:
+    """Schedule a backfill for every user with unindexed reports; returns the user count."""
+    db = SessionLocal()
+    try:
+        user_ids = db.execute(
+            select(Report.created_by).where(Report.sql_tokens_json.is_(None)).distinct()
+        ).scalars().all()
+    finally:
+        db.close()
+    for user_id in user_ids:
+        schedule_backfill(user_id)
+    return len(user_ids)
+
+
+def shutdown_backfill() -> None:
+    """Stop the backfill thread; what is left unindexed is picked up at the next start."""
+    global _executor
+    with _lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
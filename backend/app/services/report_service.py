@@ -6,6 +6,8 @@ from sqlalchemy import and_
 
 from app.models.report import Report
 from app.schemas.report import ReportCreate, ReportUpdate
+from app.services.dashboard_kpis import adjust_report_kpis, report_contribution
+from app.services.report_index import ReportIndexer
 
 
 class ReportService:
@@ -35,7 +37,12 @@ class ReportService:
 
     def create_report(self, data: ReportCreate, user_id: int) -> Report:
         report = Report(**data.model_dump(), created_by=user_id)
+        indexer = ReportIndexer(self.db)
+        parsed = indexer.analyze(report)
         self.db.add(report)
+        self.db.flush()
+        indexer.index(report, parsed)
+        adjust_report_kpis(self.db, user_id, new=report_contribution(report))
         self.db.commit()
         self.db.refresh(report)
         return report
@@ -49,8 +56,16 @@ class ReportService:
         report = self.get_report(report_id, user_id)
         if not report:
             return None
-        for key, value in data.model_dump(exclude_unset=True).items():
+        old = report_contribution(report)
+        changes = data.model_dump(exclude_unset=True)
+        for key, value in changes.items():
             setattr(report, key, value)
+        if "sql_query" in changes or report.sql_tokens_json is None:
+            # New SQL is rescored unless the caller supplied its own score.
+            indexer = ReportIndexer(self.db)
+            rescore = "sql_query" in changes and "complexity_score" not in changes
+            indexer.index(report, indexer.analyze(report, rescore=rescore))
+        adjust_report_kpis(self.db, user_id, old=old, new=report_contribution(report))
         self.db.commit()
         self.db.refresh(report)
         return report
@@ -59,6 +74,8 @@ class ReportService:
         report = self.get_report(report_id, user_id)
         if not report:
             return False
+        adjust_report_kpis(self.db, user_id, old=report_contribution(report))
+        ReportIndexer(self.db).remove(report.id)
         self.db.delete(report)
         self.db.commit()
         return True
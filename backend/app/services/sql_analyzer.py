@@ -1,15 +1,24 @@
 """SQL complexity analyzer and comparison (handoff spec)."""
-from typing import Any
+import heapq
+from concurrent.futures import Executor
+from typing import Any, Iterable, Iterator
 
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.services.analysis_cache import get_parsed, parse_many
+from app.services.report_index import ReportIndexer, band_buckets
+from app.services.worker_pool import chunked, pool_workers
+from app.utils.minhash import min_jaccard_for_threshold
 from app.utils.sql_parser import (
+    ParsedSQL,
     calculate_complexity_score,
     complexity_category,
     estimate_migration_hours,
     extract_table_names,
-    normalize_sql_for_fingerprint,
+    jaccard_similarity,
     sql_similarity_percent,
 )
-import sqlparse
 
 
 def analyze_sql(sql: str) -> dict[str, Any]:
@@ -23,15 +32,20 @@ def analyze_sql(sql: str) -> dict[str, Any]:
             "lineage": {"tables": [], "columns": []},
             "recommendations": [],
         }
-    score = calculate_complexity_score(sql)
+    return _analyze_parsed(sql, get_parsed(sql))
+
+
+def _analyze_parsed(sql: str, parsed: ParsedSQL) -> dict[str, Any]:
+    score = calculate_complexity_score(parsed)
     cat = complexity_category(score)
     hours = estimate_migration_hours(score)
-    tables = extract_table_names(sql)
+    tables = extract_table_names(parsed)
+    sql_upper = parsed.sql_upper
     # Simple column extraction: tokens between SELECT and FROM
     columns = []
     try:
         import re
-        from_idx = sql.upper().find(" FROM ")
+        from_idx = sql_upper.find(" FROM ")
         if from_idx > 0:
             select_part = sql[:from_idx].strip()
             if select_part.upper().startswith("SELECT"):
@@ -45,7 +59,6 @@ def analyze_sql(sql: str) -> dict[str, Any]:
         lineage = {"tables": tables, "columns": []}
     # Migration recommendations based on common patterns
     recommendations = []
-    sql_upper = sql.upper()
     if "DECODE" in sql_upper:
         recommendations.append("Replace DECODE with CASE WHEN")
     if "NVL" in sql_upper:
@@ -72,10 +85,13 @@ def analyze_sql(sql: str) -> dict[str, Any]:
 
 def compare_sql(sql1: str, sql2: str) -> dict[str, Any]:
     """Compare two SQL queries: identical, semantically equivalent, differences."""
-    norm1 = normalize_sql_for_fingerprint(sql1 or "")
-    norm2 = normalize_sql_for_fingerprint(sql2 or "")
-    are_identical = norm1 == norm2
-    similarity = sql_similarity_percent(sql1 or "", sql2 or "") if (sql1 or sql2) else 100.0 if not sql1 and not sql2 else 0.0
+    parsed1, parsed2 = parse_many([sql1 or "", sql2 or ""])
+    return _compare_parsed(sql1, sql2, parsed1, parsed2)
+
+
+def _compare_parsed(sql1: str, sql2: str, parsed1: ParsedSQL, parsed2: ParsedSQL) -> dict[str, Any]:
+    are_identical = parsed1.normalized == parsed2.normalized
+    similarity = sql_similarity_percent(parsed1, parsed2) if (sql1 or sql2) else 100.0 if not sql1 and not sql2 else 0.0
     are_semantically_equivalent = similarity >= 95
     differences = {
         "select_clause": {"added": [], "removed": [], "note": ""},
@@ -94,3 +110,102 @@ def compare_sql(sql1: str, sql2: str) -> dict[str, Any]:
         "compatibility_score": compatibility_score,
         "migration_quality": migration_quality,
     }
+
+
+def sql_batches(items: Iterable, pool: Executor | None = None) -> Iterator[list]:
+    """Chunks of a batch request: one parse task per pool worker per chunk."""
+    return chunked(items, settings.coe_chunk_size * max(1, pool_workers() if pool else 1))
+
+
+def analyze_sql_chunk(sqls: list[str], start: int = 0, pool: Executor | None = None) -> list[dict[str, Any]]:
+    """
+    analyze_sql for each query of one chunk, in order, each with its "index"
+    counted from `start`. The chunk is parsed in one parse_many call (distinct
+    texts once, cache misses on `pool` when given). A query that fails gets an
+    "error" instead of failing the chunk.
+    """
+    parsed = iter(parse_many([sql for sql in sqls if sql], pool=pool))
+    results = []
+    for index, sql in enumerate(sqls, start):
+        try:
+            result = _analyze_parsed(sql, next(parsed)) if sql else analyze_sql(sql)
+        except Exception as e:
+            result = {"error": str(e)}
+        results.append({"index": index, **result})
+    return results
+
+
+def compare_sql_chunk(
+    pairs: list[tuple[str, str]],
+    start: int = 0,
+    pool: Executor | None = None,
+) -> list[dict[str, Any]]:
+    """compare_sql for each (sql1, sql2) pair of one chunk, like analyze_sql_chunk."""
+    parsed = parse_many([sql or "" for pair in pairs for sql in pair], pool=pool)
+    results = []
+    for k, (sql1, sql2) in enumerate(pairs):
+        try:
+            result = _compare_parsed(sql1, sql2, parsed[2 * k], parsed[2 * k + 1])
+        except Exception as e:
+            result = {"error": str(e)}
+        results.append({"index": start + k, **result})
+    return results
+
+
+def analyze_sql_batch(sqls: Iterable[str], pool: Executor | None = None) -> Iterator[dict[str, Any]]:
+    """analyze_sql for each query, yielded in input order chunk by chunk (sql_batches)."""
+    start = 0
+    for chunk in sql_batches(sqls, pool):
+        yield from analyze_sql_chunk(chunk, start, pool)
+        start += len(chunk)
+
+
+def compare_sql_batch(
+    pairs: Iterable[tuple[str, str]],
+    pool: Executor | None = None,
+) -> Iterator[dict[str, Any]]:
+    """compare_sql for each (sql1, sql2) pair, streamed like analyze_sql_batch."""
+    start = 0
+    for chunk in sql_batches(pairs, pool):
+        yield from compare_sql_chunk(chunk, start, pool)
+        start += len(chunk)
+
+
+def find_similar_reports(
+    db: Session,
+    user_id: int,
+    sql: str,
+    top_k: int = 10,
+    min_similarity: float = 0.0,
+) -> list[dict[str, Any]]:
+    """
+    The user's top_k reports most similar to `sql` (sql_similarity_percent),
+    best first. Only reports sharing a MinHash LSH band with the query are
+    scored (see report_index), so weakly similar reports may be left out, as
+    are reports not indexed yet (a search never writes to the index).
+    Once top_k results are held, candidates that cannot beat the weakest are
+    cut off by Jaccard or by the bounded Levenshtein scan.
+    """
+    sql = (sql or "").strip()
+    if not sql:
+        return []
+    parsed = get_parsed(sql)
+    indexer = ReportIndexer(db)
+    # Min-heap of (similarity, -id, name): the root is the weakest kept result.
+    best: list[tuple[float, int, str]] = []
+    for report_id, name, other in indexer.candidates(user_id, band_buckets(parsed)):
+        floor = max(min_similarity, best[0][0]) if len(best) == top_k else min_similarity
+        if jaccard_similarity(parsed.token_set, other.token_set) < min_jaccard_for_threshold(floor):
+            continue
+        sim = sql_similarity_percent(parsed, other, threshold=floor or None)
+        if sim < floor:
+            continue
+        entry = (sim, -report_id, name)
+        if len(best) < top_k:
+            heapq.heappush(best, entry)
+        elif entry > best[0]:
+            heapq.heapreplace(best, entry)
+    return [
+        {"report_id": -neg_id, "name": name, "similarity": sim}
+        for sim, neg_id, name in sorted(best, reverse=True)
+    ]
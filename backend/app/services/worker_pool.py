@@ -0,0 +1,99 @@
+"""Shared process pool for CPU-bound SQL analysis (parsing, pair scoring).
+
+Task functions live here so spawned workers only import the parser, not the
+web app or the database layer.
+"""
+import multiprocessing
+import threading
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from itertools import islice
+from typing import Any, Callable, Iterable, Iterator
+
+from app.config import settings
+from app.utils.sql_parser import ParsedSQL, sql_similarity_percent
+
+_pool: ProcessPoolExecutor | None = None
+_pool_workers = 0
+_lock = threading.Lock()
+
+
+def get_process_pool(workers: int | None = None) -> ProcessPoolExecutor | None:
+    """Shared pool with settings.coe_workers processes; None when set to 0 or 1."""
+    global _pool, _pool_workers
+    workers = settings.coe_workers if workers is None else workers
+    if workers <= 1:
+        return None
+    with _lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False, cancel_futures=True)
+            # spawn: forking a threaded server can deadlock on inherited locks
+            _pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            _pool_workers = workers
+        return _pool
+
+
+def pool_workers() -> int:
+    """Worker processes of the shared pool (0 when none is running)."""
+    return _pool_workers
+
+
+def shutdown_process_pool() -> None:
+    global _pool, _pool_workers
+    with _lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True, cancel_futures=True)
+        _pool, _pool_workers = None, 0
+
+
+def chunked(items: Iterable, size: int) -> Iterator[list]:
+    it = iter(items)
+    while chunk := list(islice(it, size)):
+        yield chunk
+
+
+def imap_ordered(
+    fn: Callable[[Any], Any],
+    tasks: Iterable,
+    pool: Executor | None = None,
+    max_pending: int | None = None,
+) -> Iterator[Any]:
+    """
+    Yield fn(task) for each task, in task order. With a pool, at most
+    max_pending tasks are in flight so lazy task streams stay bounded.
+    """
+    if pool is None:
+        for task in tasks:
+            yield fn(task)
+        return
+    max_pending = max_pending or 2 * max(_pool_workers, 1)
+    pending: deque = deque()
+    for task in tasks:
+        pending.append(pool.submit(fn, task))
+        if len(pending) >= max_pending:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def parse_chunk(sqls: list[str]) -> list[ParsedSQL]:
+    """Pool task: parse a chunk of SQL strings."""
+    return [ParsedSQL(sql, keep_tokens=False) for sql in sqls]
+
+
+def similarity_chunk(task: tuple) -> list[tuple[int, int, float]]:
+    """
+    Pool task: score (i, j) pairs against a threshold.
+    task = (pairs, {index: ParsedSQL}, threshold); returns only pairs reaching it.
+    """
+    pairs, parsed, threshold = task
+    hits = []
+    for i, j in pairs:
+        sim = sql_similarity_percent(parsed[i], parsed[j], threshold=threshold)
+        if sim >= threshold:
+            hits.append((i, j, sim))
+    return hits
@@ -0,0 +1,97 @@
+"""Thread-safe bounded LRU cache with optional TTL and hit/miss counters."""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+_MISSING = object()
+
+
+class LRUCache:
+    """
+    Least-recently-used cache bounded by entry count and, optionally, by a total
+    weight (e.g. approximate bytes) computed per value with `weigh`. With `ttl`
+    (seconds) entries also expire that long after they were set.
+    """
+
+    def __init__(
+        self,
+        maxsize: int,
+        max_weight: int | None = None,
+        weigh: Callable[[Any], int] | None = None,
+        ttl: float | None = None,
+    ):
+        self.maxsize = maxsize
+        self.max_weight = max_weight
+        self.ttl = ttl
+        self._weigh = weigh or (lambda value: 1)
+        self._data: OrderedDict[Hashable, tuple[Any, int, float | None]] = OrderedDict()
+        self._weight = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is not _MISSING and item[2] is not None and item[2] <= time.monotonic():
+                del self._data[key]
+                self._weight -= item[1]
+                item = _MISSING
+            if item is _MISSING:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        weight = self._weigh(value)
+        expires = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._weight -= old[1]
+            self._data[key] = (value, weight, expires)
+            self._weight += weight
+            while self._data and (
+                len(self._data) > self.maxsize
+                or (self.max_weight is not None and self._weight > self.max_weight)
+            ):
+                _, (_, evicted_weight, _) = self._data.popitem(last=False)
+                self._weight -= evicted_weight
+                self.evictions += 1
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.pop(key, None)
+            if item is None:
+                return default
+            self._weight -= item[1]
+            return item[0]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._weight = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data
+
+    def stats(self) -> dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "weight": self._weight,
+            "max_weight": self.max_weight,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
@@ -0,0 +1,270 @@
+"""In-process metrics with Prometheus text exposition.
+
+Counters, gauges and histograms keyed by label values, plus per-request timing
+totals: while a request is instrumented (see app.core.instrumentation), time
+recorded with `timed` functions and `record_timing` is also summed for that
+request and reported in its Server-Timing header. Only the outermost timed
+call is recorded: a timed function called by another (parse inside
+complexity scoring) counts toward the caller's stage, so stage totals never
+count the same time twice and add up to at most the request time. The
+request totals live in a context variable, so work the request runs in
+worker threads (run_db, run_cpu) is counted; work done in COE worker
+processes is not.
+"""
+import math
+import threading
+import time
+from contextvars import ContextVar
+from functools import wraps
+from typing import Callable, Iterable, TypeVar
+
+from app.config import settings
+
+T = TypeVar("T")
+
+# Request latency buckets in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self) -> list[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = ()):
+        super().__init__(name, help, labels)
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, *labels, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels) -> float:
+        return self._values.get(labels, 0)
+
+    def render(self) -> list[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self._header() + [
+            f"{self.name}{_labels(self.label_names, key)} {_number(value)}" for key, value in items
+        ]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+
+class Summary(_Metric):
+    """
+    Count and sum of observations (no quantiles), cheap enough for hot code:
+    each thread adds to its own totals without a lock; render() merges them.
+    """
+    kind = "summary"
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = ()):
+        super().__init__(name, help, labels)
+        self._local = threading.local()
+        # One labels -> [count, sum] dict per thread that observed, kept after
+        # the thread exits so totals never go down
+        self._shards: list[dict[tuple, list]] = []
+
+    def _shard(self) -> dict[tuple, list]:
+        try:
+            return self._local.values
+        except AttributeError:
+            values = self._local.values = {}
+            with self._lock:
+                self._shards.append(values)
+            return values
+
+    def observe(self, value: float, *labels) -> None:
+        values = self._shard()
+        entry = values.get(labels)
+        if entry is None:
+            entry = values[labels] = [0, 0.0]
+        entry[0] += 1
+        entry[1] += value
+
+    def render(self) -> list[str]:
+        with self._lock:
+            shards = list(self._shards)
+        merged: dict[tuple, list] = {}
+        for values in shards:
+            for key, (count, total) in dict(values).items():
+                entry = merged.setdefault(key, [0, 0.0])
+                entry[0] += count
+                entry[1] += total
+        lines = self._header()
+        for key, (count, total) in sorted(merged.items()):
+            lines.append(f"{self.name}_count{_labels(self.label_names, key)} {count}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, key)} {_number(total)}")
+        return lines
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: Iterable[str] = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # labels -> [per-bucket counts (not cumulative), count, sum]
+        self._values: dict[tuple, list] = {}
+
+    def observe(self, value: float, *labels) -> None:
+        index = 0
+        while value > self.buckets[index]:
+            index += 1
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * len(self.buckets), 0, 0.0]
+            entry[0][index] += 1
+            entry[1] += 1
+            entry[2] += value
+
+    def render(self) -> list[str]:
+        with self._lock:
+            items = sorted((key, (list(counts), count, total)) for key, (counts, count, total) in self._values.items())
+        lines = self._header()
+        for key, (counts, count, total) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                le = 'le="' + _number(bound) + '"'
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, key, le)} {cumulative}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, key)} {count}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, key)} {_number(total)}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labels: Iterable[str] = ()) -> Counter:
+        return self.register(Counter(name, help, labels))
+
+    def gauge(self, name: str, help: str, labels: Iterable[str] = ()) -> Gauge:
+        return self.register(Gauge(name, help, labels))
+
+    def summary(self, name: str, help: str, labels: Iterable[str] = ()) -> Summary:
+        return self.register(Summary(name, help, labels))
+
+    def histogram(
+        self, name: str, help: str, labels: Iterable[str] = (), buckets: Iterable[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self.register(Histogram(name, help, labels, buckets))
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format (0.0.4)."""
+        lines: list[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+function_seconds = registry.summary(
+    "sql_analysis_function_seconds",
+    "Calls of and seconds in SQL analysis functions, outermost timed calls only (this process).",
+    ["function"],
+)
+
+# name -> [seconds, count] for the request being served, None outside requests
+_request_timings: ContextVar[dict[str, list] | None] = ContextVar("request_timings", default=None)
+# Whether a timed function is running in this context (nested ones are not recorded)
+_in_timed: ContextVar[bool] = ContextVar("in_timed", default=False)
+
+
+def start_request_timings() -> dict[str, list]:
+    """Start collecting timings for the current request; returns the totals dict."""
+    timings: dict[str, list] = {}
+    _request_timings.set(timings)
+    return timings
+
+
+def record_timing(name: str, seconds: float) -> None:
+    """Add `seconds` under `name` to the current request's Server-Timing totals."""
+    timings = _request_timings.get()
+    if timings is not None:
+        entry = timings.get(name)
+        if entry is None:
+            timings[name] = [seconds, 1]
+        else:
+            entry[0] += seconds
+            entry[1] += 1
+
+
+def timed(name: str) -> Callable[[Callable[..., T]], Callable[..., T]]:
+    """
+    Decorator counting calls of and seconds in a function, as
+    sql_analysis_function_seconds{function=name} and in the request's timings.
+    Calls made while another timed function runs are not counted (their time
+    is in the outer one's). No-op when settings.metrics_enabled is off.
+    """
+    def decorate(fn: Callable[..., T]) -> Callable[..., T]:
+        if not settings.metrics_enabled:
+            return fn
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _in_timed.get():
+                return fn(*args, **kwargs)
+            token = _in_timed.set(True)
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                _in_timed.reset(token)
+                function_seconds.observe(elapsed, name)
+                record_timing(name, elapsed)
+
+        return wrapper
+
+    return decorate
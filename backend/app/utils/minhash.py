@@ -0,0 +1,107 @@
+"""MinHash signatures and LSH banding for near-duplicate candidate search.
+
+Combined similarity is 0.6 * Jaccard + 0.4 * Levenshtein, so a pair can only
+reach a threshold T (0-100) when its token Jaccard is at least
+(T/100 - 0.4) / 0.6 (0.75 for the 85% cut-off). The banding below (40 bands
+of 4 rows) makes a pair with Jaccard 0.75 a candidate with probability
+1 - (1 - 0.75**4)**40 > 0.9999997 (higher as Jaccard grows). Banding is
+probabilistic: each qualifying pair is missed with probability about 3e-7,
+so a corpus with many such pairs can lose one. Candidate search matches an
+exhaustive scan with very high probability while skipping the vast majority
+of pairs; callers needing exact results scan every pair instead
+(analyze_coe_stream(exhaustive=True)).
+"""
+import hashlib
+import zlib
+from collections import defaultdict
+from itertools import combinations
+from typing import Hashable, Iterable
+
+import numpy as np
+
+NUM_BANDS = 40
+ROWS_PER_BAND = 4
+NUM_PERM = NUM_BANDS * ROWS_PER_BAND
+
+# Smallest prime above 2**32; a, b < 2**32 keep (a * h + b) inside uint64.
+_PRIME = np.uint64(4294967311)
+_MAX_HASH = np.uint64(0xFFFFFFFF)
+_rng = np.random.RandomState(1)
+_PERM_A = _rng.randint(1, 2**32 - 1, size=NUM_PERM, dtype=np.uint64)
+_PERM_B = _rng.randint(0, 2**32 - 1, size=NUM_PERM, dtype=np.uint64)
+
+
+def min_jaccard_for_threshold(threshold: float) -> float:
+    """Lowest Jaccard (0-1) that can still reach a combined similarity percent."""
+    # sql_similarity_percent rounds to 2 decimals, so allow half a hundredth.
+    return max(0.0, ((threshold - 0.005) / 100 - 0.4) / 0.6)
+
+
+def _token_hashes(tokens: Iterable[str]) -> np.ndarray:
+    return np.fromiter(
+        (zlib.crc32(t.encode("utf-8")) for t in tokens),
+        dtype=np.uint64,
+    )
+
+
+def minhash_signature(tokens: Iterable[str]) -> np.ndarray:
+    """MinHash signature (NUM_PERM uint64 values) of a token set."""
+    hashes = _token_hashes(tokens)
+    if hashes.size == 0:
+        return np.full(NUM_PERM, _MAX_HASH, dtype=np.uint64)
+    permuted = (np.outer(_PERM_A, hashes) + _PERM_B[:, None]) % _PRIME
+    return (permuted & _MAX_HASH).min(axis=1)
+
+
+def band_keys(signature: np.ndarray) -> list[bytes]:
+    """One bucket key per band of a signature."""
+    return [
+        signature[b * ROWS_PER_BAND:(b + 1) * ROWS_PER_BAND].tobytes()
+        for b in range(NUM_BANDS)
+    ]
+
+
+def band_hashes(signature: np.ndarray) -> list[int]:
+    """Band keys as signed 64-bit integers, for storing bands in a database."""
+    return [
+        int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), "big", signed=True)
+        for key in band_keys(signature)
+    ]
+
+
+class LSHIndex:
+    """Banded LSH index mapping signature bands to the keys that share them."""
+
+    def __init__(self):
+        self._buckets: list[dict[bytes, list[Hashable]]] = [
+            defaultdict(list) for _ in range(NUM_BANDS)
+        ]
+
+    def add(self, key: Hashable, signature: np.ndarray) -> None:
+        for band, band_key in enumerate(band_keys(signature)):
+            self._buckets[band][band_key].append(key)
+
+    def query(self, signature: np.ndarray) -> set:
+        """Keys sharing at least one band with the signature."""
+        found = set()
+        for band, band_key in enumerate(band_keys(signature)):
+            found.update(self._buckets[band].get(band_key, ()))
+        return found
+
+    def candidate_pairs(self) -> set[tuple]:
+        """All key pairs that share at least one band (each pair sorted)."""
+        pairs = set()
+        for buckets in self._buckets:
+            for keys in buckets.values():
+                if len(keys) > 1:
+                    pairs.update(combinations(sorted(keys), 2))
+        return pairs
+
+
+def candidate_pairs(token_sets: list[set]) -> list[tuple[int, int]]:
+    """Index pairs (i < j), in scan order, whose token sets may be near-duplicates."""
+    index = LSHIndex()
+    for i, tokens in enumerate(token_sets):
+        if tokens:
+            index.add(i, minhash_signature(tokens))
+    return sorted(index.candidate_pairs())
@@ -0,0 +1,336 @@
+"""Single-pass SQL lexer: sqlparse's token stream without sqlparse's parse.
+
+sqlparse lexes by trying each of its ~60 rules in turn at every position in
+Python, wraps every token in an object, then builds a grouping tree that the
+scoring and fingerprinting code never looks at. Here the same rules, in the
+same order, are compiled into one master regex (alternation is ordered, so
+the first rule that matches wins, as in sqlparse) and keywords are looked up
+in one merged dict, so tokenize() returns exactly sqlparse.lexer.tokenize()'s
+(ttype, value) pairs. split_statements() and strip_comments() reproduce what
+ParsedSQL used from the parse on those flat tokens: statement boundaries and
+the text left by StripCommentsFilter.
+
+sqlparse refuses some inputs during grouping (more than
+MAX_GROUPING_TOKENS tokens in a statement, groups nested deeper than
+MAX_GROUPING_DEPTH), which ParsedSQL records as a parse error.
+needs_sqlparse() flags statements that could hit those limits so that
+callers can let sqlparse decide.
+"""
+import re
+
+from sqlparse import keywords
+from sqlparse import tokens as T
+from sqlparse.engine import grouping
+
+# Keyword dicts in the order Lexer.default_initialization() adds them; the
+# first dict that has a word decides its type.
+_KEYWORD_DICTS = (
+    keywords.KEYWORDS_COMMON,
+    keywords.KEYWORDS_ORACLE,
+    keywords.KEYWORDS_MYSQL,
+    keywords.KEYWORDS_PLPGSQL,
+    keywords.KEYWORDS_HQL,
+    keywords.KEYWORDS_MSACCESS,
+    keywords.KEYWORDS_SNOWFLAKE,
+    keywords.KEYWORDS_BIGQUERY,
+    keywords.KEYWORDS,
+)
+_KEYWORDS: dict = {}
+for _words in reversed(_KEYWORD_DICTS):
+    _KEYWORDS.update(_words)
+
+_BACKREF = re.compile(r"\\(\\|\d+)")
+
+
+class _Within(dict):
+    """ttype -> whether it is `parent` or one of its subtypes, cached
+    (sqlparse's `ttype in parent` walks the type's parents every time)."""
+
+    def __init__(self, parent):
+        super().__init__()
+        self.parent = parent
+
+    def __missing__(self, ttype) -> bool:
+        self[ttype] = within = ttype in self.parent
+        return within
+
+
+IS_KEYWORD = _Within(T.Keyword)
+IS_COMMENT = _Within(T.Comment)
+IS_WHITESPACE = _Within(T.Whitespace)
+IS_NEWLINE = _Within(T.Newline)
+IS_OPERATOR = _Within(T.Operator)
+
+
+def _compile_rules() -> tuple[re.Pattern, dict]:
+    """One pattern for all of keywords.SQL_REGEX, plus group index -> action."""
+    parts, actions = [], {}
+    group = 1
+    for rx, action in keywords.SQL_REGEX:
+        # Each rule becomes one outer group; its backreferences shift with it.
+        shifted = _BACKREF.sub(
+            lambda m: m.group(0) if m.group(1) == "\\" else f"\\{int(m.group(1)) + group}", rx
+        )
+        parts.append(f"({shifted})")
+        actions[group] = action
+        group += 1 + re.compile(rx).groups
+    # No rule matched: sqlparse emits the character as an Error token
+    parts.append(r"([\s\S])")
+    actions[group] = T.Error
+    return re.compile("|".join(parts), re.IGNORECASE | re.UNICODE), actions
+
+
+_MASTER, _ACTIONS = _compile_rules()
+
+
+def tokenize(sql: str) -> list[tuple]:
+    """(ttype, value) pairs, the same as sqlparse.lexer.tokenize(sql)."""
+    stream = []
+    append = stream.append
+    actions, words, as_keyword = _ACTIONS, _KEYWORDS, keywords.PROCESS_AS_KEYWORD
+    for m in _MASTER.finditer(sql):
+        # The rule's outer group closes last, so it is the match's lastindex
+        action = actions[m.lastindex]
+        value = m.group()
+        if action is as_keyword:
+            append((words.get(value.upper(), T.Name), value))
+        else:
+            append((action, value))
+    return stream
+
+
+class _Splitter:
+    """sqlparse's StatementSplitter on (ttype, value) pairs."""
+
+    def __init__(self):
+        self.in_declare = False
+        self.in_case = False
+        self.is_create = False
+        self.begin_depth = 0
+        self.seen_begin = False
+
+    def level_change(self, ttype, value: str) -> int:
+        if ttype is T.Punctuation and value == "(":
+            return 1
+        if ttype is T.Punctuation and value == ")":
+            return -1
+        if not IS_KEYWORD[ttype]:
+            return 0
+        unified = value.upper()
+        if ttype is T.Keyword.DDL and unified.startswith("CREATE"):
+            self.is_create = True
+            return 0
+        if unified == "DECLARE" and self.is_create and self.begin_depth == 0:
+            self.in_declare = True
+            return 1
+        if unified == "BEGIN":
+            self.begin_depth += 1
+            self.seen_begin = True
+            return 1 if self.is_create else 0
+        if self.seen_begin and (ttype is T.Keyword or ttype is T.Name) and unified in (
+            "TRANSACTION", "WORK", "TRAN", "DISTRIBUTED", "DEFERRED", "IMMEDIATE", "EXCLUSIVE",
+        ):
+            self.begin_depth = max(0, self.begin_depth - 1)
+            self.seen_begin = False
+            return 0
+        if unified == "END":
+            if not self.in_case:
+                self.begin_depth = max(0, self.begin_depth - 1)
+            else:
+                self.in_case = False
+            return -1
+        if unified in ("IF", "FOR", "WHILE", "CASE") and self.is_create and self.begin_depth > 0:
+            if unified == "CASE":
+                self.in_case = True
+            return 1
+        if unified in ("END IF", "END FOR", "END WHILE"):
+            return -1
+        return 0
+
+
+# Tokens that may follow a statement's ";" and still belong to it
+_END_OF_STATEMENT = (T.Whitespace, T.Comment.Single)
+_NOT_CODE = (T.Whitespace, T.Newline, T.Comment.Single, T.Comment.Multiline)
+
+
+def split_statements(stream: list[tuple]) -> list[list[tuple]]:
+    """The token stream cut into statements, as sqlparse.parse() cuts it."""
+    statements = []
+    current: list[tuple] = []
+    splitter = _Splitter()
+    level = 0
+    consume_ws = False
+    for ttype, value in stream:
+        if consume_ws and ttype not in _END_OF_STATEMENT:
+            statements.append(current)
+            current, splitter, level, consume_ws = [], _Splitter(), 0, False
+        level += splitter.level_change(ttype, value)
+        current.append((ttype, value))
+        if ttype is T.Punctuation and value == ";":
+            if splitter.seen_begin:
+                splitter.begin_depth = max(0, splitter.begin_depth - 1)
+            splitter.seen_begin = False
+            if level <= 0 and splitter.begin_depth == 0:
+                consume_ws = True
+        elif ttype is T.Keyword and value.split()[0] == "GO":
+            consume_ws = True
+        elif ttype not in _NOT_CODE and not (ttype is T.Keyword and value.upper() == "BEGIN"):
+            splitter.seen_begin = False
+    if current and not all(IS_WHITESPACE[ttype] for ttype, _ in current):
+        statements.append(current)
+    return statements
+
+
+_HINTS = (T.Comment.Multiline.Hint, T.Comment.Single.Hint)
+_TRAILING_NEWLINES = re.compile(r"([\r\n]+) *$")
+
+
+def _comment_group_end(statement: list[tuple], start: int) -> int | None:
+    """
+    End of the comment group sqlparse makes from the comment at `start`: the
+    comments and line breaks after it. None when they run to the end of the
+    statement, where sqlparse leaves the comments ungrouped.
+    """
+    end, n = start + 1, len(statement)
+    while end < n and (IS_COMMENT[statement[end][0]] or IS_NEWLINE[statement[end][0]]):
+        end += 1
+    return end if end < n else None
+
+
+def strip_comments(statement: list[tuple]) -> list[tuple]:
+    """
+    The statement's tokens after StripCommentsFilter (for statements that
+    needs_sqlparse() lets through). Each comment group, together with
+    the groups that follow it after nothing but whitespace (sqlparse's
+    align_comments nests those into it), is dropped when nothing or an
+    opening parenthesis comes before it. Otherwise it is replaced by its
+    trailing line break, or by a space when it has none.
+    """
+    if not any(IS_COMMENT[ttype] for ttype, _ in statement):
+        return statement
+    out: list[tuple] = []
+    i, n = 0, len(statement)
+    while i < n:
+        ttype, value = statement[i]
+        if not IS_COMMENT[ttype]:
+            out.append((ttype, value))
+            i += 1
+            continue
+        end = _comment_group_end(statement, i)
+        if end is None:
+            end = i + 1
+        else:
+            while True:
+                after = end
+                while after < n and IS_WHITESPACE[statement[after][0]]:
+                    after += 1
+                if after == n or not IS_COMMENT[statement[after][0]]:
+                    break
+                following = _comment_group_end(statement, after)
+                if following is None:
+                    break
+                end = following
+        if out and out[-1] != (T.Punctuation, "("):
+            m = _TRAILING_NEWLINES.search("".join(v for _, v in statement[i:end]))
+            out.append((T.Newline, m.group(1)) if m else (T.Whitespace, " "))
+        i = end
+    return out
+
+
+# Group levels charged per open parenthesis or CASE (a Parenthesis inside a
+# Function inside an Identifier, ...); measured at 2-3 in sqlparse 0.5
+_LEVELS_PER_NESTING = 4
+# Statements whose estimated depth is above this are left to sqlparse
+_DEPTH_BUDGET = (grouping.MAX_GROUPING_DEPTH or 0) * 6 // 10
+# Keywords that end an operator chain (operands cannot be keywords but for a few)
+_CHAIN_BREAKS = frozenset([
+    "AND", "OR", "NOT", "WHERE", "FROM", "ON", "WHEN", "THEN", "ELSE", "HAVING", "GROUP BY", "ORDER BY",
+    "UNION", "UNION ALL", "INTERSECT", "EXCEPT", "MINUS", "LIMIT", "OFFSET", "USING", "IN", "BETWEEN",
+])
+
+
+def _groups_comments(ttype, value: str) -> bool:
+    """Tokens whose sqlparse group may start with the comment before them (x AS y, x::t, x := y)."""
+    return (
+        ttype is T.Assignment
+        or ttype is T.Keyword.TZCast
+        or (ttype is T.Punctuation and value == "::")
+        or (ttype is T.Keyword and value.upper() == "AS")
+    )
+
+
+def _comment_grouping_differs(statement: list[tuple]) -> bool:
+    """
+    Whether a comment sits next to a token in _groups_comments, follows a
+    "(" that is never closed (no Parenthesis group starts there, so the "("
+    may end up in some other group), or is an optimizer hint: there, what
+    StripCommentsFilter leaves depends on the grouping tree and
+    strip_comments() cannot tell.
+    """
+    before = None
+    pending = False
+    # One entry per open "(": whether a comment follows it
+    opens: list[bool] = []
+    for ttype, value in statement:
+        if IS_COMMENT[ttype]:
+            if ttype in _HINTS:
+                return True
+            if not pending and before == (T.Punctuation, "("):
+                opens[-1] = True
+            pending = True
+        elif not IS_WHITESPACE[ttype]:
+            if pending and (_groups_comments(ttype, value) or (before and _groups_comments(*before))):
+                return True
+            before, pending = (ttype, value), False
+            if ttype is T.Punctuation:
+                if value == "(":
+                    opens.append(False)
+                elif value == ")" and opens:
+                    opens.pop()
+    return any(opens) or (pending and before is not None and _groups_comments(*before))
+
+
+def needs_sqlparse(statement: list[tuple]) -> bool:
+    """
+    Whether this statement's features have to come from sqlparse itself:
+    sqlparse might refuse to group it (its result, a parse error or not,
+    cannot be predicted from the tokens), or its comments are stripped in a
+    way that depends on the grouping (see _comment_grouping_differs). The
+    nesting estimate is an upper bound: besides parentheses and CASE, each
+    operator of an unbroken a + b + c chain nests one more Operation.
+    """
+    if grouping.MAX_GROUPING_TOKENS is not None and len(statement) > grouping.MAX_GROUPING_TOKENS:
+        return True
+    if _comment_grouping_differs(statement):
+        return True
+    if grouping.MAX_GROUPING_DEPTH is None:
+        return False
+    outer: list[int] = []
+    base = chain = deepest = 0
+    for ttype, value in statement:
+        if IS_WHITESPACE[ttype] or IS_COMMENT[ttype]:
+            continue
+        opens = ttype is T.Punctuation and value == "("
+        closes = ttype is T.Punctuation and value == ")"
+        if IS_KEYWORD[ttype]:
+            word = value.upper()
+            opens = word == "CASE"
+            closes = word.startswith("END")
+            if not (opens or closes) and (
+                ttype is not T.Keyword or word in _CHAIN_BREAKS or word.endswith("JOIN")
+            ):
+                chain = 0
+        if opens:
+            outer.append(chain)
+            base += _LEVELS_PER_NESTING + chain
+            chain = 0
+        elif closes and outer:
+            chain = outer.pop()
+            base -= _LEVELS_PER_NESTING + chain
+        elif IS_OPERATOR[ttype] or ttype is T.Wildcard:
+            chain += 1
+            deepest = max(deepest, base + chain)
+        elif ttype is T.Punctuation and value in (",", ";"):
+            chain = 0
+        deepest = max(deepest, base)
+    return deepest > _DEPTH_BUDGET
@@ -1,89 +1,241 @@
 """SQL parsing and complexity scoring per handoff spec."""
 import re
 import hashlib
-from typing import Any
+from collections import Counter
+from typing import Any, Iterable
 
+import numpy as np
 import sqlparse
-from sqlparse.sql import Statement, Token
-from sqlparse.tokens import Keyword, DML
+from sqlparse import tokens as T
+from sqlparse.filters import StripCommentsFilter
+from sqlparse.tokens import Keyword
+from sqlparse.utils import split_unquoted_newlines
 
+from app.config import settings
+from app.utils import sql_lexer
+from app.utils.metrics import timed
 
-def _count_keyword(tokens: list, keyword: str) -> int:
-    return sum(1 for t in tokens if t.ttype is Keyword and t.value.upper() == keyword.upper())
+# ParsedSQL engines
+SQLPARSE_ENGINE = "sqlparse"
+LEXER_ENGINE = "lexer"
 
 
-def _count_any_keywords(tokens: list, keywords: list) -> int:
-    upper = [k.upper() for k in keywords]
-    return sum(1 for t in tokens if t.ttype is Keyword and t.value.upper() in upper)
+class ParsedSQL:
+    """
+    One SQL string tokenized once, with everything the analyzers derive from it:
+    flattened tokens of the first statement, uppercase keyword counts,
+    normalized text, fingerprint and token set. All sql_parser functions accept
+    either a raw string or a ParsedSQL, so a request parses each query once.
+
+    engine (default settings.sql_parser_engine) is "sqlparse", a full
+    sqlparse.parse(), or "lexer", the single-pass app.utils.sql_lexer, which
+    derives the same features several times faster; statements the lexer
+    cannot vouch for are still parsed by sqlparse. With the lexer, tokens are
+    the lexer's (sqlparse's grouping retypes a multiplication * as Operator).
+    """
+
+    __slots__ = (
+        "sql", "sql_upper", "statement_count", "parse_error", "tokens",
+        "keywords", "normalized", "fingerprint", "token_set",
+    )
+
+    @timed("parse")
+    def __init__(self, sql: str | None, keep_tokens: bool = True, engine: str | None = None):
+        self.sql = sql or ""
+        self.sql_upper = self.sql.upper()
+        self.parse_error = False
+        statements = None
+        try:
+            streams = None
+            if (engine or settings.sql_parser_engine) == LEXER_ENGINE:
+                streams = sql_lexer.split_statements(sql_lexer.tokenize(self.sql))
+                if any(sql_lexer.needs_sqlparse(stream) for stream in streams):
+                    streams = None
+            if streams is None:
+                statements = sqlparse.parse(self.sql)
+                streams = [[(t.ttype, t.value) for t in stmt.flatten()] for stmt in statements]
+        except Exception:
+            self.parse_error = True
+            statements, streams = [], []
+        self.statement_count = len(streams)
+        tokens = streams[0] if streams else []
+        # Keyword index keeps the handoff semantics: plain Keyword ttype only.
+        self.keywords = Counter(v.upper() for tt, v in tokens if tt is Keyword)
+        if self.parse_error:
+            self.token_set = frozenset(re.findall(r"\w+", self.sql_upper))
+            # Comments cannot be stripped without a parse; only fix keyword case.
+            stripped = self.sql
+        else:
+            self.token_set = frozenset(
+                v.upper() for tt, v in tokens if tt and tt not in (T.Whitespace, T.Newline)
+            )
+            if statements is None:
+                stripped_streams = [sql_lexer.strip_comments(stream) for stream in streams]
+            else:
+                stripped_streams = [_stripped_stream(stmt, stream) for stmt, stream in zip(statements, streams)]
+            stripped = "".join(_serialized("".join(v for _, v in stream)) for stream in stripped_streams)
+        if stripped == self.sql and not self.parse_error:
+            # Nothing stripped: lexing the text again would give the same statements.
+            text = "".join(_uppercase_keywords(stream) for stream in streams)
+        else:
+            text = _keywords_upper(stripped)
+        self.normalized = _normalize_text(text) if self.sql else ""
+        self.fingerprint = hashlib.sha256(self.normalized.encode()).hexdigest()
+        self.tokens = tokens if keep_tokens else []
+
+    @classmethod
+    def restore(
+        cls,
+        sql: str,
+        normalized: str,
+        fingerprint: str,
+        token_set: frozenset,
+        keywords: dict[str, int],
+        statement_count: int,
+        parse_error: bool = False,
+    ) -> "ParsedSQL":
+        """Rebuild from stored features without parsing (tokens are not kept)."""
+        parsed = cls.__new__(cls)
+        parsed.sql = sql
+        parsed.sql_upper = sql.upper()
+        parsed.statement_count = statement_count
+        parsed.parse_error = parse_error
+        parsed.tokens = []
+        parsed.keywords = Counter(keywords)
+        parsed.normalized = normalized
+        parsed.fingerprint = fingerprint
+        parsed.token_set = frozenset(token_set)
+        return parsed
+
+
+def _parsed(sql: "str | ParsedSQL | None") -> ParsedSQL:
+    return sql if isinstance(sql, ParsedSQL) else ParsedSQL(sql, keep_tokens=False)
+
+
+def _uppercase_keywords(stream) -> str:
+    is_keyword = sql_lexer.IS_KEYWORD
+    return "".join(v.upper() if is_keyword[tt] else v for tt, v in stream)
+
+
+def _stripped_stream(statement, stream: list[tuple]) -> list[tuple]:
+    """
+    Statement tokens with comments stripped, as sqlparse.format(strip_comments=True)
+    strips them, reusing the already grouped statement instead of parsing again.
+    """
+    if any(sql_lexer.IS_COMMENT[tt] for tt, _ in stream):
+        StripCommentsFilter().process(statement)
+        stream = [(t.ttype, t.value) for t in statement.flatten()]
+    return stream
 
 
-def _flatten_tokens(parsed: Statement) -> list:
-    return list(parsed.flatten())
+def _serialized(text: str) -> str:
+    """A statement's text as sqlparse.format() outputs it: trailing spaces cut from every line."""
+    return "\n".join(line.rstrip() for line in split_unquoted_newlines(text))
+
+
+def _keywords_upper(text: str) -> str:
+    """
+    sqlparse.format(text, keyword_case="upper"): the text is lexed and split
+    into statements again, since stripping comments and trailing spaces can
+    join tokens ("GO select" becomes "GOselect").
+    """
+    statements = sql_lexer.split_statements(sql_lexer.tokenize(text))
+    return "".join(_serialized(_uppercase_keywords(stream)) for stream in statements)
+
+
+def _normalize_text(text: str) -> str:
+    # Replace numeric and string literals with placeholder
+    normalized = re.sub(r"\b\d+\b", "?", text)
+    normalized = re.sub(r"'[^']*'", "?", normalized)
+    return re.sub(r"\s+", " ", normalized).strip()
+
+
+# Complexity features: columns of the feature matrix, in this order.
+COMPLEXITY_FEATURES = (
+    "selects", "joins", "subqueries", "set_ops", "cases", "aggregates",
+    "window_functions", "ctes", "recursive_cte", "lines",
+)
+_SELECTS, _JOINS, _SUBQUERIES, _SET_OPS, _CASES, _AGGREGATES, _WINDOWS, _CTES, _RECURSIVE, _LINES = range(
+    len(COMPLEXITY_FEATURES)
+)
+
+# Keyword (as counted in ParsedSQL.keywords) -> feature column it adds to
+_KEYWORD_FEATURES = {
+    "SELECT": _SELECTS,
+    **dict.fromkeys(["INNER JOIN", "LEFT JOIN", "RIGHT JOIN", "FULL JOIN", "CROSS JOIN", "JOIN"], _JOINS),
+    **dict.fromkeys(["UNION", "INTERSECT", "EXCEPT"], _SET_OPS),
+    "CASE": _CASES,
+    **dict.fromkeys(["SUM", "COUNT", "AVG", "MAX", "MIN", "STDDEV", "VARIANCE"], _AGGREGATES),
+    **dict.fromkeys(
+        ["ROW_NUMBER", "RANK", "DENSE_RANK", "NTILE", "LAG", "LEAD", "FIRST_VALUE", "LAST_VALUE"], _WINDOWS
+    ),
+    "WITH": _CTES,
+}
+
+# Score per unit of each counted feature (only SELECTs after the first count;
+# CTEs score 2 each, or 5 in all for WITH RECURSIVE; lines go by _LINE_PENALTIES)
+_FEATURE_WEIGHTS = (1, 2, 3, 2, 1, 1, 3, 0, 0, 0)
+_LINE_PENALTIES = ((1000, 10), (500, 5), (100, 2))
+
+_SUBQUERY = re.compile(r"\(\s*SELECT", re.IGNORECASE)
+
+
+def complexity_features(sql: "str | ParsedSQL") -> list[int]:
+    """
+    The query's complexity feature counts, in COMPLEXITY_FEATURES order, read
+    in one pass over its keyword counts. All zero for empty SQL.
+    """
+    parsed = _parsed(sql)
+    row = [0] * len(COMPLEXITY_FEATURES)
+    if not parsed.sql or (not parsed.statement_count and not parsed.parse_error):
+        return row
+    for keyword, count in parsed.keywords.items():
+        feature = _KEYWORD_FEATURES.get(keyword)
+        if feature is not None:
+            row[feature] += count
+    row[_SUBQUERIES] = len(_SUBQUERY.findall(parsed.sql))
+    row[_RECURSIVE] = int("WITH RECURSIVE" in parsed.sql_upper)
+    row[_LINES] = len(parsed.sql.splitlines())
+    return row
+
+
+def complexity_scores(features: np.ndarray) -> np.ndarray:
+    """Scores of a feature matrix (one complexity_features row per query)."""
+    features = np.asarray(features, dtype=np.int64).reshape(-1, len(COMPLEXITY_FEATURES))
+    counted = features.copy()
+    # Additional SELECTs are subqueries
+    counted[:, _SELECTS] = np.maximum(0, counted[:, _SELECTS] - 1)
+    score = 1.0 + counted @ np.array(_FEATURE_WEIGHTS, dtype=np.float64)
+    score += np.where(features[:, _RECURSIVE] > 0, 5, features[:, _CTES] * 2)
+    lines = features[:, _LINES]
+    score += np.select([lines > limit for limit, _ in _LINE_PENALTIES], [p for _, p in _LINE_PENALTIES], 0)
+    return np.round(score, 1)
+
+
+@timed("complexity_score_batch")
+def score_complexity(sqls: "Iterable[str | ParsedSQL | None]") -> tuple[np.ndarray, np.ndarray]:
+    """
+    Score a whole column of queries (a list or pandas Series of SQL strings or
+    ParsedSQL; missing values score as empty SQL). Returns the feature matrix,
+    int64 of shape (n, len(COMPLEXITY_FEATURES)), and the float64 scores, the
+    same as calculate_complexity_score gives per query.
+    """
+    rows = [complexity_features(sql if isinstance(sql, (str, ParsedSQL)) else None) for sql in sqls]
+    features = np.array(rows, dtype=np.int64).reshape(-1, len(COMPLEXITY_FEATURES))
+    return features, complexity_scores(features)
 
 
-def calculate_complexity_score(sql_query: str) -> float:
+@timed("complexity_score")
+def calculate_complexity_score(sql_query: "str | ParsedSQL") -> float:
     """
     Comprehensive SQL complexity scoring (handoff algorithm).
     Base 1 + SQL factors + length penalty.
     """
-    if not (sql_query or sql_query.strip()):
-        return 1.0
-    score = 1.0
-    sql_upper = sql_query.upper()
-    try:
-        parsed_list = sqlparse.parse(sql_query)
-        if not parsed_list:
-            return score
-        parsed = parsed_list[0]
-        tokens = _flatten_tokens(parsed)
-    except Exception:
-        tokens = []
-        parsed = None
-
-    # SELECT count (additional SELECTs = subqueries)
-    select_count = _count_keyword(tokens, "SELECT")
-    score += max(0, select_count - 1) * 1
-
-    # JOINs
-    join_count = _count_any_keywords(tokens, ["INNER JOIN", "LEFT JOIN", "RIGHT JOIN", "FULL JOIN", "CROSS JOIN", "JOIN"])
-    score += join_count * 2
-
-    # Subqueries (SELECT inside parens)
-    subquery_count = len(re.findall(r"\(\s*SELECT", sql_query, re.IGNORECASE))
-    score += subquery_count * 3
-
-    # UNION / INTERSECT / EXCEPT
-    set_ops = _count_any_keywords(tokens, ["UNION", "INTERSECT", "EXCEPT"])
-    score += set_ops * 2
-
-    # CASE
-    case_count = _count_keyword(tokens, "CASE")
-    score += case_count * 1
-
-    # Aggregates
-    agg = ["SUM", "COUNT", "AVG", "MAX", "MIN", "STDDEV", "VARIANCE"]
-    score += _count_any_keywords(tokens, agg) * 1
-
-    # Window functions
-    window = ["ROW_NUMBER", "RANK", "DENSE_RANK", "NTILE", "LAG", "LEAD", "FIRST_VALUE", "LAST_VALUE"]
-    score += _count_any_keywords(tokens, window) * 3
-
-    # CTE
-    cte_count = _count_keyword(tokens, "WITH")
-    if "WITH RECURSIVE" in sql_upper:
-        score += 5
-    else:
-        score += cte_count * 2
-
-    # Line count penalty
-    lines = len(sql_query.splitlines())
-    if lines > 1000:
-        score += 10
-    elif lines > 500:
-        score += 5
-    elif lines > 100:
-        score += 2
-
+    row = complexity_features(sql_query)
+    score = 1.0 + max(0, row[_SELECTS] - 1) * _FEATURE_WEIGHTS[_SELECTS]
+    score += sum(count * weight for count, weight in zip(row[1:], _FEATURE_WEIGHTS[1:]))
+    score += 5 if row[_RECURSIVE] else row[_CTES] * 2
+    score += next((penalty for limit, penalty in _LINE_PENALTIES if row[_LINES] > limit), 0)
     return round(score, 1)
 
 
@@ -97,48 +249,98 @@ def complexity_category(score: float) -> str:
     return "Very Complex"
 
 
+def complexity_categories(scores: np.ndarray) -> np.ndarray:
+    """complexity_category of each score, as an object array of labels."""
+    scores = np.asarray(scores)
+    return np.select(
+        [scores <= 5, scores <= 15, scores <= 30], ["Simple", "Medium", "Complex"], "Very Complex"
+    ).astype(object)
+
+
 def estimate_migration_hours(complexity_score: float) -> float:
     """Migration Hours = Complexity Score × 0.5"""
     return round(complexity_score * 0.5, 1)
 
 
-def normalize_sql_for_fingerprint(sql: str) -> str:
+def migration_hours(scores: np.ndarray) -> np.ndarray:
+    """estimate_migration_hours of each score."""
+    return np.round(np.asarray(scores, dtype=np.float64) * 0.5, 1)
+
+
+def normalize_sql_for_fingerprint(sql: "str | ParsedSQL") -> str:
     """Normalize SQL for duplicate detection: remove comments, whitespace, literals."""
-    if not sql:
-        return ""
-    try:
-        no_comments = sqlparse.format(sql, strip_comments=True)
-    except Exception:
-        no_comments = sql
-    no_comments = sqlparse.format(no_comments, reindent=False, keyword_case="upper")
-    # Replace numeric and string literals with placeholder
-    normalized = re.sub(r"\b\d+\b", "?", no_comments)
-    normalized = re.sub(r"'[^']*'", "?", normalized)
-    normalized = re.sub(r"\s+", " ", normalized).strip()
-    return normalized
+    return _parsed(sql).normalized
 
 
-def generate_sql_fingerprint(sql: str) -> str:
-    normalized = normalize_sql_for_fingerprint(sql)
-    return hashlib.sha256(normalized.encode()).hexdigest()
+def generate_sql_fingerprint(sql: "str | ParsedSQL") -> str:
+    return _parsed(sql).fingerprint
 
 
-def levenshtein_similarity(s1: str, s2: str) -> float:
-    """Return similarity 0-1 based on Levenshtein distance."""
+def _levenshtein_distance(s1: str, s2: str, max_dist: int | None = None) -> tuple[int, bool]:
+    """
+    Bit-parallel edit distance (Myers 1999 / Hyyrö 2003) on Python big ints.
+    Returns (distance, exact); with max_dist set it stops as soon as the distance
+    must exceed max_dist and returns a lower bound with exact=False.
+    """
+    # Common prefix/suffix never change the distance.
+    start = 0
+    limit = min(len(s1), len(s2))
+    while start < limit and s1[start] == s2[start]:
+        start += 1
+    end1, end2 = len(s1), len(s2)
+    while end1 > start and end2 > start and s1[end1 - 1] == s2[end2 - 1]:
+        end1 -= 1
+        end2 -= 1
+    s1, s2 = s1[start:end1], s2[start:end2]
+    # Bit vectors span the longer string, the loop walks the shorter one.
+    if len(s1) < len(s2):
+        s1, s2 = s2, s1
+    m, n = len(s1), len(s2)
+    if max_dist is not None and m - n > max_dist:
+        return m - n, False
+    if n == 0:
+        return m, True
+    peq: dict[str, int] = {}
+    for i, ch in enumerate(s1):
+        peq[ch] = peq.get(ch, 0) | (1 << i)
+    full = (1 << m) - 1
+    last = 1 << (m - 1)
+    vp, vn = full, 0
+    dist = m
+    for j, ch in enumerate(s2):
+        x = peq.get(ch, 0)
+        d0 = ((((x & vp) + vp) ^ vp) | x | vn) & full
+        hp = vn | (~(d0 | vp) & full)
+        hn = d0 & vp
+        if hp & last:
+            dist += 1
+        elif hn & last:
+            dist -= 1
+        hp = (hp << 1) | 1
+        hn <<= 1
+        vp = (hn | ~(d0 | hp)) & full
+        vn = hp & d0 & full
+        # Each remaining column lowers the last row by at most one.
+        if max_dist is not None and dist - (n - j - 1) > max_dist:
+            return dist - (n - j - 1), False
+    return dist, True
+
+
+def levenshtein_similarity(s1: str, s2: str, min_similarity: float | None = None) -> float:
+    """
+    Return similarity 0-1 based on Levenshtein distance.
+    With min_similarity set, the result is exact when it reaches min_similarity;
+    otherwise the scan stops early and returns an upper bound below it.
+    """
     if not s1 and not s2:
         return 1.0
     if not s1 or not s2:
         return 0.0
-    n, m = len(s1), len(s2)
-    prev = list(range(m + 1))
-    for i in range(1, n + 1):
-        curr = [i]
-        for j in range(1, m + 1):
-            cost = 0 if s1[i - 1] == s2[j - 1] else 1
-            curr.append(min(prev[j] + 1, curr[j - 1] + 1, prev[j - 1] + cost))
-        prev = curr
-    dist = prev[m]
-    max_len = max(n, m)
+    max_len = max(len(s1), len(s2))
+    max_dist = None
+    if min_similarity is not None:
+        max_dist = int((1.0 - min_similarity) * max_len + 1e-9)
+    dist, _ = _levenshtein_distance(s1, s2, max_dist)
     return 1.0 - (dist / max_len) if max_len else 1.0
 
 
@@ -150,46 +352,41 @@ def jaccard_similarity(tokens1: set, tokens2: set) -> float:
     return inter / union if union else 0.0
 
 
-def tokenize_sql(sql: str) -> set:
+def tokenize_sql(sql: "str | ParsedSQL") -> set:
     """Extract meaningful tokens (keywords and identifiers)."""
-    try:
-        parsed = sqlparse.parse(sql)
-        if not parsed:
-            return set()
-        tokens = []
-        for t in parsed[0].flatten():
-            if t.ttype and t.ttype not in (sqlparse.tokens.Whitespace, sqlparse.tokens.Newline):
-                tokens.append(t.value.upper())
-        return set(tokens)
-    except Exception:
-        return set(re.findall(r"\w+", sql.upper()))
-
-
-def sql_similarity_percent(sql1: str, sql2: str) -> float:
-    """Combined similarity as percentage (handoff: Jaccard + Levenshtein)."""
-    norm1 = normalize_sql_for_fingerprint(sql1)
-    norm2 = normalize_sql_for_fingerprint(sql2)
-    jaccard = jaccard_similarity(tokenize_sql(sql1), tokenize_sql(sql2))
-    lev = levenshtein_similarity(norm1, norm2)
+    return set(_parsed(sql).token_set)
+
+
+@timed("sql_similarity_percent")
+def sql_similarity_percent(
+    sql1: "str | ParsedSQL",
+    sql2: "str | ParsedSQL",
+    threshold: float | None = None,
+) -> float:
+    """
+    Combined similarity as percentage (handoff: Jaccard + Levenshtein).
+    With a threshold (percent), values that reach it are exact while lower ones
+    may be returned as an upper bound without finishing the Levenshtein scan.
+    """
+    p1, p2 = _parsed(sql1), _parsed(sql2)
+    jaccard = jaccard_similarity(p1.token_set, p2.token_set)
+    min_lev = None
+    if threshold is not None:
+        # Result is rounded to 2 decimals, so keep half a hundredth of slack.
+        min_lev = ((threshold - 0.005) / 100 - 0.6 * jaccard) / 0.4 - 1e-9
+        if min_lev > 1.0:
+            return round((0.6 * jaccard + 0.4) * 100, 2)
+        min_lev = max(0.0, min_lev)
+    lev = levenshtein_similarity(p1.normalized, p2.normalized, min_lev)
     combined = 0.6 * jaccard + 0.4 * lev
     return round(combined * 100, 2)
 
 
-def extract_table_names(sql: str) -> list[str]:
+@timed("extract_table_names")
+def extract_table_names(sql: "str | ParsedSQL") -> list[str]:
     """Simple extraction of table names from FROM and JOIN."""
-    names = set()
-    try:
-        parsed = sqlparse.parse(sql)
-        if not parsed:
-            return []
-        # Walk and find FROM ... and JOIN ... (simplified)
-        for token in parsed[0].tokens:
-            if token.ttype is Keyword and token.value.upper() in ("FROM", "JOIN"):
-                # Next token group often contains table name
-                pass
-        # Fallback: regex for FROM table and JOIN table
-        for m in re.finditer(r"(?:FROM|JOIN)\s+(\w+)", sql, re.IGNORECASE):
-            names.add(m.group(1).upper())
-        return sorted(names)
-    except Exception:
+    parsed = _parsed(sql)
+    if not parsed.statement_count:
         return []
+    names = {m.group(1).upper() for m in re.finditer(r"(?:FROM|JOIN)\s+(\w+)", parsed.sql, re.IGNORECASE)}
+    return sorted(names)
@@ -0,0 +1 @@
+# Offline benchmarks (run from backend/: python -m benchmarks.<module>)
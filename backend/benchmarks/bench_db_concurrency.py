@@ -0,0 +1,138 @@
+"""Load test: concurrent readers and writers against a file SQLite database.
+
+Writer threads bulk-insert reports and bump the dashboard KPIs the way COE
+promotion and bulk import do; reader threads run the dashboard aggregate at
+the same time. Compares the application engine (connection pool, WAL,
+synchronous=NORMAL, busy_timeout) with the previous setup: one StaticPool
+connection shared by every thread, no pragmas.
+
+Usage (from backend/):
+    python -m benchmarks.bench_db_concurrency [--writers 4] [--readers 8] [--seconds 5]
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+_DB_FILE = os.path.join(tempfile.mkdtemp(), "bench.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{_DB_FILE}"
+
+from sqlalchemy import create_engine, func, insert  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+from sqlalchemy.pool import StaticPool  # noqa: E402
+
+from app.database import engine, init_db  # noqa: E402
+from app.models.report import Report  # noqa: E402
+from app.services.dashboard_kpis import add_reports_kpis, report_contribution  # noqa: E402
+
+ROWS_PER_WRITE = 200
+
+
+def _write(session_factory, user_id: int, batch: int) -> None:
+    values = [
+        {
+            "name": f"bench-{batch}-{i}",
+            "sql_query": f"SELECT {i} FROM t{batch}",
+            "complexity_score": float(i % 40),
+            "complexity_category": "Simple",
+            "estimated_hours": 0.5,
+            "created_by": user_id,
+            "migrated": False,
+        }
+        for i in range(ROWS_PER_WRITE)
+    ]
+    with session_factory() as db:
+        db.execute(insert(Report), values)
+        add_reports_kpis(db, user_id, [report_contribution(v) for v in values])
+        db.commit()
+
+
+def _read(session_factory, user_id: int) -> None:
+    with session_factory() as db:
+        db.query(Report.complexity_category, func.count(), func.sum(Report.estimated_hours)).filter(
+            Report.created_by == user_id
+        ).group_by(Report.complexity_category).all()
+
+
+def run(label: str, session_factory, writers: int, readers: int, seconds: float) -> None:
+    # Same starting table for every run
+    with session_factory() as db:
+        db.query(Report).delete()
+        db.commit()
+    stop = time.perf_counter() + seconds
+    lock = threading.Lock()
+    write_times: list[float] = []
+    read_times: list[float] = []
+    errors: dict[str, int] = {}
+
+    def loop(kind: str, worker: int) -> None:
+        batch = 0
+        while time.perf_counter() < stop:
+            start = time.perf_counter()
+            try:
+                if kind == "write":
+                    _write(session_factory, 1, worker * 1_000_000 + batch)
+                    batch += 1
+                else:
+                    _read(session_factory, 1)
+            except Exception as e:  # noqa: BLE001 - counted and reported
+                with lock:
+                    key = f"{kind}: {type(e).__name__}: {str(e).splitlines()[0][:60]}"
+                    errors[key] = errors.get(key, 0) + 1
+                continue
+            with lock:
+                (write_times if kind == "write" else read_times).append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=loop, args=("write", i)) for i in range(writers)]
+    threads += [threading.Thread(target=loop, args=("read", i)) for i in range(readers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    def summary(times: list[float]) -> str:
+        if not times:
+            return "none completed"
+        times = sorted(times)
+        p95 = times[int(0.95 * (len(times) - 1))]
+        return (f"{len(times) / seconds:8.1f}/s  p50 {statistics.median(times) * 1000:7.1f} ms"
+                f"  p95 {p95 * 1000:7.1f} ms")
+
+    print(label)
+    print(f"  writes ({ROWS_PER_WRITE} rows)  {summary(write_times)}")
+    print(f"  reads                {summary(read_times)}")
+    print(f"  errors               {sum(errors.values())}")
+    for key, count in sorted(errors.items()):
+        print(f"    {count:6d}  {key}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    args = parser.parse_args()
+
+    init_db()
+    engine.dispose()
+    print(f"{args.writers} writer and {args.readers} reader threads for {args.seconds:g}s each\n")
+    legacy = create_engine(
+        f"sqlite:///{_DB_FILE}",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    # A fresh file per run would hide WAL; both runs share the database.
+    with legacy.connect() as conn:
+        conn.exec_driver_sql("PRAGMA journal_mode=DELETE")
+    run("StaticPool, no pragmas (previous)", sessionmaker(bind=legacy, autoflush=False),
+        args.writers, args.readers, args.seconds)
+    legacy.dispose()
+    print()
+    run("pooled, WAL + busy_timeout (current)", sessionmaker(bind=engine, autoflush=False),
+        args.writers, args.readers, args.seconds)
+
+
+if __name__ == "__main__":
+    main()
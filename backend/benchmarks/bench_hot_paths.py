@@ -0,0 +1,313 @@
+"""Benchmark suite: SQL analysis and COE hot paths on synthetic corpora.
+
+Cases, each run on a generated corpus (benchmarks.corpus) of every --sizes size:
+    complexity    calculate_complexity_score per report SQL (parse included)
+    scoring       score_complexity over the whole parsed corpus (scoring only)
+    fingerprint   normalize_sql_for_fingerprint per report SQL (parse included)
+    similarity    sql_similarity_percent per pair of parsed reports (every
+                  near duplicate with its source, topped up with random pairs)
+    coe           process_coe_csv on the corpus as a COE upload
+    index         ReportIndexer.backfill of freshly inserted reports
+    consolidate   consolidate_user_reports over indexed reports
+Reported per case and size: throughput (items/s), p50/p99 latency (per call
+for complexity, fingerprint and similarity, per run otherwise, so use
+--repeat for those), and peak Python memory in the timed region
+(tracemalloc, from a separate run so the timings are not slowed down).
+Results can be saved as a baseline and later runs compared against it; the
+exit status is 1 when a case regressed by more than --tolerance. Runs
+offline against a temporary SQLite database.
+
+Usage (from backend/):
+    python -m benchmarks.bench_hot_paths [--sizes 1000,10000,100000] [--cases coe,similarity]
+        [--repeat 1] [--save-baseline benchmarks/baseline.json]
+        [--baseline benchmarks/baseline.json] [--tolerance 0.15]
+    python -m benchmarks.bench_hot_paths --sizes 1000      # quick check
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Any, Callable
+
+_DB_FILE = os.path.join(tempfile.mkdtemp(), "bench.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{_DB_FILE}"
+
+from sqlalchemy import insert  # noqa: E402
+
+from app.database import SessionLocal, init_db  # noqa: E402
+from app.models.report import Report  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.services.analysis_cache import clear_cache  # noqa: E402
+from app.services.coe_processor import process_coe_csv  # noqa: E402
+from app.services.report_consolidator import consolidate_user_reports  # noqa: E402
+from app.services.report_index import ReportIndexer  # noqa: E402
+from app.utils.sql_parser import (  # noqa: E402
+    ParsedSQL,
+    calculate_complexity_score,
+    normalize_sql_for_fingerprint,
+    score_complexity,
+    sql_similarity_percent,
+)
+from benchmarks.corpus import add_corpus_arguments, corpus_csv, corpus_options, generate_corpus  # noqa: E402
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+
+class _Run:
+    """Timed region of one run: wall time, per-call latencies, peak traced memory."""
+
+    def __init__(self):
+        self.seconds = 0.0
+        self.latencies: list[float] = []
+        self.peak_bytes = 0
+
+    def __enter__(self) -> "_Run":
+        self._base = 0
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+            self._base = tracemalloc.get_traced_memory()[0]
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.seconds = time.perf_counter() - self._start
+        if tracemalloc.is_tracing():
+            self.peak_bytes = tracemalloc.get_traced_memory()[1] - self._base
+
+
+def _each(fn: Callable, items: list) -> list[float]:
+    latencies = []
+    clock = time.perf_counter
+    for item in items:
+        start = clock()
+        fn(*item)
+        latencies.append(clock() - start)
+    return latencies
+
+
+class _Context:
+    """Corpus of one size plus the database state the DB-backed cases share."""
+
+    def __init__(self, reports: list[dict[str, Any]], workers: int | None):
+        self.reports = reports
+        self.workers = workers
+        self._parsed: list[ParsedSQL] | None = None
+        self._csv: bytes | None = None
+        self._indexed_user: int | None = None
+
+    @property
+    def parsed(self) -> list[ParsedSQL]:
+        if self._parsed is None:
+            self._parsed = [ParsedSQL(r["sql"], keep_tokens=False) for r in self.reports]
+        return self._parsed
+
+    @property
+    def csv(self) -> bytes:
+        if self._csv is None:
+            self._csv = corpus_csv(self.reports)
+        return self._csv
+
+    def new_user(self) -> int:
+        """A user owning a fresh, not yet indexed copy of the corpus."""
+        with SessionLocal() as db:
+            name = f"bench-{time.monotonic_ns()}"
+            user = User(username=name, email=f"{name}@example.com", password_hash="-")
+            db.add(user)
+            db.flush()
+            db.execute(insert(Report), [
+                {"name": r["report_name"], "sql_query": r["sql"], "created_by": user.id, "migrated": False}
+                for r in self.reports
+            ])
+            db.commit()
+            return user.id
+
+    def indexed_user(self) -> int:
+        if self._indexed_user is None:
+            user_id = self.new_user()
+            with SessionLocal() as db:
+                ReportIndexer(db).backfill(user_id)
+            self._indexed_user = user_id
+        return self._indexed_user
+
+
+def bench_complexity(ctx: _Context, run: _Run) -> int:
+    items = [(r["sql"],) for r in ctx.reports]
+    with run:
+        run.latencies = _each(calculate_complexity_score, items)
+    return len(items)
+
+
+def bench_scoring(ctx: _Context, run: _Run) -> int:
+    parsed = ctx.parsed
+    with run:
+        score_complexity(parsed)
+    return len(parsed)
+
+
+def bench_fingerprint(ctx: _Context, run: _Run) -> int:
+    items = [(r["sql"],) for r in ctx.reports]
+    with run:
+        run.latencies = _each(normalize_sql_for_fingerprint, items)
+    return len(items)
+
+
+def bench_similarity(ctx: _Context, run: _Run) -> int:
+    parsed = ctx.parsed
+    pairs = [(parsed[i], parsed[r["source"]]) for i, r in enumerate(ctx.reports) if r["source"] is not None]
+    rng = random.Random(len(parsed))
+    while len(pairs) < len(parsed):
+        pairs.append((parsed[rng.randrange(len(parsed))], parsed[rng.randrange(len(parsed))]))
+    with run:
+        run.latencies = _each(sql_similarity_percent, pairs)
+    return len(pairs)
+
+
+def bench_coe(ctx: _Context, run: _Run) -> int:
+    data = ctx.csv
+    # Parsed SQL is cached by content: every run starts cold.
+    clear_cache()
+    with run:
+        result = process_coe_csv(data, "bench.csv", workers=ctx.workers)
+    return result["report_count"]
+
+
+def bench_index(ctx: _Context, run: _Run) -> int:
+    user_id = ctx.new_user()
+    clear_cache()
+    with SessionLocal() as db, run:
+        count = ReportIndexer(db).backfill(user_id)
+    return count
+
+
+def bench_consolidate(ctx: _Context, run: _Run) -> int:
+    user_id = ctx.indexed_user()
+    with SessionLocal() as db, run:
+        result = consolidate_user_reports(db, user_id)
+    return result["total_reports"]
+
+
+CASES: dict[str, Callable[[_Context, _Run], int]] = {
+    "complexity": bench_complexity,
+    "scoring": bench_scoring,
+    "fingerprint": bench_fingerprint,
+    "similarity": bench_similarity,
+    "coe": bench_coe,
+    "index": bench_index,
+    "consolidate": bench_consolidate,
+}
+
+
+def _percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def run_case(name: str, ctx: _Context, repeat: int, memory: bool) -> dict[str, Any]:
+    runs = []
+    for _ in range(repeat):
+        run = _Run()
+        items = CASES[name](ctx, run)
+        runs.append((items, run))
+    latencies = [t for _, run in runs for t in (run.latencies or [run.seconds])]
+    result = {
+        "items": runs[0][0],
+        "seconds": min(run.seconds for _, run in runs),
+        "throughput": max(items / run.seconds for items, run in runs if run.seconds),
+        "p50_ms": _percentile(latencies, 0.50) * 1000,
+        "p99_ms": _percentile(latencies, 0.99) * 1000,
+        "peak_mb": None,
+    }
+    if memory:
+        run = _Run()
+        tracemalloc.start()
+        try:
+            CASES[name](ctx, run)
+        finally:
+            tracemalloc.stop()
+        result["peak_mb"] = run.peak_bytes / (1024 * 1024)
+    return result
+
+
+def compare(results: dict[str, dict], baseline: dict[str, dict], tolerance: float) -> list[str]:
+    """Print each result against its baseline; returns the keys that regressed."""
+    regressed = []
+    for key, result in results.items():
+        base = baseline.get(key)
+        if not base:
+            continue
+        speed = result["throughput"] / base["throughput"] if base["throughput"] else 1.0
+        notes = [f"throughput x{speed:.2f}", f"p99 {base['p99_ms']:.3f} -> {result['p99_ms']:.3f} ms"]
+        worse = speed < 1 - tolerance
+        if result["peak_mb"] is not None and base.get("peak_mb"):
+            notes.append(f"peak {base['peak_mb']:.1f} -> {result['peak_mb']:.1f} MB")
+            # Peaks of a few MB are noise
+            worse |= result["peak_mb"] > max(base["peak_mb"] * (1 + tolerance), base["peak_mb"] + 1)
+        if worse:
+            regressed.append(key)
+        print(f"  {key:24s} {'REGRESSED' if worse else 'ok':9s} {', '.join(notes)}")
+    return regressed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="1000,10000,100000", help="comma-separated corpus sizes")
+    parser.add_argument("--cases", default=",".join(CASES), help="comma-separated cases to run")
+    parser.add_argument("--repeat", type=int, default=1, help="timed runs per case (best throughput kept)")
+    parser.add_argument("--workers", type=int, default=None, help="COE worker processes (default: settings)")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc run")
+    parser.add_argument("--baseline", help=f"compare with this baseline (e.g. {DEFAULT_BASELINE})")
+    parser.add_argument("--save-baseline", metavar="PATH", help="write the results as a baseline")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed slowdown/growth (0.15 = 15%%)")
+    parser.add_argument("--output", help="write the results as JSON")
+    add_corpus_arguments(parser)
+    args = parser.parse_args()
+
+    cases = [c.strip() for c in args.cases.split(",") if c.strip()]
+    unknown = set(cases) - set(CASES)
+    if unknown:
+        parser.error(f"unknown cases: {', '.join(sorted(unknown))}")
+    sizes = [int(s) for s in args.sizes.split(",")]
+    corpus = corpus_options(args)
+
+    init_db()
+    results: dict[str, dict] = {}
+    print(f"{'case':12s} {'size':>7s} {'items/s':>11s} {'p50 ms':>9s} {'p99 ms':>9s} {'peak MB':>8s}")
+    for size in sizes:
+        ctx = _Context(generate_corpus(size, **corpus), args.workers)
+        for name in cases:
+            result = run_case(name, ctx, max(1, args.repeat), not args.no_memory)
+            results[f"{name}@{size}"] = result
+            peak = f"{result['peak_mb']:8.1f}" if result["peak_mb"] is not None else f"{'-':>8s}"
+            print(f"{name:12s} {size:7d} {result['throughput']:11.1f} {result['p50_ms']:9.3f}"
+                  f" {result['p99_ms']:9.3f} {peak}", flush=True)
+
+    report = {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "corpus": corpus,
+        "results": results,
+    }
+    for path in filter(None, (args.output, args.save_baseline)):
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nresults written to {path}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        print(f"\ncompared with {args.baseline} ({baseline.get('created')}, {baseline.get('platform')})")
+        if baseline.get("corpus") != corpus:
+            print("  warning: the baseline was generated with different corpus options")
+        if compare(results, baseline.get("results", {}), args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
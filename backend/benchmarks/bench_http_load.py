@@ -0,0 +1,318 @@
+"""HTTP load test: mixed API traffic against the app, in-process.
+
+Boots app.main:app in this process (lifespan included) on a temporary SQLite
+database and talks to it over httpx's ASGI transport, so no server or
+network is needed. Seeds --users users, each with --reports imported reports
+and one COE analysis, then runs --concurrency clients for --duration seconds.
+Each client logs in as a seeded user and picks requests by the --mix weights:
+    login, dashboard, report_list, report_get, report_create, report_update,
+    report_delete, consolidate, coe_upload, sql_analyze
+Prints per-request-type throughput, latency percentiles and error rate, and
+writes them as JSON (--output) for comparing runs (--compare).
+
+Client and app share one event loop and CPU, so absolute numbers are lower
+than a deployed server's; compare runs made the same way. Needs httpx.
+
+Usage (from backend/):
+    python -m benchmarks.bench_http_load [--concurrency 16] [--duration 30] [--users 8]
+        [--reports 200] [--coe-rows 200] [--mix dashboard=20,sql_analyze=15,...]
+        [--output load.json] [--compare previous.json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable
+
+_WORK_DIR = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_WORK_DIR, 'load.db')}"
+os.environ.setdefault("COE_JOB_DIR", os.path.join(_WORK_DIR, "coe_jobs"))
+
+import httpx  # noqa: E402
+
+from app.main import app  # noqa: E402
+from benchmarks.corpus import corpus_csv, generate_corpus  # noqa: E402
+
+PASSWORD = "LoadTest123"
+
+DEFAULT_MIX = {
+    "login": 2,
+    "dashboard": 20,
+    "report_list": 10,
+    "report_get": 15,
+    "report_create": 8,
+    "report_update": 5,
+    "report_delete": 4,
+    "consolidate": 2,
+    "coe_upload": 1,
+    "sql_analyze": 15,
+}
+
+
+class _Failed(Exception):
+    """A request that got an unexpected status."""
+
+
+def _check(response: httpx.Response, *expected: int) -> httpx.Response:
+    if response.status_code not in expected:
+        raise _Failed(f"HTTP {response.status_code}")
+    return response
+
+
+class _User:
+    """A seeded account: its token and the ids of its reports."""
+
+    def __init__(self, username: str):
+        self.username = username
+        self.token = ""
+        self.report_ids: list[int] = []
+        # Reports created during the run; only these get deleted
+        self.created_ids: list[int] = []
+
+    @property
+    def headers(self) -> dict[str, str]:
+        return {"Authorization": f"Bearer {self.token}"}
+
+
+class LoadTest:
+    def __init__(self, client: httpx.AsyncClient, args: argparse.Namespace):
+        self.client = client
+        self.args = args
+        self.users: list[_User] = []
+        corpus = generate_corpus(max(args.reports, args.coe_rows) * 4, seed=args.seed)
+        self.sqls = [r["sql"] for r in corpus]
+        self.coe_files = [
+            corpus_csv(corpus[i:i + args.coe_rows]) for i in range(0, len(corpus) - args.coe_rows + 1, args.coe_rows)
+        ]
+        self.samples: dict[str, list[float]] = {}
+        self.errors: dict[str, dict[str, int]] = {}
+
+    async def login(self, user: _User) -> None:
+        response = await self.client.post(
+            "/api/auth/login", json={"username": user.username, "password": PASSWORD}
+        )
+        user.token = _check(response, 200).json()["access_token"]
+
+    async def seed(self) -> None:
+        for n in range(self.args.users):
+            user = _User(f"load{n:03d}")
+            response = await self.client.post("/api/auth/register", json={
+                "username": user.username, "email": f"{user.username}@example.com", "password": PASSWORD,
+            })
+            _check(response, 200)
+            await self.login(user)
+            start = (n * self.args.reports) % len(self.sqls)
+            rows = [{"name": f"seed {n}-{i}", "sql_query": self.sqls[(start + i) % len(self.sqls)]}
+                    for i in range(self.args.reports)]
+            body = "\n".join(json.dumps(row) for row in rows).encode()
+            _check(await self.client.post(
+                "/api/reports/import", files={"file": ("seed.jsonl", body)}, headers=user.headers,
+            ), 200)
+            _check(await self.client.post(
+                "/api/coe/upload", files={"file": ("seed.csv", self.coe_files[n % len(self.coe_files)])},
+                params={"background": "false"}, headers=user.headers,
+            ), 200)
+            listed = await self.client.get("/api/reports/", params={"limit": 1_000_000}, headers=user.headers)
+            user.report_ids = [r["id"] for r in _check(listed, 200).json()]
+            self.users.append(user)
+            print(f"  seeded {user.username}: {len(user.report_ids)} reports, 1 COE analysis", flush=True)
+
+    # --- request types -------------------------------------------------------
+
+    async def do_login(self, user: _User, rng: random.Random) -> None:
+        await self.login(user)
+
+    async def do_dashboard(self, user: _User, rng: random.Random) -> None:
+        _check(await self.client.get("/api/dashboard/stats", headers=user.headers), 200)
+
+    async def do_report_list(self, user: _User, rng: random.Random) -> None:
+        _check(await self.client.get("/api/reports/", params={"limit": 50}, headers=user.headers), 200)
+
+    async def do_report_get(self, user: _User, rng: random.Random) -> None:
+        report_id = rng.choice(user.report_ids)
+        _check(await self.client.get(f"/api/reports/{report_id}", headers=user.headers), 200)
+
+    async def do_report_create(self, user: _User, rng: random.Random) -> None:
+        response = await self.client.post("/api/reports/", json={
+            "name": f"load {rng.getrandbits(32):08x}", "sql_query": rng.choice(self.sqls),
+        }, headers=user.headers)
+        user.created_ids.append(_check(response, 201).json()["id"])
+
+    async def do_report_update(self, user: _User, rng: random.Random) -> None:
+        report_id = rng.choice(user.report_ids)
+        response = await self.client.put(
+            f"/api/reports/{report_id}", json={"migrated": rng.random() < 0.5}, headers=user.headers
+        )
+        _check(response, 200)
+
+    async def do_report_delete(self, user: _User, rng: random.Random) -> None:
+        if not user.created_ids:
+            await self.do_report_create(user, rng)
+        report_id = user.created_ids.pop(rng.randrange(len(user.created_ids)))
+        _check(await self.client.delete(f"/api/reports/{report_id}", headers=user.headers), 204)
+
+    async def do_consolidate(self, user: _User, rng: random.Random) -> None:
+        _check(await self.client.post("/api/reports/consolidate", headers=user.headers), 200)
+
+    async def do_coe_upload(self, user: _User, rng: random.Random) -> None:
+        data = rng.choice(self.coe_files)
+        response = await self.client.post(
+            "/api/coe/upload", files={"file": ("load.csv", data)},
+            params={"background": "false"}, headers=user.headers,
+        )
+        _check(response, 200)
+
+    async def do_sql_analyze(self, user: _User, rng: random.Random) -> None:
+        response = await self.client.post(
+            "/api/sql/analyze", json={"sql_query": rng.choice(self.sqls)}, headers=user.headers
+        )
+        _check(response, 200)
+
+    # --- driver --------------------------------------------------------------
+
+    async def client_loop(self, worker: int, mix: dict[str, int], deadline: float) -> None:
+        rng = random.Random(self.args.seed * 7919 + worker)
+        user = self.users[worker % len(self.users)]
+        names = list(mix)
+        weights = list(mix.values())
+        actions: dict[str, Callable[[_User, random.Random], Awaitable[None]]] = {
+            name: getattr(self, f"do_{name}") for name in names
+        }
+        while time.perf_counter() < deadline:
+            name = rng.choices(names, weights)[0]
+            start = time.perf_counter()
+            try:
+                await actions[name](user, rng)
+            except Exception as e:  # noqa: BLE001 - counted and reported
+                key = str(e) if isinstance(e, _Failed) else type(e).__name__
+                errors = self.errors.setdefault(name, {})
+                errors[key] = errors.get(key, 0) + 1
+            self.samples.setdefault(name, []).append(time.perf_counter() - start)
+
+    async def run(self, mix: dict[str, int]) -> float:
+        deadline = time.perf_counter() + self.args.duration
+        start = time.perf_counter()
+        await asyncio.gather(*(self.client_loop(w, mix, deadline) for w in range(self.args.concurrency)))
+        return time.perf_counter() - start
+
+
+def _percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def summarize(samples: dict[str, list[float]], errors: dict[str, dict[str, int]], elapsed: float) -> dict:
+    results = {}
+    everything = [t for times in samples.values() for t in times]
+    for name, times in sorted(samples.items()) + [("total", everything)]:
+        failed = sum(errors.get(name, {}).values()) if name != "total" else sum(
+            sum(e.values()) for e in errors.values()
+        )
+        results[name] = {
+            "requests": len(times),
+            "errors": failed,
+            "error_rate": failed / len(times) if times else 0.0,
+            "throughput": len(times) / elapsed,
+            "p50_ms": _percentile(times, 0.50) * 1000 if times else None,
+            "p90_ms": _percentile(times, 0.90) * 1000 if times else None,
+            "p99_ms": _percentile(times, 0.99) * 1000 if times else None,
+            "max_ms": max(times) * 1000 if times else None,
+        }
+        if name != "total" and errors.get(name):
+            results[name]["error_kinds"] = errors[name]
+    return results
+
+
+def print_results(results: dict[str, dict]) -> None:
+    print(f"\n{'request':15s} {'count':>7s} {'req/s':>8s} {'p50 ms':>9s} {'p90 ms':>9s}"
+          f" {'p99 ms':>9s} {'max ms':>9s} {'errors':>7s}")
+    for name, r in results.items():
+        if not r["requests"]:
+            continue
+        print(f"{name:15s} {r['requests']:7d} {r['throughput']:8.1f} {r['p50_ms']:9.1f} {r['p90_ms']:9.1f}"
+              f" {r['p99_ms']:9.1f} {r['max_ms']:9.1f} {100 * r['error_rate']:6.1f}%")
+        for kind, count in sorted(r.get("error_kinds", {}).items()):
+            print(f"{'':15s} {count:7d} x {kind}")
+
+
+def compare(results: dict[str, dict], previous: dict[str, dict]) -> None:
+    print(f"\n{'request':15s} {'req/s':>17s} {'p50 ms':>19s} {'p99 ms':>19s} {'errors':>15s}")
+    for name, r in results.items():
+        old = previous.get(name)
+        if not old or not r["requests"] or not old["requests"]:
+            continue
+        print(f"{name:15s} {old['throughput']:7.1f} -> {r['throughput']:6.1f}"
+              f" {old['p50_ms']:8.1f} -> {r['p50_ms']:7.1f} {old['p99_ms']:8.1f} -> {r['p99_ms']:7.1f}"
+              f" {100 * old['error_rate']:5.1f}% -> {100 * r['error_rate']:4.1f}%")
+
+
+def _parse_mix(text: str | None) -> dict[str, int]:
+    mix = dict(DEFAULT_MIX)
+    for part in filter(None, (text or "").split(",")):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in DEFAULT_MIX:
+            raise ValueError(f"unknown request type {name!r}; expected one of {', '.join(DEFAULT_MIX)}")
+        mix[name] = int(weight)
+    return {name: weight for name, weight in mix.items() if weight > 0}
+
+
+async def _main(args: argparse.Namespace, mix: dict[str, int]) -> dict[str, Any]:
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=None) as client:
+            test = LoadTest(client, args)
+            print(f"seeding {args.users} users ({args.reports} reports each)", flush=True)
+            await test.seed()
+            print(f"running {args.concurrency} clients for {args.duration:g}s", flush=True)
+            elapsed = await test.run(mix)
+    return summarize(test.samples, test.errors, elapsed)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=16, help="concurrent clients")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds of traffic")
+    parser.add_argument("--users", type=int, default=8, help="seeded users (clients share them round-robin)")
+    parser.add_argument("--reports", type=int, default=200, help="seeded reports per user")
+    parser.add_argument("--coe-rows", type=int, default=200, help="rows per uploaded COE CSV")
+    parser.add_argument("--mix", help="request weights, e.g. dashboard=30,coe_upload=0 (others keep defaults)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the results as JSON")
+    parser.add_argument("--compare", metavar="PATH", help="compare with an earlier --output file")
+    args = parser.parse_args()
+    try:
+        mix = _parse_mix(args.mix)
+    except ValueError as e:
+        parser.error(str(e))
+
+    results = asyncio.run(_main(args, mix))
+    print_results(results)
+    report = {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "options": {k: v for k, v in vars(args).items() if k not in ("output", "compare")} | {"mix": mix},
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nresults written to {args.output}")
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)
+        print(f"\ncompared with {args.compare} ({previous.get('created')})")
+        compare(results, previous.get("results", {}))
+    if results["total"]["errors"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
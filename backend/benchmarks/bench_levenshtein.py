@@ -0,0 +1,93 @@
+"""Micro-benchmark: bit-parallel levenshtein_similarity vs the original double loop.
+
+Usage (from backend/):
+    python -m benchmarks.bench_levenshtein [--length 5000] [--repeat 3]
+"""
+import argparse
+import random
+import time
+
+from app.utils.sql_parser import levenshtein_similarity
+
+
+def reference_levenshtein_similarity(s1: str, s2: str) -> float:
+    """The original O(n*m) implementation, kept as the correctness baseline."""
+    if not s1 and not s2:
+        return 1.0
+    if not s1 or not s2:
+        return 0.0
+    n, m = len(s1), len(s2)
+    prev = list(range(m + 1))
+    for i in range(1, n + 1):
+        curr = [i]
+        for j in range(1, m + 1):
+            cost = 0 if s1[i - 1] == s2[j - 1] else 1
+            curr.append(min(prev[j] + 1, curr[j - 1] + 1, prev[j - 1] + cost))
+        prev = curr
+    dist = prev[m]
+    max_len = max(n, m)
+    return 1.0 - (dist / max_len) if max_len else 1.0
+
+
+def _normalized_sql(rng: random.Random, length: int) -> str:
+    words = ["SELECT", "FROM", "WHERE", "JOIN", "ON", "AND", "GROUP BY", "SUM(", ")",
+             "T0.AMOUNT", "T1.REGION_ID", "=", "?", ",", "SALES", "CUSTOMERS"]
+    out = []
+    while sum(len(w) + 1 for w in out) < length:
+        out.append(rng.choice(words))
+    return " ".join(out)[:length]
+
+
+def _mutate(rng: random.Random, text: str, edits: int) -> str:
+    chars = list(text)
+    for _ in range(edits):
+        pos = rng.randrange(len(chars))
+        op = rng.random()
+        if op < 0.33:
+            chars.pop(pos)
+        elif op < 0.66:
+            chars.insert(pos, rng.choice("ABCXYZ ,?"))
+        else:
+            chars[pos] = rng.choice("ABCXYZ ,?")
+    return "".join(chars)
+
+
+def _timed(fn, *args, repeat: int) -> tuple[float, float]:
+    best = float("inf")
+    value = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        value = fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, value
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--length", type=int, default=5000, help="characters per string")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--skip-reference", action="store_true", help="skip the slow original loop")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    base = _normalized_sql(rng, args.length)
+    cases = {
+        "near duplicate (1% edits)": _mutate(rng, base, max(1, args.length // 100)),
+        "distinct (unrelated text)": _normalized_sql(random.Random(7), args.length),
+    }
+    print(f"levenshtein_similarity on {args.length}-char strings (best of {args.repeat})")
+    for label, other in cases.items():
+        fast_t, fast_v = _timed(levenshtein_similarity, base, other, repeat=args.repeat)
+        bound_t, bound_v = _timed(levenshtein_similarity, base, other, 0.85, repeat=args.repeat)
+        print(f"  {label}")
+        print(f"    bit-parallel          {fast_t * 1000:10.2f} ms  similarity={fast_v:.6f}")
+        print(f"    bit-parallel (>=0.85) {bound_t * 1000:10.2f} ms  similarity={bound_v:.6f}")
+        if not args.skip_reference:
+            ref_t, ref_v = _timed(reference_levenshtein_similarity, base, other, repeat=1)
+            status = "match" if ref_v == fast_v else "MISMATCH"
+            print(f"    reference loop        {ref_t * 1000:10.2f} ms  similarity={ref_v:.6f} ({status})")
+            print(f"    speedup               {ref_t / fast_t:10.1f} x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+"""Deterministic synthetic COE corpora of BusinessObjects-style report SQL.
+
+Reports look like what a BusinessObjects universe generates: qualified
+Table.Column selects, comma joins with their conditions in the WHERE clause
+(or ANSI JOIN ... ON), @Prompt filters, aggregates with GROUP BY, and
+optionally a CTE and window functions. A share of the reports are exact
+copies of earlier ones and another share are near duplicates: an earlier
+report with a few small edits (a changed literal, an extra filter, a column
+added or dropped, a different aggregate). The same arguments always give the
+same corpus.
+
+Usage (from backend/), to write a COE CSV:
+    python -m benchmarks.corpus --size 10000 [--seed 0] [-o coe.csv]
+"""
+import argparse
+import csv
+import io
+import random
+import sys
+from typing import Any
+
+_SUBJECTS = ["SALES", "ORDER", "CUSTOMER", "PRODUCT", "STORE", "REGION", "EMPLOYEE", "INVENTORY",
+             "SHIPMENT", "INVOICE", "PAYMENT", "CAMPAIGN", "SUPPLIER", "RETURN", "BUDGET", "CONTRACT"]
+_KINDS = ["FACT", "DIM", "AGG", "HIST", "STG"]
+_COLUMNS = ["ID", "NAME", "CODE", "AMOUNT", "QTY", "PRICE", "COST", "STATUS", "TYPE", "DATE_ID",
+            "REGION_ID", "STORE_ID", "CUSTOMER_ID", "PRODUCT_ID", "YEAR", "MONTH", "CATEGORY",
+            "CHANNEL", "DISCOUNT", "MARGIN", "CURRENCY", "SEGMENT", "PRIORITY", "CREATED_DT"]
+_MEASURES = ["AMOUNT", "QTY", "PRICE", "COST", "DISCOUNT", "MARGIN"]
+_AGGREGATES = ["sum", "count", "avg", "max", "min"]
+_WINDOWS = ["RANK()", "ROW_NUMBER()", "DENSE_RANK()", "sum({col})", "avg({col})"]
+_OWNERS = [f"owner{i:02d}" for i in range(40)]
+
+# Every table name: 80 tables, so unrelated reports share few tokens
+_TABLES = [f"{kind}_{subject}" for subject in _SUBJECTS for kind in _KINDS]
+
+
+def _column(rng: random.Random, table: str, choices: list[str] = _COLUMNS) -> str:
+    return f"{table}.{rng.choice(choices)}"
+
+
+def _prompt(rng: random.Random, label: str) -> str:
+    return f"@Prompt('Enter {label}','A','{label}',Multi,Free,Persistent)"
+
+
+def generate_sql(
+    rng: random.Random,
+    cte_rate: float = 0.2,
+    window_rate: float = 0.2,
+    ansi_join_rate: float = 0.3,
+    max_joins: int = 4,
+) -> str:
+    """One BusinessObjects-style report query."""
+    tables = rng.sample(_TABLES, rng.randint(1, max_joins + 1))
+    measures = [f"{rng.choice(_AGGREGATES)}({_column(rng, tables[0], _MEASURES)})"
+                for _ in range(rng.randint(0, 3))]
+    dimensions = list(dict.fromkeys(_column(rng, rng.choice(tables)) for _ in range(rng.randint(1, 6))))
+    select = dimensions + measures
+    if rng.random() < window_rate:
+        window = rng.choice(_WINDOWS).format(col=_column(rng, tables[0], _MEASURES))
+        partition = ", ".join(dimensions[: rng.randint(1, len(dimensions))])
+        select.append(f"{window} OVER (PARTITION BY {partition} ORDER BY {_column(rng, tables[0])})")
+    if rng.random() < 0.25:
+        col = _column(rng, tables[0])
+        select.append(f"CASE WHEN {col} = '{rng.choice('ABCDE')}' THEN 'Y' ELSE 'N' END")
+
+    conditions = []
+    if len(tables) > 1 and rng.random() < ansi_join_rate:
+        joins = "".join(
+            f"\n  {rng.choice(['INNER JOIN', 'LEFT OUTER JOIN', 'INNER JOIN'])} {table}"
+            f" ON ( {tables[0]}.{rng.choice(_COLUMNS)}={table}.ID )"
+            for table in tables[1:]
+        )
+        from_clause = f"{tables[0]}{joins}"
+    else:
+        from_clause = ",\n  ".join(tables)
+        conditions += [f"( {tables[0]}.{rng.choice(_COLUMNS)}={table}.ID  )" for table in tables[1:]]
+    for _ in range(rng.randint(0, 3)):
+        col = _column(rng, rng.choice(tables))
+        r = rng.random()
+        if r < 0.4:
+            conditions.append(f"( {col}  IN  {_prompt(rng, col.split('.')[1].lower())}  )")
+        elif r < 0.7:
+            conditions.append(f"( {col} >= {rng.randint(1, 5000)} )")
+        else:
+            conditions.append(f"( {col} = '{rng.choice(['OPEN', 'CLOSED', 'NEW', 'HOLD'])}' )")
+
+    sql = "SELECT\n  " + ",\n  ".join(select) + "\nFROM\n  " + from_clause
+    if conditions:
+        sql += "\nWHERE\n  " + "\n  AND  ".join(conditions)
+    if measures and dimensions:
+        sql += "\nGROUP BY\n  " + ",\n  ".join(dimensions)
+    if rng.random() < cte_rate:
+        base = rng.choice(tables)
+        cte_filter = f"{base}.{rng.choice(_COLUMNS)} > {rng.randint(1, 999)}"
+        sql = f"WITH base_{base.lower()} AS (\n  SELECT * FROM {base} WHERE {cte_filter}\n)\n{sql}"
+    if rng.random() < 0.1:
+        sql = f"/* BO report, generated {rng.randint(2010, 2024)} */\n{sql}"
+    return sql
+
+
+def mutate_sql(rng: random.Random, sql: str, edits: int = 1) -> str:
+    """A near duplicate of `sql`: `edits` small changes of the kind report copies get."""
+    for _ in range(edits):
+        r = rng.random()
+        if r < 0.3:
+            digits = [i for i, ch in enumerate(sql) if ch.isdigit()]
+            if digits:
+                pos = rng.choice(digits)
+                sql = sql[:pos] + str(rng.randint(0, 9)) + sql[pos + 1:]
+                continue
+        if r < 0.55:
+            extra = f"( {rng.choice(_TABLES)}.{rng.choice(_COLUMNS)} <> 'X' )"
+            sql += ("\n  AND  " if "\nWHERE\n" in sql and "\nGROUP BY\n" not in sql else "\n  -- ") + extra
+        elif r < 0.75:
+            sql = sql.replace("SELECT\n  ", f"SELECT\n  {rng.choice(_TABLES)}.{rng.choice(_COLUMNS)},\n  ", 1)
+        elif r < 0.9:
+            for agg in _AGGREGATES:
+                if f"{agg}(" in sql:
+                    sql = sql.replace(f"{agg}(", f"{rng.choice(_AGGREGATES)}(", 1)
+                    break
+        else:
+            sql = sql.replace(",\n  ", ",\n    ", 1).replace("SELECT", "select", 1)
+    return sql
+
+
+def generate_corpus(
+    size: int,
+    seed: int = 0,
+    duplicate_rate: float = 0.1,
+    near_duplicate_rate: float = 0.1,
+    max_edits: int = 2,
+    cte_rate: float = 0.2,
+    window_rate: float = 0.2,
+    ansi_join_rate: float = 0.3,
+    max_joins: int = 4,
+) -> list[dict[str, Any]]:
+    """
+    `size` reports as dicts with report_name, report_id, sql, owner and source
+    (index of the report it copies, None for an original). duplicate_rate and
+    near_duplicate_rate are the shares of exact copies and of near duplicates
+    (1..max_edits edits); the *_rate mix arguments apply to original reports.
+    """
+    rng = random.Random(seed)
+    reports: list[dict[str, Any]] = []
+    for i in range(size):
+        r = rng.random()
+        source = rng.randrange(i) if i else None
+        if source is not None and r < duplicate_rate:
+            sql = reports[source]["sql"]
+        elif source is not None and r < duplicate_rate + near_duplicate_rate:
+            sql = mutate_sql(rng, reports[source]["sql"], rng.randint(1, max_edits))
+        else:
+            source = None
+            sql = generate_sql(rng, cte_rate, window_rate, ansi_join_rate, max_joins)
+        reports.append({
+            "report_name": f"Report {i:06d}",
+            "report_id": str(100000 + i),
+            "sql": sql,
+            "owner": rng.choice(_OWNERS),
+            "source": source,
+        })
+    return reports
+
+
+def corpus_csv(reports: list[dict[str, Any]]) -> bytes:
+    """The reports as a COE upload CSV."""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(["Report Name", "Report ID", "Query SQL", "Report Owner"])
+    for report in reports:
+        writer.writerow([report["report_name"], report["report_id"], report["sql"], report["owner"]])
+    return buf.getvalue().encode()
+
+
+def add_corpus_arguments(parser: argparse.ArgumentParser) -> None:
+    """The generate_corpus options, for the benchmark command lines."""
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--duplicate-rate", type=float, default=0.1, help="share of exact copies")
+    parser.add_argument("--near-duplicate-rate", type=float, default=0.1, help="share of mutated copies")
+    parser.add_argument("--max-edits", type=int, default=2, help="edits per near duplicate (1..N)")
+    parser.add_argument("--cte-rate", type=float, default=0.2)
+    parser.add_argument("--window-rate", type=float, default=0.2)
+    parser.add_argument("--ansi-join-rate", type=float, default=0.3, help="JOIN ... ON instead of comma joins")
+    parser.add_argument("--max-joins", type=int, default=4)
+
+
+def corpus_options(args: argparse.Namespace) -> dict[str, Any]:
+    """generate_corpus keyword arguments from parsed add_corpus_arguments options."""
+    return {
+        "seed": args.seed,
+        "duplicate_rate": args.duplicate_rate,
+        "near_duplicate_rate": args.near_duplicate_rate,
+        "max_edits": args.max_edits,
+        "cte_rate": args.cte_rate,
+        "window_rate": args.window_rate,
+        "ansi_join_rate": args.ansi_join_rate,
+        "max_joins": args.max_joins,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=1000, help="number of reports")
+    parser.add_argument("-o", "--output", help="CSV file to write (default: stdout)")
+    add_corpus_arguments(parser)
+    args = parser.parse_args()
+    data = corpus_csv(generate_corpus(args.size, **corpus_options(args)))
+    if args.output:
+        with open(args.output, "wb") as f:
+            f.write(data)
+    else:
+        sys.stdout.buffer.write(data)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""Conformance check: the "lexer" SQL engine against the "sqlparse" engine.
+
+Every query is analyzed by ParsedSQL with both engines. The check compares
+what the analyzers use: complexity score, fingerprint, normalized text,
+keyword counts, token set, statement count, parse error and table names.
+The normalized text (and so the fingerprint) is also checked against the
+original normalizer, two sqlparse.format() passes, so that fingerprints
+stored before ParsedSQL still match. Queries come from a generated corpus
+(benchmarks.corpus). With --fuzz, a share of them is also perturbed at
+random character positions: comments, optimizer hints, semicolons, quoted
+names, odd characters, and deeply nested or long operator chains that
+sqlparse refuses to group. With --multi, a share is joined into
+multi-statement scripts (";", GO, comments between statements). Queries
+can also come from a COE CSV export (--csv). Prints the time per query of
+each engine; the exit status is 1 when any query differs.
+
+Usage (from backend/):
+    python -m benchmarks.lexer_conformance [--size 10000] [--fuzz 0.3] [--multi 0.1] [--csv coe.csv] [--show 5]
+"""
+import argparse
+import random
+import re
+import sys
+import time
+from typing import Any
+
+import sqlparse
+
+from app.services.coe_processor import iter_coe_rows
+from app.utils.sql_parser import (
+    LEXER_ENGINE,
+    SQLPARSE_ENGINE,
+    ParsedSQL,
+    calculate_complexity_score,
+    extract_table_names,
+)
+from benchmarks.corpus import add_corpus_arguments, corpus_options, generate_corpus
+
+_SNIPPETS = [
+    "/* note */", "/*c*/", "-- trailing note\n", "--\n", "/*+ INDEX(t) */", "--+ hint\n", "# mysql note\n",
+    ";", ";\n", "\n", "\r\n", "\t", " ", "(", ")", ",", "'it''s'", '"Quoted Name"', "`tick`", "[bracket]",
+    "$$body$$", "$1", ":param", "?", "%s", "::int", ":=", "{", "}", "\\", "0x1F", "1.5E-3", "-.5",
+    "@Prompt('x','A',,Mono,Free)", "##tmp", " END ", " BEGIN ", " CASE ", " GO ", " WITH RECURSIVE ",
+    " UNION ALL ", " NOT LIKE ", " ORDER BY ", " NULLS FIRST ", " CREATE OR REPLACE ", "é", " ",
+]
+
+
+def _nested(rng: random.Random) -> str:
+    """An expression near or past sqlparse's grouping depth limit."""
+    depth = rng.randint(10, 60)
+    kind = rng.randrange(4)
+    if kind == 0:
+        return "f(" * depth + "x" + ")" * depth
+    if kind == 1:
+        return " + ".join(["a"] * depth * 2)
+    if kind == 2:
+        return "(case when " * depth + "1=1 then 1 end)" * depth
+    return "(g(" * depth + "x) + 1 as a, b)" * depth
+
+
+def fuzz_sql(rng: random.Random, sql: str) -> str:
+    """`sql` with a few snippets inserted at random character positions."""
+    for _ in range(rng.randint(1, 6)):
+        pos = rng.randint(0, len(sql))
+        snippet = _nested(rng) if rng.random() < 0.05 else rng.choice(_SNIPPETS)
+        sql = sql[:pos] + snippet + sql[pos:]
+    return sql
+
+
+_SEPARATORS = [
+    ";", "; ", ";\n", ";\n\n", " ; ", "\nGO\n", " GO ", "GO", "; -- next\n", ";/* next */", "\n;\n", ";  \t\n",
+]
+
+
+def multi_statement(rng: random.Random, sqls: list[str]) -> str:
+    """Two to four queries joined into one script by random separators."""
+    script = rng.choice(sqls)
+    for _ in range(rng.randint(1, 3)):
+        script += rng.choice(_SEPARATORS) + rng.choice(sqls)
+    return script + rng.choice(["", ";", ";\n", "\n", " "])
+
+
+def baseline_normalized(sql: str) -> str:
+    """normalize_sql_for_fingerprint as it was before ParsedSQL."""
+    if not sql:
+        return ""
+    try:
+        no_comments = sqlparse.format(sql, strip_comments=True)
+    except Exception:
+        no_comments = sql
+    no_comments = sqlparse.format(no_comments, reindent=False, keyword_case="upper")
+    normalized = re.sub(r"\b\d+\b", "?", no_comments)
+    normalized = re.sub(r"'[^']*'", "?", normalized)
+    return re.sub(r"\s+", " ", normalized).strip()
+
+
+def _features(parsed: ParsedSQL) -> dict[str, Any]:
+    return {
+        "complexity_score": calculate_complexity_score(parsed),
+        "fingerprint": parsed.fingerprint,
+        "normalized": parsed.normalized,
+        "keywords": dict(parsed.keywords),
+        "token_set": parsed.token_set,
+        "statement_count": parsed.statement_count,
+        "parse_error": parsed.parse_error,
+        "table_names": extract_table_names(parsed),
+    }
+
+
+def check(sqls: list[str], show: int) -> tuple[int, float, float]:
+    """
+    Compare both engines with each other, and their normalized text with
+    baseline_normalized(), on every query; returns (mismatches, seconds per engine).
+    """
+    times = {SQLPARSE_ENGINE: 0.0, LEXER_ENGINE: 0.0}
+    mismatches = 0
+    for sql in sqls:
+        features = {}
+        for engine in times:
+            start = time.perf_counter()
+            parsed = ParsedSQL(sql, keep_tokens=False, engine=engine)
+            times[engine] += time.perf_counter() - start
+            features[engine] = _features(parsed)
+        expected, actual = features[SQLPARSE_ENGINE], features[LEXER_ENGINE]
+        baseline = baseline_normalized(sql)
+        if expected["normalized"] != baseline:
+            mismatches += 1
+            if mismatches <= show:
+                print(f"\nBASELINE MISMATCH {sql!r}\n  baseline {baseline!r}\n  sqlparse {expected['normalized']!r}")
+        elif expected != actual:
+            mismatches += 1
+            if mismatches <= show:
+                print(f"\nMISMATCH {sql!r}")
+                for key in expected:
+                    if expected[key] != actual[key]:
+                        print(f"  {key}: sqlparse {expected[key]!r}\n  {' ' * len(key)}  lexer    {actual[key]!r}")
+    return mismatches, times[SQLPARSE_ENGINE], times[LEXER_ENGINE]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=10000, help="generated queries (0 for none)")
+    parser.add_argument("--fuzz", type=float, default=0.3, help="share of generated queries also checked fuzzed")
+    parser.add_argument("--multi", type=float, default=0.1, help="share of generated queries also checked as scripts")
+    parser.add_argument("--csv", action="append", default=[], help="COE CSV export to check as well (repeatable)")
+    parser.add_argument("--show", type=int, default=5, help="mismatches printed in full")
+    add_corpus_arguments(parser)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    sqls = [r["sql"] for r in generate_corpus(args.size, **corpus_options(args))]
+    generated = list(sqls)
+    sqls += [fuzz_sql(rng, sql) for sql in generated if rng.random() < args.fuzz]
+    sqls += [multi_statement(rng, generated) for _ in generated if rng.random() < args.multi]
+    for path in args.csv:
+        with open(path, "rb") as f:
+            sqls += [sql for rows in iter_coe_rows(f) for _, _, sql, _ in rows]
+
+    mismatches, sqlparse_seconds, lexer_seconds = check(sqls, args.show)
+    per_query = 1000 / max(1, len(sqls))
+    print(f"\n{len(sqls)} queries, {mismatches} mismatches")
+    print(f"sqlparse {sqlparse_seconds * per_query:.3f} ms/query, lexer {lexer_seconds * per_query:.3f} ms/query"
+          f" (x{sqlparse_seconds / lexer_seconds if lexer_seconds else 0:.1f})")
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
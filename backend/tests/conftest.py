@@ -0,0 +1,43 @@
+"""Test setup: a throwaway SQLite database, configured before the app is imported.
+
+Run from backend/:
+    python -m pytest -q
+"""
+import itertools
+import os
+import tempfile
+
+import pytest
+
+_TMP = tempfile.mkdtemp(prefix="bi-platform-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_TMP}/test.db"
+os.environ["COE_JOB_DIR"] = os.path.join(_TMP, "coe_jobs")
+os.environ["METRICS_ENABLED"] = "false"
+
+from app.core.security import get_password_hash  # noqa: E402
+from app.database import SessionLocal, init_db  # noqa: E402
+from app.models.user import User  # noqa: E402
+
+_user_ids = itertools.count(1)
+
+
+@pytest.fixture(scope="session", autouse=True)
+def database():
+    init_db()
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def user(db) -> User:
+    """A fresh user, so each test starts from empty reports and KPIs."""
+    n = next(_user_ids)
+    user = User(username=f"tester{n}", email=f"tester{n}@example.com", password_hash=get_password_hash("Password123"))
+    db.add(user)
+    db.commit()
+    return user
@@ -0,0 +1,55 @@
+"""SQL analysis cache: both tiers return what a fresh parse gives."""
+from sqlalchemy import inspect, text
+
+from app.config import settings
+from app.database import _ensure_schema, engine
+from app.models.sql_cache import SQLAnalysisCacheEntry
+from app.services import analysis_cache
+from app.utils.sql_parser import ParsedSQL, calculate_complexity_score
+
+_QUERIES = [
+    "SELECT region, SUM(amount) FROM sales WHERE year = 2024 GROUP BY region",
+    "select a from t; select b from u",
+    "WITH x AS (SELECT id FROM a) SELECT * FROM x JOIN b ON x.id = b.id",
+    "",
+    "SELECT (((",
+]
+
+
+def _features(parsed: ParsedSQL) -> tuple:
+    return (
+        parsed.normalized, parsed.fingerprint, parsed.token_set, dict(parsed.keywords),
+        parsed.statement_count, parsed.parse_error, calculate_complexity_score(parsed),
+    )
+
+
+def test_memory_tier_parses_each_text_once():
+    analysis_cache.clear_cache()
+    first = analysis_cache.parse_many(_QUERIES + _QUERIES)
+    assert first[0] is first[len(_QUERIES)]
+    assert analysis_cache.get_parsed(_QUERIES[2]) is first[2]
+    assert [_features(p) for p in first[:len(_QUERIES)]] == [_features(ParsedSQL(q)) for q in _QUERIES]
+
+
+def test_persistent_tier_restores_the_parsed_features(monkeypatch):
+    monkeypatch.setattr(settings, "analysis_cache_persistent", True)
+    analysis_cache.clear_cache()
+    analysis_cache.parse_many(_QUERIES)
+    analysis_cache.clear_cache()
+    hits = analysis_cache.cache_stats()["persistent"]["hits"]
+    restored = analysis_cache.parse_many(_QUERIES)
+    assert analysis_cache.cache_stats()["persistent"]["hits"] == hits + len(_QUERIES)
+    assert [_features(p) for p in restored] == [_features(ParsedSQL(q)) for q in _QUERIES]
+
+
+def test_cache_table_with_old_columns_is_rebuilt():
+    table = SQLAnalysisCacheEntry.__table__
+    table.drop(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE sql_analysis_cache (sql_hash VARCHAR(64) PRIMARY KEY, "
+            "fingerprint VARCHAR(64) NOT NULL, complexity_score FLOAT NOT NULL)"
+        ))
+    _ensure_schema()
+    columns = {c["name"] for c in inspect(engine).get_columns(table.name)}
+    assert columns == {c.name for c in table.columns}
@@ -0,0 +1,61 @@
+"""Cached users: a deactivated user is rejected on the very next request."""
+import pytest
+from sqlalchemy import update
+
+from app.database import SessionLocal
+from app.models.user import User
+from app.services import auth_cache
+
+
+@pytest.fixture
+def client_headers(user):
+    """(client, headers) logged in as `user`, with the user cached."""
+    pytest.importorskip("httpx")
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    client = TestClient(app)
+    token = client.post(
+        "/api/auth/login", json={"username": user.username, "password": "Password123"}
+    ).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    assert client.get("/api/auth/me", headers=headers).status_code == 200
+    assert auth_cache.cached_user(user.username) is not None
+    return client, headers
+
+
+def _deactivate(user_id: int) -> None:
+    with SessionLocal() as other:
+        other.get(User, user_id).is_active = False
+        other.commit()
+
+
+def test_deactivating_through_the_orm_drops_the_cached_user(user, client_headers):
+    client, headers = client_headers
+    etag = client.get("/api/dashboard/stats", headers=headers).headers["etag"]
+    _deactivate(user.id)
+    assert auth_cache.cached_user(user.username) is None
+    assert client.get("/api/auth/me", headers=headers).status_code == 400
+    assert client.get("/api/coe/jobs", headers=headers).status_code == 400
+    # The dashboard's unchanged ETag does not let the request through.
+    cached = client.get("/api/dashboard/stats", headers={**headers, "If-None-Match": etag})
+    assert cached.status_code == 400
+
+
+def test_rolled_back_change_keeps_the_cached_user(user, client_headers):
+    with SessionLocal() as other:
+        other.get(User, user.id).is_active = False
+        other.flush()
+        other.rollback()
+    assert auth_cache.cached_user(user.username) is not None
+
+
+def test_write_outside_the_orm_needs_invalidate_user(user, client_headers):
+    client, headers = client_headers
+    with SessionLocal() as other:
+        other.execute(update(User).where(User.id == user.id).values(is_active=False))
+        other.commit()
+    assert client.get("/api/coe/jobs", headers=headers).status_code == 200
+    auth_cache.invalidate_user(user.username)
+    assert client.get("/api/coe/jobs", headers=headers).status_code == 400
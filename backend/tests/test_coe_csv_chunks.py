@@ -0,0 +1,34 @@
+"""Reading a COE CSV in chunks gives the whole-file result."""
+import io
+
+from app.config import settings
+from app.services import analysis_cache
+from app.services.coe_processor import iter_coe_rows, process_coe_csv
+from benchmarks.corpus import corpus_csv, generate_corpus
+
+
+def _rows(content: bytes) -> list[tuple]:
+    return [row for chunk in iter_coe_rows(io.BytesIO(content)) for row in chunk]
+
+
+def test_chunked_analysis_matches_a_single_chunk(monkeypatch):
+    content = corpus_csv(generate_corpus(120, seed=3))
+    analysis_cache.clear_cache()
+    whole = process_coe_csv(content, "coe.csv", workers=0)
+    monkeypatch.setattr(settings, "coe_csv_chunk_rows", 7)
+    analysis_cache.clear_cache()
+    assert process_coe_csv(content, "coe.csv", workers=0) == whole
+    assert whole["report_count"] == 120
+
+
+def test_fallback_names_and_ids_continue_across_chunks(monkeypatch):
+    # No name or ID column, and a row without SQL
+    content = b"Query SQL,Report Owner\n" + b"".join(
+        (b",ana\n" if i == 3 else f"SELECT {i} FROM t,ana\n".encode()) for i in range(5)
+    )
+    whole = _rows(content)
+    monkeypatch.setattr(settings, "coe_csv_chunk_rows", 2)
+    assert [len(chunk) for chunk in iter_coe_rows(io.BytesIO(content))] == [2, 2, 1]
+    assert _rows(content) == whole
+    assert [(name, report_id) for name, report_id, _, _ in whole] == [(f"Report_{i}", str(i)) for i in range(5)]
+    assert whole[3][2] == ""
@@ -0,0 +1,125 @@
+"""COE jobs: the upload queueing them, completion, failure, and recovery."""
+import os
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.config import settings
+from app.models.analysis import COEJob
+from app.services import coe_jobs
+
+_CSV = b"""Report Name,Report ID,Query SQL,Report Owner
+Sales by region,R1,"SELECT region, SUM(amount) FROM sales GROUP BY region",ana
+Open orders,R2,SELECT * FROM orders WHERE status = 'open',raj
+"""
+
+
+def _job(db, user_id: int, status: str = "queued", upload: bool = True, **values) -> COEJob:
+    """A job row with its upload on disk, not handed to the executor."""
+    os.makedirs(settings.coe_job_dir, exist_ok=True)
+    job = COEJob(filename="coe.csv", upload_path="", status=status, user_id=user_id, **values)
+    db.add(job)
+    db.flush()
+    job.upload_path = os.path.join(settings.coe_job_dir, f"coe_job_{job.id}.csv")
+    if upload:
+        with open(job.upload_path, "wb") as out:
+            out.write(_CSV)
+    db.commit()
+    return job
+
+
+@pytest.fixture
+def submitted(monkeypatch) -> list[int]:
+    """Job ids recover_coe_jobs hands to the executor, instead of running them."""
+    ids: list[int] = []
+
+    class Executor:
+        def submit(self, fn, job_id):
+            ids.append(job_id)
+
+    monkeypatch.setattr(coe_jobs, "_get_executor", Executor)
+    return ids
+
+
+def test_job_completes_and_removes_its_upload(db, user):
+    job = _job(db, user.id)
+    coe_jobs.run_coe_job(job.id)
+    db.refresh(job)
+    assert job.status == "completed"
+    assert job.analysis_id is not None
+    assert job.rows_scored == 2
+    assert job.error is None
+    assert not os.path.exists(job.upload_path)
+
+
+def test_job_fails_when_saving_raises(db, user, monkeypatch):
+    def save(*args, **kwargs):
+        raise RuntimeError("disk full")
+
+    monkeypatch.setattr(coe_jobs, "save_coe_analysis", save)
+    job = _job(db, user.id)
+    coe_jobs.run_coe_job(job.id)
+    db.refresh(job)
+    assert job.status == "failed"
+    assert job.error == "disk full"
+    assert job.analysis_id is None
+    assert job.finished_at is not None
+    assert not os.path.exists(job.upload_path)
+
+
+def test_job_runs_once(db, user):
+    job = _job(db, user.id)
+    coe_jobs.run_coe_job(job.id)
+    db.refresh(job)
+    finished_at = job.finished_at
+    coe_jobs.run_coe_job(job.id)
+    db.refresh(job)
+    assert (job.status, job.finished_at) == ("completed", finished_at)
+
+
+def test_recovery_takes_back_only_stale_jobs(db, user, submitted):
+    stale = datetime.utcnow() - timedelta(seconds=settings.coe_job_stale_seconds + 60)
+    queued = _job(db, user.id)
+    fresh = _job(db, user.id, status="running", heartbeat_at=datetime.utcnow())
+    crashed = _job(db, user.id, status="running", heartbeat_at=stale)
+    missing = _job(db, user.id, upload=False)
+
+    coe_jobs.recover_coe_jobs()
+    assert {queued.id, crashed.id} <= set(submitted)
+    assert fresh.id not in submitted and missing.id not in submitted
+    for job in (queued, fresh, crashed, missing):
+        db.refresh(job)
+    assert (queued.status, fresh.status, crashed.status) == ("queued", "running", "queued")
+    assert missing.status == "failed"
+    assert missing.error == "Upload no longer available"
+
+
+def test_upload_queues_a_job_unless_asked_for_sync(user):
+    pytest.importorskip("httpx")
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    client = TestClient(app)
+    token = client.post(
+        "/api/auth/login", json={"username": user.username, "password": "Password123"}
+    ).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    files = {"file": ("coe.csv", _CSV)}
+
+    queued = client.post("/api/coe/upload", files=files, headers=headers)
+    assert queued.status_code == 202
+    job_id = queued.json()["job_id"]
+    deadline = time.monotonic() + 30
+    status = queued.json()
+    while status["status"] in ("queued", "running") and time.monotonic() < deadline:
+        time.sleep(0.05)
+        status = client.get(f"/api/coe/jobs/{job_id}", headers=headers).json()
+    assert status["status"] == "completed"
+    assert client.get(f"/api/coe/results/{status['analysis_id']}", headers=headers).json()["report_count"] == 2
+
+    sync = client.post("/api/coe/upload", params={"background": "false"}, files=files, headers=headers)
+    assert sync.status_code == 200
+    assert sync.json()["report_count"] == 2
+    assert sync.json()["analysis_id"] != status["analysis_id"]
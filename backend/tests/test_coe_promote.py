@@ -0,0 +1,58 @@
+"""Promoting a COE analysis into reports is idempotent on the COE report id."""
+import io
+
+from sqlalchemy import func, select
+
+from app.models.report import Report
+from app.services.coe_processor import analyze_coe_stream
+from app.services.coe_results import promote_coe_analysis, save_coe_analysis
+from app.services.dashboard_kpis import get_dashboard_stats
+
+_CSV = b"""Report Name,Report ID,Query SQL,Report Owner
+Sales by region,R1,"SELECT region, SUM(amount) FROM sales GROUP BY region",ana
+Open orders,R2,SELECT * FROM orders WHERE status = 'open',raj
+Sales copy,R3,"SELECT region, SUM(amount) FROM sales GROUP BY region",ana
+Ad hoc,,SELECT 1,
+"""
+
+
+def _analysis(db, user_id: int, content: bytes = _CSV):
+    result = analyze_coe_stream(io.BytesIO(content), "coe.csv")
+    return save_coe_analysis(db, result, "coe.csv", user_id)
+
+
+def _report_count(db, user_id: int) -> int:
+    return db.scalar(select(func.count(Report.id)).where(Report.created_by == user_id))
+
+
+def test_promote_twice_creates_reports_once(db, user):
+    record = _analysis(db, user.id)
+    first = promote_coe_analysis(db, record)
+    assert first == {"analysis_id": record.id, "created": 4, "skipped": 0}
+    assert _report_count(db, user.id) == 4
+
+    second = promote_coe_analysis(db, record)
+    assert second == {"analysis_id": record.id, "created": 0, "skipped": 4}
+    assert _report_count(db, user.id) == 4
+    assert get_dashboard_stats(db, user.id)[0]["total_reports"] == 4
+
+
+def test_reports_promoted_from_an_earlier_analysis_are_skipped(db, user):
+    promote_coe_analysis(db, _analysis(db, user.id))
+    # R1-R3 are already tracked; the row without an ID is keyed by its analysis.
+    again = promote_coe_analysis(db, _analysis(db, user.id))
+    assert (again["created"], again["skipped"]) == (1, 3)
+    assert _report_count(db, user.id) == 5
+    keys = db.scalars(select(Report.source_report_id).where(Report.created_by == user.id)).all()
+    assert len(keys) == len(set(keys))
+
+
+def test_analyses_without_a_report_id_column_do_not_collide(db, user):
+    # Without the column every row gets a positional ID: "0", "1", ...
+    one = _analysis(db, user.id, b"Report Name,Query SQL\nA,SELECT a FROM t\nB,SELECT b FROM u\n")
+    other = _analysis(db, user.id, b"Report Name,Query SQL\nC,SELECT c FROM v\nD,SELECT d FROM w\n")
+    first = promote_coe_analysis(db, one)
+    second = promote_coe_analysis(db, other)
+    assert (first["created"], second["created"], second["skipped"]) == (2, 2, 0)
+    assert _report_count(db, user.id) == 4
+    assert promote_coe_analysis(db, other) == {"analysis_id": other.id, "created": 0, "skipped": 2}
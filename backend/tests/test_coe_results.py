@@ -0,0 +1,83 @@
+"""Stored COE analyses: full and paged reads, and legacy blob migration."""
+import io
+import json
+
+import pytest
+from sqlalchemy import func, select
+
+from app.models.analysis import COEAnalysis, COEDuplicateGroup, COEReportRow
+from app.services.coe_processor import analyze_coe_stream
+from app.services.coe_results import (
+    delete_coe_analysis,
+    load_full_result,
+    query_duplicate_groups,
+    query_report_rows,
+    save_coe_analysis,
+)
+from benchmarks.corpus import corpus_csv, generate_corpus
+
+
+@pytest.fixture(scope="module")
+def result():
+    return analyze_coe_stream(io.BytesIO(corpus_csv(generate_corpus(60, seed=6))), "coe.csv")
+
+
+def _rows(db, model, analysis_id: int) -> int:
+    return db.scalar(select(func.count()).select_from(model).where(model.analysis_id == analysis_id))
+
+
+def test_stored_analysis_reads_back_whole(db, user, result):
+    record = save_coe_analysis(db, result, "coe.csv", user.id)
+    assert load_full_result(db, record) == result.as_dict()
+
+
+def test_report_pages_filter_and_sort_in_sql(db, user, result):
+    record = save_coe_analysis(db, result, "coe.csv", user.id)
+    reports = result.as_dict()["reports"]
+
+    page = query_report_rows(db, record.id, skip=10, limit=5, include_sql=False)
+    assert page["total"] == len(reports)
+    assert [r["report_name"] for r in page["items"]] == [r["report_name"] for r in reports[10:15]]
+    assert "sql" not in page["items"][0]
+
+    medium = [r for r in reports if r["complexity_category"] == "Medium"]
+    page = query_report_rows(db, record.id, limit=1000, category="Medium", sort="-complexity_score")
+    assert page["total"] == len(medium)
+    # Ties keep their stored order
+    expected = sorted(medium, key=lambda r: -r["complexity_score"])
+    assert [r["report_name"] for r in page["items"]] == [r["report_name"] for r in expected]
+
+    with pytest.raises(ValueError, match="Unknown sort field"):
+        query_report_rows(db, record.id, sort="sql")
+
+
+def test_group_pages_filter_by_type_and_similarity(db, user, result):
+    record = save_coe_analysis(db, result, "coe.csv", user.id)
+    groups = result.as_dict()["duplicate_groups"]
+    near = [g for g in groups if g["type"] == "NEAR_DUPLICATE" and g["similarity"] >= 90]
+    page = query_duplicate_groups(db, record.id, limit=1000, group_type="near_duplicate", min_similarity=90)
+    assert page["items"] == near
+
+
+def test_legacy_blob_moves_into_the_tables_on_first_read(db, user, result):
+    full = result.as_dict()
+    # Stored before the row tables: everything in results_json
+    record = COEAnalysis(filename="old.csv", results_json=json.dumps(full), user_id=user.id)
+    db.add(record)
+    db.commit()
+    assert query_report_rows(db, record.id)["total"] == 0
+
+    assert load_full_result(db, record) == full
+    assert _rows(db, COEReportRow, record.id) == full["report_count"]
+    assert "reports" not in json.loads(record.results_json)
+    # Read again: served from the tables, not migrated twice
+    assert load_full_result(db, record) == full
+    assert _rows(db, COEDuplicateGroup, record.id) == len(full["duplicate_groups"])
+
+
+def test_delete_removes_the_rows(db, user, result):
+    record = save_coe_analysis(db, result, "coe.csv", user.id)
+    analysis_id = record.id
+    delete_coe_analysis(db, record)
+    assert db.get(COEAnalysis, analysis_id) is None
+    assert _rows(db, COEReportRow, analysis_id) == _rows(db, COEDuplicateGroup, analysis_id) == 0
@@ -0,0 +1,102 @@
+"""COEResult.as_dict() against the per-report dict output it replaced."""
+import random
+from collections import defaultdict
+
+from app.services.coe_table import COEReportTable, COEResult
+from app.utils.sql_parser import complexity_category, estimate_migration_hours
+
+
+def _legacy_dict(reports: list[dict], near_pairs: list[tuple[int, int, float]]) -> dict:
+    """The analysis dict as built from report dicts before the columnar table."""
+    dist = defaultdict(int)
+    for r in reports:
+        dist[r["complexity_category"]] += 1
+    fingerprint_groups = defaultdict(list)
+    for r in reports:
+        if r["fingerprint"]:
+            fingerprint_groups[r["fingerprint"]].append(r)
+    groups = [{"reports": g, "similarity": 100, "type": "EXACT"} for g in fingerprint_groups.values() if len(g) > 1]
+    near = [
+        {"reports": [reports[a], reports[b]], "similarity": round(sim, 1), "type": "NEAR_DUPLICATE"}
+        for a, b, sim in near_pairs
+    ]
+    duplicates = sum(len(g["reports"]) - 1 for g in groups) + len(near)
+    by_owner = defaultdict(int)
+    for r in reports:
+        by_owner[r["owner"] or "Unknown"] += 1
+    return {
+        "report_count": len(reports),
+        "unique_count": len(fingerprint_groups),
+        "duplicate_count": duplicates,
+        "complexity_distribution": dict(dist),
+        "total_estimated_hours": round(sum(r["estimated_hours"] for r in reports), 1),
+        "avg_complexity": round(sum(r["complexity_score"] for r in reports) / len(reports), 1) if reports else 0,
+        "duplicate_groups": [
+            {
+                "similarity": g["similarity"],
+                "type": g["type"],
+                "report_names": [x["report_name"] for x in g["reports"]],
+                "recommendation": (
+                    "Consolidate into single parameterized report" if g["similarity"] >= 95
+                    else "Review for consolidation"
+                ),
+            }
+            for g in groups + near
+        ],
+        "top_complex_reports": [
+            {k: r[k] for k in ("report_name", "complexity_score", "complexity_category", "estimated_hours")}
+            for r in sorted(reports, key=lambda x: -x["complexity_score"])[:10]
+        ],
+        "reports_by_owner": dict(by_owner),
+        "reports": reports,
+    }
+
+
+def _reports(n: int, seed: int) -> list[dict]:
+    rng = random.Random(seed)
+    reports = []
+    for i in range(n):
+        sql = rng.choice(["", f"select {rng.randint(0, n // 3)} from t"])
+        score = rng.choice([1.0, 3.0, 7.5, 12.0, 22.0, 40.0])
+        reports.append({
+            "report_name": f"Report {i}",
+            "report_id": f"R{i}",
+            "sql": sql,
+            "owner": rng.choice(["", "ana", "raj", "Unknown"]),
+            "complexity_score": score,
+            "complexity_category": complexity_category(score),
+            "estimated_hours": estimate_migration_hours(score),
+            "fingerprint": f"fp-{sql}" if sql else "",
+        })
+    return reports
+
+
+def _result(reports: list[dict], near_pairs: list[tuple[int, int, float]]) -> COEResult:
+    table = COEReportTable()
+    for r in reports:
+        table.append(
+            r["report_name"], r["report_id"], r["sql"], r["owner"], r["complexity_score"],
+            r["complexity_category"], r["estimated_hours"], r["fingerprint"],
+        )
+    return COEResult(table, near_pairs)
+
+
+def test_as_dict_matches_legacy_output():
+    for seed in range(5):
+        reports = _reports(120, seed)
+        # Near pairs link the first report of two fingerprints, as coe_processor finds them
+        first_rows = {}
+        for i, r in enumerate(reports):
+            if r["fingerprint"]:
+                first_rows.setdefault(r["fingerprint"], i)
+        first_rows = list(first_rows.values())
+        rng = random.Random(seed)
+        near_pairs = [tuple(sorted(rng.sample(first_rows, 2))) + (rng.uniform(85, 99.99),) for _ in range(6)]
+        expected = _legacy_dict(reports, near_pairs)
+        actual = _result(reports, near_pairs).as_dict()
+        assert actual == expected
+        assert list(actual) == list(expected)
+
+
+def test_empty_analysis():
+    assert _result([], []).as_dict() == _legacy_dict([], [])
@@ -0,0 +1,49 @@
+"""Column-wide complexity scoring against the per-query functions."""
+import random
+
+import numpy as np
+import pandas as pd
+
+from app.utils.sql_parser import (
+    ParsedSQL,
+    calculate_complexity_score,
+    complexity_categories,
+    complexity_category,
+    estimate_migration_hours,
+    migration_hours,
+    score_complexity,
+)
+from benchmarks.corpus import generate_corpus
+from benchmarks.lexer_conformance import fuzz_sql
+
+
+def _queries() -> list[str]:
+    rng = random.Random(2)
+    sqls = [r["sql"] for r in generate_corpus(120, seed=2)]
+    sqls += [fuzz_sql(rng, sql) for sql in sqls[:30]]
+    # Long queries reach each line-count penalty
+    sqls += ["SELECT a\n" + ",\nb" * n + "\nFROM t" for n in (100, 500, 1000)]
+    return sqls + ["", "SELECT (((", "WITH RECURSIVE r AS (SELECT 1) SELECT * FROM r"]
+
+
+def test_column_scores_match_per_query_scores():
+    parsed = [ParsedSQL(sql) for sql in _queries()]
+    features, scores = score_complexity(parsed)
+    assert features.shape[0] == len(parsed)
+    assert scores.tolist() == [calculate_complexity_score(p) for p in parsed]
+    # Text inputs score the same as their ParsedSQL
+    assert score_complexity([p.sql for p in parsed[:20]])[1].tolist() == scores[:20].tolist()
+    assert complexity_categories(scores).tolist() == [complexity_category(s) for s in scores.tolist()]
+    assert migration_hours(scores).tolist() == [estimate_migration_hours(s) for s in scores.tolist()]
+
+
+def test_missing_values_score_as_empty_sql():
+    _, scores = score_complexity(pd.Series(["SELECT a FROM t", None, np.nan]))
+    assert scores.tolist() == [calculate_complexity_score("SELECT a FROM t")] + [calculate_complexity_score("")] * 2
+    features, scores = score_complexity([])
+    assert features.shape[0] == 0 and scores.shape == (0,)
+
+
+def test_category_boundaries():
+    bounds = [0, 5, 5.1, 15, 15.1, 30, 30.1, 99]
+    assert complexity_categories(np.array(bounds)).tolist() == [complexity_category(s) for s in bounds]
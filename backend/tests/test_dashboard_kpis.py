@@ -0,0 +1,170 @@
+"""Incremental dashboard KPIs against a full rebuild, and the dashboard ETag."""
+import pytest
+from sqlalchemy import event, insert, inspect, select, text
+
+from app.database import SessionLocal, _ensure_schema, engine
+from app.models.report import Report
+from app.schemas.report import ReportCreate, ReportUpdate
+from app.services import dashboard_kpis
+from app.services.dashboard_kpis import BREAKDOWN_KEYS, get_dashboard_stats, report_contribution
+from app.services.report_service import ReportService
+
+_REPORTS = [
+    ReportCreate(name="Daily sales", sql_query="SELECT region, SUM(amount) FROM sales GROUP BY region"),
+    ReportCreate(name="Orders", sql_query="SELECT * FROM orders", complexity_score=3, complexity_category="Simple"),
+    ReportCreate(name="Margins", complexity_score=22, estimated_hours=14.5),
+    ReportCreate(name="Forecast", complexity_score=48),
+]
+
+
+def _rebuilt(db, user_id: int) -> dict:
+    return get_dashboard_stats(db, user_id, refresh=True)[0]
+
+
+def test_kpi_deltas_match_a_rebuild(db, user):
+    service = ReportService(db)
+    # Read first, so the KPI row exists and the writes below adjust it.
+    assert get_dashboard_stats(db, user.id)[0]["total_reports"] == 0
+    reports = [service.create_report(data, user.id) for data in _REPORTS]
+
+    stats, _ = get_dashboard_stats(db, user.id)
+    assert stats["total_reports"] == 4
+    assert stats["complexity_breakdown"]["very_complex"] == 1
+    assert stats == _rebuilt(db, user.id)
+
+    service.update_report(reports[0].id, ReportUpdate(migrated=True), user.id)
+    service.update_report(reports[2].id, ReportUpdate(complexity_score=4, complexity_category="Simple"), user.id)
+    stats, _ = get_dashboard_stats(db, user.id)
+    assert stats["reports_migrated"] == 1
+    assert stats["migration_progress_percent"] == 25.0
+    assert stats == _rebuilt(db, user.id)
+
+    service.delete_report(reports[3].id, user.id)
+    service.delete_report(reports[0].id, user.id)
+    stats, _ = get_dashboard_stats(db, user.id)
+    assert stats["total_reports"] == 2
+    assert stats["reports_migrated"] == 0
+    assert stats["complexity_breakdown"]["very_complex"] == 0
+    assert stats == _rebuilt(db, user.id)
+
+
+
+def test_sql_aggregates_match_a_python_pass(db, user):
+    # Raw rows, including the values a report created elsewhere may hold
+    rows = [
+        {"complexity_category": "Very Complex", "complexity_score": 2, "estimated_hours": 0, "migrated": True},
+        {"complexity_category": "MEDIUM", "complexity_score": None, "estimated_hours": None, "migrated": None},
+        {"complexity_category": "unknown", "complexity_score": 15.5, "estimated_hours": 3.25, "migrated": False},
+        {"complexity_category": None, "complexity_score": 5, "estimated_hours": None, "migrated": True},
+        {"complexity_category": "", "complexity_score": 30.01, "estimated_hours": 0.0, "migrated": False},
+        {"complexity_category": None, "complexity_score": None, "estimated_hours": 1.1, "migrated": False},
+    ]
+    db.execute(insert(Report), [{"name": f"R{i}", "created_by": user.id, **r} for i, r in enumerate(rows)])
+    db.commit()
+
+    contributions = [report_contribution(r) for r in rows]
+    stats = _rebuilt(db, user.id)
+    assert stats["total_reports"] == len(rows)
+    assert stats["reports_migrated"] == sum(migrated for _, migrated, _ in contributions)
+    assert stats["complexity_breakdown"] == {
+        key: sum(bucket == key for bucket, _, _ in contributions) for key in BREAKDOWN_KEYS
+    }
+    assert stats["estimated_total_hours"] == round(sum(hours for _, _, hours in contributions), 1)
+
+
+def test_missing_dashboard_indexes_are_created():
+    with engine.begin() as conn:
+        conn.execute(text("DROP INDEX ix_reports_created_by_category"))
+    _ensure_schema()
+    assert "ix_reports_created_by_category" in {ix["name"] for ix in inspect(engine).get_indexes("reports")}
+
+def test_first_read_counts_reports_written_before_it(db, user):
+    service = ReportService(db)
+    for data in _REPORTS:
+        service.create_report(data, user.id)
+    stats, etag = get_dashboard_stats(db, user.id)
+    assert stats["total_reports"] == 4
+    assert etag == f'"kpi-{user.id}-1"'
+
+
+def test_etag_changes_with_each_write(db, user):
+    _, etag = get_dashboard_stats(db, user.id)
+    assert get_dashboard_stats(db, user.id)[1] == etag
+    report = ReportService(db).create_report(_REPORTS[0], user.id)
+    _, created = get_dashboard_stats(db, user.id)
+    assert created != etag
+    ReportService(db).update_report(report.id, ReportUpdate(name="Renamed"), user.id)
+    # A change that moves no KPI keeps the ETag.
+    assert get_dashboard_stats(db, user.id)[1] == created
+
+
+def test_rebuild_leaves_the_callers_session_uncommitted(db, user):
+    commits = []
+    event.listen(db, "after_commit", lambda session: commits.append(session))
+    db.add(Report(name="Pending", created_by=user.id))
+    get_dashboard_stats(db, user.id, refresh=True)
+    assert not commits
+    db.rollback()
+    assert db.scalar(select(Report.id).where(Report.created_by == user.id)) is None
+
+
+def test_rebuild_without_upsert_gets_or_creates_the_row(db, user, monkeypatch):
+    monkeypatch.setattr(dashboard_kpis, "_UPSERT_DIALECTS", {})
+    service = ReportService(db)
+    service.create_report(_REPORTS[0], user.id)
+    stats, etag = get_dashboard_stats(db, user.id)
+    assert stats["total_reports"] == 1
+    assert etag == f'"kpi-{user.id}-1"'
+    service.create_report(_REPORTS[1], user.id)
+    stats, etag = get_dashboard_stats(db, user.id, refresh=True)
+    assert stats["total_reports"] == 2
+    assert etag == f'"kpi-{user.id}-3"'
+
+
+def test_read_overlapping_a_write_is_not_cached(db, user, monkeypatch):
+    get_dashboard_stats(db, user.id)
+    stats = dashboard_kpis._stats
+
+    def stats_then_write(kpi):
+        # Another request commits a report after this one read the KPI row.
+        result = stats(kpi)
+        with SessionLocal() as other:
+            ReportService(other).create_report(_REPORTS[0], user.id)
+        return result
+
+    dashboard_kpis._cache.pop(user.id)
+    monkeypatch.setattr(dashboard_kpis, "_stats", stats_then_write)
+    assert get_dashboard_stats(db, user.id)[0]["total_reports"] == 0
+    monkeypatch.setattr(dashboard_kpis, "_stats", stats)
+    db.expire_all()
+    assert get_dashboard_stats(db, user.id)[0]["total_reports"] == 1
+
+
+def test_dashboard_answers_304_for_the_current_etag(user):
+    pytest.importorskip("httpx")
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    client = TestClient(app)
+    token = client.post(
+        "/api/auth/login", json={"username": user.username, "password": "Password123"}
+    ).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    first = client.get("/api/dashboard/stats", headers=headers)
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+    assert first.headers["cache-control"] == "private, no-cache"
+
+    cached = client.get("/api/dashboard/stats", headers={**headers, "If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.headers["etag"] == etag
+
+    refreshed = client.get("/api/dashboard/stats?refresh=true", headers={**headers, "If-None-Match": etag})
+    assert refreshed.status_code == 200
+
+    client.post("/api/reports/", json={"name": "New report", "complexity_score": 9}, headers=headers)
+    changed = client.get("/api/dashboard/stats", headers={**headers, "If-None-Match": refreshed.headers["etag"]})
+    assert changed.status_code == 200
+    assert changed.json()["total_reports"] == 1
@@ -0,0 +1,63 @@
+"""Engine setup: SQLite tuning, pool settings, and run_db in both database modes."""
+import anyio
+import pytest
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool, StaticPool
+
+from app import database
+from app.config import settings
+from app.database import async_database_url, run_db
+from app.models.user import User
+
+
+@pytest.mark.parametrize("url,expected", [
+    ("sqlite:///./bi.db", "sqlite+aiosqlite:///./bi.db"),
+    ("sqlite+pysqlite:///./bi.db", "sqlite+aiosqlite:///./bi.db"),
+    ("postgresql://u:p@db/bi", "postgresql+asyncpg://u:p@db/bi"),
+    ("postgresql+psycopg2://u:p@db/bi", "postgresql+asyncpg://u:p@db/bi"),
+    ("mysql://u:p@db/bi", "mysql://u:p@db/bi"),
+])
+def test_async_database_url(url, expected):
+    assert async_database_url(url) == expected
+
+
+def _username(db, user_id: int) -> str:
+    return db.get(User, user_id).username
+
+
+def test_run_db_on_the_async_engine_matches_the_threadpool(user, monkeypatch):
+    pytest.importorskip("aiosqlite")
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    threaded = anyio.run(run_db, _username, user.id)
+    async_engine = create_async_engine(async_database_url(settings.database_url))
+    connects = []
+    event.listen(async_engine.sync_engine, "connect", lambda *args: connects.append(args))
+    monkeypatch.setattr(
+        database, "AsyncSessionLocal", async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+    )
+
+    async def on_the_async_engine() -> str:
+        try:
+            return await run_db(_username, user.id)
+        finally:
+            await async_engine.dispose()
+
+    assert anyio.run(on_the_async_engine) == threaded == user.username
+    assert len(connects) == 1
+
+
+def test_sqlite_connections_use_wal_and_wait_for_locks():
+    with database.engine.connect() as conn:
+        assert conn.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+        assert conn.exec_driver_sql("PRAGMA busy_timeout").scalar() == settings.sqlite_busy_timeout_ms
+        assert conn.exec_driver_sql("PRAGMA synchronous").scalar() == 1  # NORMAL
+
+
+def test_pool_settings(monkeypatch):
+    pool = database.engine.pool
+    assert isinstance(pool, QueuePool)
+    assert (pool.size(), pool.timeout()) == (settings.db_pool_size, settings.db_pool_timeout)
+    # In-memory SQLite: one shared connection, no pool sizing
+    monkeypatch.setattr(database, "_is_memory", True)
+    assert database._pool_args() == {"poolclass": StaticPool}
@@ -0,0 +1,72 @@
+"""Bounded Levenshtein: exact within the bound, a lower bound past it."""
+import random
+
+import pytest
+
+from app.utils.sql_parser import _levenshtein_distance, levenshtein_similarity
+
+
+def _reference(s1: str, s2: str) -> int:
+    previous = list(range(len(s2) + 1))
+    for i, a in enumerate(s1, 1):
+        current = [i]
+        for j, b in enumerate(s2, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (a != b)))
+        previous = current
+    return previous[-1]
+
+
+def _pairs(n: int, seed: int = 7):
+    rng = random.Random(seed)
+    for _ in range(n):
+        s1 = "".join(rng.choice("abcd ") for _ in range(rng.randint(0, 90)))
+        s2 = list(s1)
+        for _ in range(rng.randint(0, 25)):
+            pos = rng.randint(0, len(s2))
+            op = rng.randrange(3)
+            if op == 0:
+                s2.insert(pos, rng.choice("abcde"))
+            elif s2 and pos < len(s2):
+                if op == 1:
+                    del s2[pos]
+                else:
+                    s2[pos] = rng.choice("abcde")
+        yield s1, "".join(s2)
+
+
+@pytest.mark.parametrize(
+    "s1,s2", [("", ""), ("", "abc"), ("kitten", "sitting"), ("flaw", "lawn"), ("a" * 70, "b" * 70)]
+)
+def test_unbounded_distance_is_exact(s1, s2):
+    assert _levenshtein_distance(s1, s2) == (_reference(s1, s2), True)
+
+
+def test_unbounded_distance_matches_reference():
+    for s1, s2 in _pairs(300):
+        assert _levenshtein_distance(s1, s2) == (_reference(s1, s2), True)
+
+
+def test_bounded_distance_contract():
+    for s1, s2 in _pairs(300):
+        expected = _reference(s1, s2)
+        for max_dist in (0, 1, 5, 10, 40):
+            dist, exact = _levenshtein_distance(s1, s2, max_dist)
+            if exact:
+                assert dist == expected
+            else:
+                # Stopped early: a lower bound, and the true distance is past the bound.
+                assert expected > max_dist
+                assert max_dist < dist <= expected
+            if expected <= max_dist:
+                assert exact
+
+
+def test_similarity_is_exact_at_or_above_min_similarity():
+    for s1, s2 in _pairs(300, seed=11):
+        full = levenshtein_similarity(s1, s2)
+        for min_similarity in (0.5, 0.8, 0.95):
+            bounded = levenshtein_similarity(s1, s2, min_similarity)
+            if full >= min_similarity:
+                assert bounded == full
+            else:
+                assert full <= bounded < min_similarity
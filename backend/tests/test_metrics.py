@@ -0,0 +1,46 @@
+"""Timed SQL analysis stages: nested calls count once, toward the outer stage."""
+import time
+
+from app.config import settings
+from app.utils import metrics
+
+
+def _timed_pair(monkeypatch, prefix: str):
+    # The decorator checks the setting when applied; the suite runs with metrics off.
+    monkeypatch.setattr(settings, "metrics_enabled", True)
+
+    @metrics.timed(f"{prefix}_inner")
+    def inner():
+        time.sleep(0.01)
+
+    @metrics.timed(f"{prefix}_outer")
+    def outer():
+        inner()
+        inner()
+
+    return inner, outer
+
+
+def test_nested_timed_calls_count_toward_the_outer_stage(monkeypatch):
+    inner, outer = _timed_pair(monkeypatch, "request")
+    timings = metrics.start_request_timings()
+    start = time.perf_counter()
+    outer()
+    elapsed = time.perf_counter() - start
+    assert set(timings) == {"request_outer"}
+    assert timings["request_outer"][1] == 1
+    assert 0.02 <= timings["request_outer"][0] <= elapsed
+
+    inner()
+    assert timings["request_inner"][1] == 1
+    assert sum(seconds for seconds, _ in timings.values()) <= time.perf_counter() - start
+    metrics._request_timings.set(None)
+
+
+def test_function_summary_counts_outermost_calls(monkeypatch):
+    inner, outer = _timed_pair(monkeypatch, "summary")
+    outer()
+    inner()
+    rendered = metrics.function_seconds.render()
+    assert 'sql_analysis_function_seconds_count{function="summary_outer"} 1' in rendered
+    assert 'sql_analysis_function_seconds_count{function="summary_inner"} 1' in rendered
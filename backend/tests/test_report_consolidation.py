@@ -0,0 +1,64 @@
+"""Report consolidation over the write-time similarity index."""
+import threading
+
+import pytest
+from sqlalchemy import insert
+
+from app.models.report import Report
+from app.schemas.report import ReportCreate
+from app.services import report_consolidator, report_index
+from app.services.report_consolidator import consolidate_user_reports
+from app.services.report_service import ReportService
+
+_SALES = "SELECT region, product, SUM(amount) AS total FROM sales_fact WHERE year = 2024 GROUP BY region, product"
+
+
+@pytest.fixture
+def backfills(monkeypatch) -> list[int]:
+    """User ids consolidation schedules a backfill for, instead of running it."""
+    scheduled: list[int] = []
+    monkeypatch.setattr(report_consolidator, "schedule_backfill", scheduled.append)
+    return scheduled
+
+
+def _create(db, user_id: int, name: str, sql: str) -> int:
+    return ReportService(db).create_report(ReportCreate(name=name, sql_query=sql), user_id).id
+
+
+def test_copies_and_near_copies_form_one_cluster(db, user, backfills):
+    first = _create(db, user.id, "Sales", _SALES)
+    copy = _create(db, user.id, "Sales copy", _SALES)
+    near = _create(db, user.id, "Sales by channel", _SALES.replace("region, product", "region, product, channel"))
+    _create(db, user.id, "Orders", "SELECT id, status FROM orders WHERE status = 'open'")
+
+    result = consolidate_user_reports(db, user.id)
+    assert (result["total_reports"], result["unindexed_reports"]) == (4, 0)
+    [group] = result["duplicate_groups"]
+    assert [r["id"] for r in group["reports"]] == [first, copy, near]
+    assert group["type"] == "NEAR_DUPLICATE"
+    assert 85 <= group["similarity"] < 100
+    assert result["potential_savings"]["reports_to_skip"] == 2
+    assert backfills == []
+
+
+def test_unindexed_reports_are_counted_and_left_to_the_backfill(db, user, backfills):
+    _create(db, user.id, "Sales", _SALES)
+    # Bulk-loaded like a COE promotion: fingerprint known, not indexed yet
+    fingerprint = db.get(Report, _create(db, user.id, "Sales copy", _SALES)).sql_fingerprint
+    db.execute(insert(Report), [
+        {"name": f"Promoted {i}", "sql_query": _SALES, "sql_fingerprint": fingerprint, "created_by": user.id}
+        for i in range(2)
+    ])
+    db.commit()
+
+    # A backfill running for another user must not hold consolidation up.
+    result = {}
+    with report_index._backfill_lock:
+        worker = threading.Thread(target=lambda: result.update(consolidate_user_reports(db, user.id)))
+        worker.start()
+        worker.join(timeout=10)
+        assert not worker.is_alive()
+    assert result["unindexed_reports"] == 2
+    assert backfills == [user.id]
+    [group] = result["duplicate_groups"]
+    assert (group["type"], len(group["reports"])) == ("EXACT", 4)
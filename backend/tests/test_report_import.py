@@ -0,0 +1,65 @@
+"""Bulk report import: per-row errors, and files that break off partway."""
+import io
+import json
+
+import pytest
+from sqlalchemy import func, select
+
+from app.config import settings
+from app.models.report import Report
+from app.services import report_import
+from app.services.report_import import import_reports
+
+
+@pytest.fixture
+def backfills(monkeypatch) -> list[int]:
+    """User ids import_reports schedules a backfill for, instead of running it."""
+    scheduled: list[int] = []
+    monkeypatch.setattr(report_import, "schedule_backfill", scheduled.append)
+    return scheduled
+
+
+def _count(db, user_id: int) -> int:
+    return db.scalar(select(func.count(Report.id)).where(Report.created_by == user_id))
+
+
+def test_bad_rows_are_reported_and_the_rest_imported(db, user, backfills):
+    lines = [
+        json.dumps({"name": "Sales", "sql_query": "SELECT region FROM sales"}),
+        "{not json",
+        json.dumps({"sql_query": "SELECT 1"}),
+        "",
+        json.dumps(["a list"]),
+        json.dumps({"Report Name": "Orders", "Query SQL": "SELECT * FROM orders", "complexity_score": 7}),
+        json.dumps({"name": "x" * 300}),
+    ]
+    result = import_reports(db, user.id, io.BytesIO("\n".join(lines).encode()), "reports.jsonl")
+    assert (result["imported"], result["failed"], result["error"]) == (2, 4, None)
+    assert [e["row"] for e in result["errors"]] == [2, 3, 5, 7]
+    assert result["errors"][0]["error"].startswith("Invalid JSON")
+    assert not result["errors_truncated"]
+    assert _count(db, user.id) == 2
+    orders = db.scalar(select(Report).where(Report.created_by == user.id, Report.name == "Orders"))
+    assert orders.complexity_score == 7
+    assert backfills == [user.id]
+
+
+def test_csv_that_breaks_off_keeps_the_rows_before(db, user, backfills, monkeypatch):
+    monkeypatch.setattr(settings, "coe_csv_chunk_rows", 2)
+    monkeypatch.setattr(settings, "report_import_batch", 3)
+    rows = [f"Report {i},R{i},SELECT {i} FROM t,ana" for i in range(5)]
+    # An unterminated quote: the parser fails on the chunk holding row 5
+    content = "Report Name,Report ID,Query SQL,Report Owner\n" + "\n".join(rows) + '\nBad,R9,"SELECT 9,ana\n'
+    result = import_reports(db, user.id, io.BytesIO(content.encode()), "reports.csv")
+    assert result["imported"] == 4
+    assert result["failed"] == 0
+    assert "EOF inside string" in result["error"]
+    assert _count(db, user.id) == 4
+    assert backfills == [user.id]
+
+
+def test_unreadable_file_imports_nothing(db, user, backfills):
+    with pytest.raises(ValueError, match="No SQL column"):
+        import_reports(db, user.id, io.BytesIO(b"Report Name,Owner\nA,ana\n"), "reports.csv")
+    assert _count(db, user.id) == 0
+    assert backfills == []
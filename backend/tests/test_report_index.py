@@ -0,0 +1,77 @@
+"""Write-time similarity edges against a pairwise scan of the same reports."""
+from itertools import combinations
+
+from sqlalchemy import func, insert, select
+
+from app.models.report import Report
+from app.models.report_index import ReportLSHBand, ReportSimilarityEdge
+from app.schemas.report import ReportCreate, ReportUpdate
+from app.services.report_index import SIMILARITY_THRESHOLD, ReportIndexer
+from app.services.report_service import ReportService
+from app.utils.sql_parser import ParsedSQL, sql_similarity_percent
+from benchmarks.corpus import generate_corpus
+
+
+def _edges(db, user_id: int) -> set[tuple[int, int]]:
+    rows = db.execute(
+        select(ReportSimilarityEdge.report_a, ReportSimilarityEdge.report_b)
+        .where(ReportSimilarityEdge.user_id == user_id)
+    )
+    return {tuple(row) for row in rows}
+
+
+def _pairwise(reports: dict[int, str]) -> set[tuple[int, int]]:
+    parsed = {report_id: ParsedSQL(sql) for report_id, sql in reports.items()}
+    return {
+        (a, b) for a, b in combinations(sorted(parsed), 2)
+        if parsed[a].fingerprint != parsed[b].fingerprint
+        and SIMILARITY_THRESHOLD <= sql_similarity_percent(parsed[a], parsed[b]) < 100
+    }
+
+
+def _corpus() -> list[str]:
+    return [r["sql"] for r in generate_corpus(40, seed=8, near_duplicate_rate=0.3)]
+
+
+def test_edges_written_per_report_match_a_pairwise_scan(db, user):
+    service = ReportService(db)
+    reports = {service.create_report(ReportCreate(name=f"R{i}", sql_query=sql), user.id).id: sql
+               for i, sql in enumerate(_corpus())}
+    expected = _pairwise(reports)
+    assert expected
+    assert _edges(db, user.id) == expected
+
+
+def test_backfill_matches_writing_each_report(db, user):
+    db.execute(insert(Report), [
+        {"name": f"R{i}", "sql_query": sql, "created_by": user.id} for i, sql in enumerate(_corpus())
+    ])
+    db.commit()
+    reports = dict(db.execute(select(Report.id, Report.sql_query).where(Report.created_by == user.id)).all())
+    assert ReportIndexer(db).backfill(user.id) == len(reports)
+    assert _edges(db, user.id) == _pairwise(reports)
+    assert ReportIndexer(db).backfill(user.id) == 0
+
+
+def test_update_and_delete_maintain_the_edges(db, user):
+    service = ReportService(db)
+    sql = "SELECT region, product, SUM(amount) AS total FROM sales_fact WHERE year = 2024 GROUP BY region, product"
+    first = service.create_report(ReportCreate(name="Sales", sql_query=sql), user.id).id
+    near = service.create_report(
+        ReportCreate(name="Sales by channel", sql_query=sql.replace("region, product", "region, product, channel")),
+        user.id,
+    ).id
+    copy = service.create_report(ReportCreate(name="Sales copy", sql_query=sql), user.id).id
+    # An exact copy shares the fingerprint: grouped without an edge
+    assert _edges(db, user.id) == {(first, near), (near, copy)}
+
+    service.update_report(near, ReportUpdate(sql_query="SELECT id, status FROM orders"), user.id)
+    assert _edges(db, user.id) == set()
+    service.update_report(copy, ReportUpdate(name="Renamed"), user.id)
+    service.update_report(near, ReportUpdate(sql_query=sql + " ORDER BY total"), user.id)
+    assert _edges(db, user.id) == {(first, near), (near, copy)}
+
+    service.delete_report(near, user.id)
+    assert _edges(db, user.id) == set()
+    bands = db.scalar(select(func.count()).select_from(ReportLSHBand).where(ReportLSHBand.report_id == near))
+    assert bands == 0
@@ -0,0 +1,43 @@
+"""Top-K similar report search: ranking, and never writing to the index."""
+from sqlalchemy import event, insert, select
+
+from app.models.report import Report
+from app.schemas.report import ReportCreate
+from app.services.report_service import ReportService
+from app.services.sql_analyzer import find_similar_reports
+from app.utils.sql_parser import sql_similarity_percent
+from benchmarks.corpus import generate_corpus
+
+
+def test_top_k_matches_ranking_every_report(db, user):
+    service = ReportService(db)
+    reports = {
+        service.create_report(ReportCreate(name=f"R{i}", sql_query=sql), user.id).id: sql
+        for i, sql in enumerate(r["sql"] for r in generate_corpus(40, seed=12, near_duplicate_rate=0.3))
+    }
+    queries = list(reports.values())[::7]
+    for query in queries:
+        ranked = sorted(
+            ((sql_similarity_percent(query, sql, threshold=80), -report_id) for report_id, sql in reports.items()),
+            reverse=True,
+        )
+        expected = [(-neg_id, sim) for sim, neg_id in ranked if sim >= 80][:3]
+        found = find_similar_reports(db, user.id, query, top_k=3, min_similarity=80)
+        assert [(r["report_id"], r["similarity"]) for r in found] == expected
+    assert find_similar_reports(db, user.id, "  ") == []
+
+
+def test_search_leaves_unindexed_reports_alone(db, user):
+    sql = "SELECT region, SUM(amount) FROM sales GROUP BY region"
+    indexed = ReportService(db).create_report(ReportCreate(name="Sales", sql_query=sql), user.id).id
+    # Bulk-loaded and not backfilled yet
+    db.execute(insert(Report), [{"name": "Sales copy", "sql_query": sql, "created_by": user.id}])
+    db.commit()
+    flushes = []
+    event.listen(db, "after_flush", lambda session, context: flushes.append(session))
+
+    found = find_similar_reports(db, user.id, sql)
+    assert [(r["report_id"], r["similarity"]) for r in found] == [(indexed, 100.0)]
+    assert not flushes and not db.new and not db.dirty
+    unindexed = db.scalars(select(Report.id).where(Report.created_by == user.id, Report.sql_tokens_json.is_(None)))
+    assert len(unindexed.all()) == 1
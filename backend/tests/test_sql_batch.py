@@ -0,0 +1,79 @@
+"""Batch SQL analyze/compare: the NDJSON endpoints against one call per query."""
+import json
+
+import pytest
+
+from app.api import sql_analysis
+from app.config import settings
+from app.services import analysis_cache
+from app.services.sql_analyzer import analyze_sql, analyze_sql_batch, compare_sql, compare_sql_batch
+from app.services.worker_pool import get_process_pool, shutdown_process_pool
+
+_QUERIES = [
+    "SELECT region, SUM(amount) FROM sales GROUP BY region",
+    "",
+    "SELECT * FROM orders o JOIN customers c ON o.customer_id = c.id WHERE o.total > 100",
+    "SELECT region, SUM(amount) FROM sales GROUP BY region",
+    "WITH t AS (SELECT id FROM a) SELECT * FROM t UNION SELECT id FROM b",
+    "select 1; select 2",
+    "SELECT name FROM products ORDER BY price DESC LIMIT 5",
+]
+
+
+@pytest.fixture
+def api(user, monkeypatch):
+    """(client, headers, offloaded): logged in as `user`, recording each run_cpu call."""
+    pytest.importorskip("httpx")
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    offloaded = []
+
+    async def run_cpu(fn, *args):
+        offloaded.append(args)
+        return fn(*args)
+
+    monkeypatch.setattr(sql_analysis, "run_cpu", run_cpu)
+    # Small chunks, so a request spans several
+    monkeypatch.setattr(settings, "coe_chunk_size", 3)
+    client = TestClient(app)
+    token = client.post(
+        "/api/auth/login", json={"username": user.username, "password": "Password123"}
+    ).json()["access_token"]
+    return client, {"Authorization": f"Bearer {token}"}, offloaded
+
+
+def _lines(response) -> list[dict]:
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_analyze_batch_matches_analyze(api):
+    client, headers, offloaded = api
+    results = _lines(client.post("/api/sql/analyze/batch", json={"queries": _QUERIES}, headers=headers))
+    assert results == [{"index": i, **analyze_sql(sql)} for i, sql in enumerate(_QUERIES)]
+    assert len(offloaded) == 3
+
+
+def test_compare_batch_matches_compare(api):
+    client, headers, offloaded = api
+    pairs = list(zip(_QUERIES, reversed(_QUERIES)))
+    body = {"pairs": [{"sql1": a, "sql2": b} for a, b in pairs]}
+    results = _lines(client.post("/api/sql/compare/batch", json=body, headers=headers))
+    assert results == [{"index": i, **compare_sql(a, b)} for i, (a, b) in enumerate(pairs)]
+    assert len(offloaded) == 3
+
+
+def test_batch_on_the_process_pool_matches_serial(monkeypatch):
+    monkeypatch.setattr(settings, "coe_chunk_size", 2)
+    pairs = list(zip(_QUERIES, reversed(_QUERIES)))
+    serial = list(analyze_sql_batch(_QUERIES)), list(compare_sql_batch(pairs))
+    analysis_cache.clear_cache()
+    pool = get_process_pool(2)
+    try:
+        assert (list(analyze_sql_batch(_QUERIES, pool)), list(compare_sql_batch(pairs, pool))) == serial
+    finally:
+        shutdown_process_pool()
+    assert [r["index"] for r in serial[0]] == list(range(len(_QUERIES)))
@@ -0,0 +1,30 @@
+"""The "lexer" SQL engine against the "sqlparse" engine it replaces."""
+import random
+
+import pytest
+
+from app.utils.sql_parser import LEXER_ENGINE, SQLPARSE_ENGINE, ParsedSQL
+from benchmarks.corpus import generate_corpus
+from benchmarks.lexer_conformance import _features, check, fuzz_sql, multi_statement
+
+
+@pytest.mark.parametrize("sql", [
+    "",
+    "   ",
+    "SELECT (((",
+    "select a from t where b = 'it''s' -- note\n",
+    "SELECT /*+ INDEX(t) */ a FROM [dbo].[t] JOIN \"Q\" ON x = $1",
+    "WITH RECURSIVE r AS (SELECT 1 UNION ALL SELECT n + 1 FROM r) SELECT * FROM r",
+    "select " + "f(" * 40 + "x" + ")" * 40 + " from t",
+])
+def test_engines_agree_on_edge_cases(sql):
+    assert _features(ParsedSQL(sql, engine=LEXER_ENGINE)) == _features(ParsedSQL(sql, engine=SQLPARSE_ENGINE))
+
+
+def test_engines_agree_on_a_fuzzed_corpus():
+    rng = random.Random(11)
+    sqls = [r["sql"] for r in generate_corpus(100, seed=11)]
+    sqls += [fuzz_sql(rng, sql) for sql in sqls[:60]]
+    sqls += [multi_statement(rng, sqls[:100]) for _ in range(20)]
+    mismatches, _, _ = check(sqls, show=3)
+    assert mismatches == 0
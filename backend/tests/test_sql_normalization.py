@@ -0,0 +1,31 @@
+"""ParsedSQL normalized text against the normalizer stored fingerprints came from."""
+import random
+
+import pytest
+
+from app.utils.sql_parser import LEXER_ENGINE, SQLPARSE_ENGINE, ParsedSQL
+from benchmarks.corpus import generate_corpus
+from benchmarks.lexer_conformance import baseline_normalized, multi_statement
+
+ENGINES = [SQLPARSE_ENGINE, LEXER_ENGINE]
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize("sql,normalized", [
+    ("select 1; select 2", "SELECT ?;SELECT ?"),
+    ("select a from t;\n\nselect b from u; ", "SELECT a FROM t; SELECT b FROM u;"),
+    ("GO select a from t -- trailing\n", "GOselect a FROM t"),
+    ("select * from t /* note */ where a = 'x'", "SELECT * FROM t WHERE a = ?"),
+])
+def test_multi_statement_examples(engine, sql, normalized):
+    assert ParsedSQL(sql, engine=engine).normalized == normalized
+    assert baseline_normalized(sql) == normalized
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_scripts_normalize_as_before(engine):
+    rng = random.Random(5)
+    sqls = [r["sql"] for r in generate_corpus(30, seed=5)]
+    for _ in range(40):
+        script = multi_statement(rng, sqls)
+        assert ParsedSQL(script, engine=engine).normalized == baseline_normalized(script), script
@@ -0,0 +1,50 @@
+"""Process-pool COE scoring gives the serial path's output."""
+import pytest
+
+from app.config import settings
+from app.services import analysis_cache
+from app.services.coe_processor import process_coe_csv
+from app.services.worker_pool import chunked, get_process_pool, imap_ordered, shutdown_process_pool
+from app.utils.sql_parser import ParsedSQL
+from benchmarks.corpus import corpus_csv, generate_corpus
+
+
+@pytest.fixture(scope="module")
+def pool():
+    yield get_process_pool(2)
+    shutdown_process_pool()
+
+
+def _square(n: int) -> int:
+    return n * n
+
+
+def test_imap_ordered_keeps_task_order(pool):
+    assert list(imap_ordered(_square, range(50), pool=pool, max_pending=3)) == [n * n for n in range(50)]
+    assert list(imap_ordered(_square, iter([]), pool=pool)) == []
+
+
+def test_parse_many_on_the_pool_matches_serial(pool):
+    sqls = [r["sql"] for r in generate_corpus(60, seed=4)]
+    analysis_cache.clear_cache()
+    pooled = analysis_cache.parse_many(sqls, pool=pool, chunk_size=7)
+    serial = [ParsedSQL(sql) for sql in sqls]
+    assert [(p.fingerprint, p.token_set, dict(p.keywords)) for p in pooled] == [
+        (p.fingerprint, p.token_set, dict(p.keywords)) for p in serial
+    ]
+
+
+def test_coe_analysis_on_the_pool_matches_serial(pool, monkeypatch):
+    # Small chunks, so parsing and pair scoring are spread over many tasks
+    monkeypatch.setattr(settings, "coe_chunk_size", 16)
+    content = corpus_csv(generate_corpus(200, seed=9))
+    analysis_cache.clear_cache()
+    serial = process_coe_csv(content, "coe.csv", workers=0)
+    analysis_cache.clear_cache()
+    assert process_coe_csv(content, "coe.csv", workers=2) == serial
+    assert serial["duplicate_groups"]
+
+
+def test_chunked():
+    assert list(chunked(range(7), 3)) == [[0, 1, 2], [3, 4, 5], [6]]
+    assert list(chunked([], 3)) == []
@@ -1,12 +1,18 @@
 import React, { useState, useEffect } from 'react';
-import { uploadCOE, getCOEHistory, getCOEResults, deleteCOEResults } from '../services/coeService';
+import { uploadCOE, getCOEJob, getCOEHistory, getCOEResults, deleteCOEResults } from '../services/coeService';
 import './COEProcessor.css';
 
+// Milliseconds between job status checks while an upload is analyzed
+const JOB_POLL_INTERVAL = 1500;
+
+const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
 export default function COEProcessor() {
   const [file, setFile] = useState(null);
   const [result, setResult] = useState(null);
   const [error, setError] = useState('');
   const [loading, setLoading] = useState(false);
+  const [job, setJob] = useState(null);
   const [history, setHistory] = useState([]);
   const [selectedId, setSelectedId] = useState(null);
 
@@ -40,17 +46,33 @@ export default function COEProcessor() {
     setError('');
     setLoading(true);
     try {
-      const data = await uploadCOE(file);
-      setResult(data);
-      setSelectedId(data.analysis_id);
+      // The upload returns a queued job; the analysis runs on the server.
+      let status = await uploadCOE(file);
+      setJob(status);
+      while (status.status === 'queued' || status.status === 'running') {
+        await sleep(JOB_POLL_INTERVAL);
+        status = await getCOEJob(status.job_id);
+        setJob(status);
+      }
+      if (status.status !== 'completed') {
+        throw new Error(status.error || 'Analysis failed');
+      }
+      setSelectedId(status.analysis_id);
       loadHistory();
     } catch (err) {
       setError(err.response?.data?.detail || err.message || 'Upload failed');
     } finally {
       setLoading(false);
+      setJob(null);
     }
   };
 
+  const progressLabel = () => {
+    if (!job || job.status === 'queued') return 'Queued...';
+    if (job.pairs_compared) return `Comparing... ${job.pairs_compared} pairs`;
+    return `Analyzing... ${job.rows_scored} rows`;
+  };
+
   const handleDelete = async (id) => {
     try {
       await deleteCOEResults(id);
@@ -83,7 +105,7 @@ export default function COEProcessor() {
             </div>
             {error && <p className="error-msg">{error}</p>}
             <button type="submit" className="btn btn-primary" disabled={loading || !file}>
-              {loading ? 'Analyzing...' : 'Upload & Analyze'}
+              {loading ? progressLabel() : 'Upload & Analyze'}
             </button>
           </form>
         </section>
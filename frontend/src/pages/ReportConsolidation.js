@@ -43,6 +43,12 @@ export default function ReportConsolidation() {
         {result && (
           <section className="card">
             <h3>Results</h3>
+            {result.unindexed_reports > 0 && (
+              <p className="muted">
+                {result.unindexed_reports} recently imported reports are still being indexed; their near duplicates
+                will show up when you run this again shortly.
+              </p>
+            )}
             <div className="cons-kpis">
               <div className="kpi"><span className="kpi-label">Total reports</span><span className="kpi-value">{result.total_reports}</span></div>
               <div className="kpi"><span className="kpi-label">Unique</span><span className="kpi-value">{result.unique_reports}</span></div>
@@ -1,5 +1,6 @@
 import api from './api';
 
+// Queues the analysis; resolves to the job (poll it with getCOEJob)
 export async function uploadCOE(file) {
   const formData = new FormData();
   formData.append('file', file);
@@ -9,6 +10,11 @@ export async function uploadCOE(file) {
   return data;
 }
 
+export async function getCOEJob(jobId) {
+  const { data } = await api.get(`/api/coe/jobs/${jobId}`);
+  return data;
+}
+
 export async function getCOEResults(analysisId) {
   const { data } = await api.get(`/api/coe/results/${analysisId}`);
   return data;